@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк форматов файла кэша каталога.
+
+Сравнивает прежний формат (json.dump с indent=2) с кодированиями тела
+json и zlib: размер файла на диске (и вместе с индексами), время
+сохранения и загрузки с диска (память модуля cache перед каждой
+загрузкой сбрасывается), а отдельно - повторной загрузки из памяти.
+Файлы пишутся во временный каталог, кэш пользователя не затрагивается.
+
+    python3 benchmarks/bench_cache.py
+    python3 benchmarks/bench_cache.py --rows 10000 100000 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+from bench_parser import BASE_URL, make_catalog
+from catalog_parser import Cartoon, parse_catalog
+import cache
+
+
+def save_legacy(cartoons) -> None:
+    """Сохранение в прежнем формате: один JSON-объект с отступами."""
+    data = {
+        'timestamp': '2000-01-01T00:00:00',
+        'cartoons': [
+            {
+                'title': c.title,
+                'url': c.url,
+                'extension': c.extension,
+                'thumbnail': c.thumbnail,
+                'info_url': c.info_url,
+                'duration': c.duration,
+                'plot': c.plot
+            }
+            for c in cartoons
+        ]
+    }
+    with open(cache.get_cache_path(), 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def load_legacy() -> list:
+    with open(cache.get_cache_path(), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [Cartoon(**item) for item in data['cartoons']]
+
+
+def load_cold() -> list:
+    """Загрузка с диска: без каталога, запомненного при сохранении или прошлой загрузке."""
+    cache._memo.clear()
+    return cache.load_cache()
+
+
+def best_time(func, *args, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cache.get_data_dir = lambda: workdir
+
+        for rows in args.rows:
+            cartoons = parse_catalog(make_catalog(rows), BASE_URL)
+            print(f'{rows:>7} записей:')
+
+            formats = [('legacy', save_legacy, load_legacy)] + [
+                (encoding, lambda c, e=encoding: cache.save_cache(c, encoding=e), load_cold)
+                for encoding in cache.ENCODINGS
+            ]
+            for name, save, load in formats:
+                save_time = best_time(save, cartoons, repeat=args.repeat)
+                size = os.path.getsize(cache.get_cache_path())
+                # Вместе с поисковым и алфавитным индексами
+                total = sum(os.path.getsize(os.path.join(workdir, filename)) for filename in os.listdir(workdir))
+                load_time = best_time(load, repeat=args.repeat)
+                if len(load()) != rows:
+                    raise AssertionError(f'{name}: загружено не {rows} записей')
+                line = (f'  {name:<7} {size / 2**20:7.2f} МБ (всего {total / 2**20:6.2f} МБ)  '
+                        f'сохранение {save_time * 1000:7.0f} мс  загрузка {load_time * 1000:7.0f} мс')
+                if load is load_cold:
+                    # Повторная загрузка того же снимка отдаётся из памяти модуля
+                    memo_time = best_time(cache.load_cache, repeat=args.repeat)
+                    line += f'  из памяти {memo_time * 1000:5.1f} мс'
+                print(line)
+                cache.clear_cache()
+
+
+if __name__ == '__main__':
+    main()
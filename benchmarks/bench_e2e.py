@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сквозной бенчмарк действий плагина без доступа к сети.
+
+Каталог отдаёт локальный сервер (benchmarks/catalog_server.py) с
+заданными размером, задержкой и скоростью, модули Kodi заменены
+заглушками (benchmarks/kodi_stubs.py). Каждое действие main.py
+выполняется в отдельном интерпретаторе:
+
+  cold - кэша нет: загрузка -> распаковка -> разбор -> сохранение -> вывод
+  warm - кэш уже сохранён; refresh - принудительное обновление (ответ 304)
+
+Печатаются медианы общего времени (с импортом main.py) и фаз из
+resources/lib/timing.py.
+
+    python3 benchmarks/bench_e2e.py
+    python3 benchmarks/bench_e2e.py --rows 50000 --latency 300 --bandwidth 1024
+    python3 benchmarks/bench_e2e.py --storage sqlite --scenarios warm
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, BENCH_DIR)
+
+from bench_startup import ACTIONS, SEARCH_QUERY
+from catalog_server import CatalogServer
+
+# Сценарий -> действия (ключи ACTIONS и refresh)
+SCENARIOS = {
+    'cold': ['listing', 'alphabet', 'byletter', 'search'],
+    'warm': ['root', 'listing', 'alphabet', 'byletter', 'search', 'new', 'play', 'refresh'],
+}
+
+ALL_ACTIONS = dict(ACTIONS, refresh='action=refresh')
+
+# Фазы timing в порядке прохождения данных
+PHASES = ('fetch', 'decode', 'parse', 'diff', 'save', 'cache_load', 'cache_validate', 'render')
+
+
+def run_child(query: str, data_dir: str, url: str, settings: dict) -> None:
+    """Выполнить одно действие в этом процессе и напечатать замеры JSON."""
+    sys.path.insert(0, ROOT_DIR)
+    import kodi_stubs
+    # Замер ведёт этот процесс (лог заглушки никуда не пишет),
+    # собственный замер роутера выключен
+    recorder = kodi_stubs.install(data_dir, settings=dict(settings, timing_log_level='off'),
+                                  search_query=SEARCH_QUERY)
+
+    start = time.perf_counter()
+    import main
+    import catalog
+    import timing
+    catalog.BASE_URL = url
+
+    with timing.action('bench', log_level='debug', profile=False) as measured:
+        main.router('plugin://plugin.video.arjlover/', 1, query)
+    finished = time.perf_counter()
+
+    print(json.dumps({
+        'total_ms': (finished - start) * 1000,
+        'phases': {name: seconds * 1000 for name, seconds in measured.phases.items()},
+        'items': len(recorder.items),
+        'notifications': recorder.notifications,
+    }))
+
+
+def run_action(action: str, data_dir: str, url: str, settings: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', ALL_ACTIONS[action],
+         '--data-dir', data_dir, '--url', url, '--settings', json.dumps(settings)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    sample = json.loads(output.strip().splitlines()[-1])
+
+    errors = [message for message, icon in sample['notifications'] if icon == 'error']
+    if errors:
+        raise AssertionError(f'{action}: {errors}')
+    return sample
+
+
+def summarize(samples: list) -> dict:
+    """Медианы общего времени и фаз по запускам."""
+    phases = {}
+    for name in PHASES:
+        values = [s['phases'][name] for s in samples if name in s['phases']]
+        if values:
+            phases[name] = statistics.median(values)
+    return {
+        'total_ms': statistics.median(s['total_ms'] for s in samples),
+        'phases': phases,
+        'items': samples[-1]['items'],
+    }
+
+
+def measure(scenario: str, action: str, workdir: str, url: str,
+            settings: dict, runs: int) -> dict:
+    samples = []
+    warm_dir = os.path.join(workdir, 'warm')
+    for run in range(runs):
+        if scenario == 'cold':
+            data_dir = os.path.join(workdir, f'cold-{action}-{run}')
+            os.makedirs(data_dir)
+        else:
+            data_dir = warm_dir
+        samples.append(run_action(action, data_dir, url, settings))
+        if scenario == 'cold':
+            shutil.rmtree(data_dir)
+    return summarize(samples)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=10000)
+    arg_parser.add_argument('--latency', type=float, default=50, help='задержка ответа сервера, мс')
+    arg_parser.add_argument('--bandwidth', type=int, default=0, help='скорость отдачи, КБ/с (0 - без ограничения)')
+    arg_parser.add_argument('--no-gzip', action='store_true')
+    arg_parser.add_argument('--runs', type=int, default=3)
+    arg_parser.add_argument('--storage', choices=['json', 'sqlite'], default='json')
+    arg_parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    arg_parser.add_argument('--json', dest='json_path', help='сохранить результаты в JSON-файл')
+    arg_parser.add_argument('--child', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--url', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--settings', default='{}', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child, args.data_dir, args.url, json.loads(args.settings))
+        return
+
+    settings = {'storage': args.storage}
+    results = {}
+
+    with CatalogServer(args.rows, args.latency / 1000, args.bandwidth * 1024,
+                       not args.no_gzip) as server, tempfile.TemporaryDirectory() as workdir:
+        print(f'Каталог: {args.rows} записей ({len(server.gzip_body if server.gzip else server.body) / 2**20:.1f} МБ), '
+              f'задержка {args.latency:.0f} мс, скорость '
+              f'{f"{args.bandwidth} КБ/с" if args.bandwidth else "без ограничения"}, '
+              f'хранилище {args.storage}, медиана из {args.runs} запусков')
+
+        # Кэш для тёплых запусков
+        os.makedirs(os.path.join(workdir, 'warm'))
+        run_action('listing', os.path.join(workdir, 'warm'), server.url, settings)
+
+        for scenario in args.scenarios:
+            for action in SCENARIOS[scenario]:
+                result = measure(scenario, action, workdir, server.url, settings, args.runs)
+                results[f'{scenario}.{action}'] = result
+                phases = '  '.join(f'{name} {ms:.0f}' for name, ms in result['phases'].items())
+                print(f'  {scenario:<4} {action:<9} {result["total_ms"]:7.0f} мс  '
+                      f'пунктов {result["items"]:>5}  {phases}')
+
+        print(f'Запросов к серверу: {server.requests}')
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
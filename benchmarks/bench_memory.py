@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк памяти и размера кэша для представления Cartoon.
+
+Сравнивает прежний формат (dataclass из восьми строк, запись кэша со всеми
+полями) с компактным: память загруженного из кэша каталога (tracemalloc)
+и размер тела кэша на диске.
+
+    python3 benchmarks/bench_memory.py
+    python3 benchmarks/bench_memory.py --rows 10000 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+from bench_parser import BASE_URL, make_catalog
+from catalog_parser import parse_catalog
+from cache import _decode_record, _encode_record
+
+
+@dataclass
+class LegacyCartoon:
+    """Прежнее представление мультфильма."""
+    title: str
+    url: str
+    extension: str
+    thumbnail: str
+    info_url: str = ""
+    duration: str = ""
+    year: str = ""
+    plot: str = ""
+    play_path: str = ""
+
+
+def legacy_lines(cartoons) -> list:
+    """Строки кэша в прежнем формате: все поля целиком."""
+    return [
+        json.dumps([c.title, c.url, c.extension, c.thumbnail, c.info_url,
+                    c.duration, c.plot, c.play_path],
+                   ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+        for c in cartoons
+    ]
+
+
+def compact_lines(cartoons):
+    """Строки кэша в компактном формате и таблица префиксов."""
+    prefix_ids = {}
+    lines = [_encode_record(c.to_record(prefix_ids)) for c in cartoons]
+    return lines, sorted(prefix_ids, key=prefix_ids.get)
+
+
+def load_legacy(lines) -> list:
+    cartoons = []
+    for line in lines:
+        title, url, extension, thumbnail, info_url, duration, plot, path = json.loads(line)
+        cartoons.append(LegacyCartoon(title, url, extension, thumbnail, info_url,
+                                      duration, '', plot, path))
+    return cartoons
+
+
+def load_compact(lines, prefixes) -> list:
+    return [_decode_record(line, prefixes) for line in lines]
+
+
+def measure(load, *args) -> int:
+    """Память (байт), которую занимает результат load(*args)."""
+    gc.collect()
+    tracemalloc.start()
+    result = load(*args)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, nargs='+', default=[100000])
+    args = arg_parser.parse_args()
+
+    for rows in args.rows:
+        cartoons = parse_catalog(make_catalog(rows), BASE_URL)
+        old_lines = legacy_lines(cartoons)
+        new_lines, prefixes = compact_lines(cartoons)
+        del cartoons
+
+        old_memory = measure(load_legacy, old_lines)
+        new_memory = measure(load_compact, new_lines, prefixes)
+        old_disk = sum(map(len, old_lines))
+        new_disk = sum(map(len, new_lines))
+
+        print(f'{rows:>7} записей:')
+        print(f'  память: {old_memory / 2**20:8.1f} МБ -> {new_memory / 2**20:8.1f} МБ'
+              f' ({new_memory / old_memory:.0%})')
+        print(f'  диск:   {old_disk / 2**20:8.1f} МБ -> {new_disk / 2**20:8.1f} МБ'
+              f' ({new_disk / old_disk:.0%})')
+
+
+if __name__ == '__main__':
+    main()
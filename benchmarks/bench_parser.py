@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк пропускной способности парсера каталога.
+
+Генерирует синтетические каталоги заданного размера в формате
+multiki.arjlover.net и печатает скорость parse_catalog в строках/с.
+
+    python3 benchmarks/bench_parser.py
+    python3 benchmarks/bench_parser.py --rows 1000 10000 100000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+from catalog_parser import parse_catalog
+
+BASE_URL = 'https://multiki.arjlover.net/multiki/'
+
+ROW_TEMPLATE = '''<tr class={row_class}>
+<td class=a>{n}</td>
+<td class=l><a href="http://multiki.arjlover.net/info/{slug}.avi.html">{title}</a></td>
+<td class=r>{size}</td>
+<td>640x480</td>
+<td>00:{minutes:02d}:{seconds:02d}</td>
+<td><a href="http://multiki.arjlover.net/multiki/{slug}.avi">http</a></td>
+</tr>
+'''
+
+WORDS = ['Ёжик', 'в', 'тумане', 'Ну', 'погоди', 'Чебурашка', 'и', 'крокодил', 'Гена', 'Умка']
+
+
+def make_catalog(rows: int) -> str:
+    """Сгенерировать HTML каталога из rows строк."""
+    parts = ['<html><body><table>\n']
+    for n in range(rows):
+        title = ' '.join(WORDS[(n + k) % len(WORDS)] for k in range(3))
+        parts.append(ROW_TEMPLATE.format(
+            row_class='o' if n % 2 else 'e',
+            n=n + 1,
+            slug=f'cartoon.{n}',
+            title=f'{title} {n}',
+            size=50000000 + n,
+            minutes=n % 60,
+            seconds=(n * 7) % 60
+        ))
+    parts.append('</table></body></html>\n')
+    return ''.join(parts)
+
+
+def bench(rows: int, repeat: int) -> float:
+    """Вернуть лучшую скорость разбора (строк в секунду) из repeat прогонов."""
+    html = make_catalog(rows)
+    best = float('inf')
+    
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cartoons = parse_catalog(html, BASE_URL)
+        best = min(best, time.perf_counter() - start)
+    
+    if len(cartoons) != rows:
+        raise AssertionError(f'Ожидалось {rows} записей, получено {len(cartoons)}')
+    
+    return rows / best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+    
+    for rows in args.rows:
+        rate = bench(rows, args.repeat)
+        print(f'{rows:>7} строк: {rate:>10.0f} строк/с')
+
+
+if __name__ == '__main__':
+    main()
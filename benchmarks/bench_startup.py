@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк холодного старта плагина: время до первого пункта после клика.
+
+Каждое действие запускается в отдельном интерпретаторе (как без
+reuselanguageinvoker) с заглушками модулей Kodi и заранее сохранённым
+кэшем синтетического каталога. Измеряется время импорта main.py и время
+выполнения действия; печатаются медианы.
+
+С --budget результаты сравниваются с бюджетом из JSON-файла, и при
+превышении скрипт завершается с кодом 1 (используется в CI).
+
+    python3 benchmarks/bench_startup.py
+    python3 benchmarks/bench_startup.py --rows 10000 --runs 7
+    python3 benchmarks/bench_startup.py --budget benchmarks/startup_budget.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+# Действие -> строка запроса плагина
+ACTIONS = {
+    'root': '',
+    'listing': 'action=listing',
+    'alphabet': 'action=alphabet',
+    'byletter': 'action=byletter&letter=%D0%9D',
+    'durations': 'action=durations',
+    'byduration': 'action=byduration&bucket=medium',
+    'search': 'action=search',
+    'new': 'action=new',
+    'play': 'action=play&path=https%3A//multiki.arjlover.net/multiki/cartoon.1.avi',
+}
+
+SEARCH_QUERY = 'погоди'
+
+
+def run_child(query: str, data_dir: str) -> None:
+    """Выполнить одно действие в этом процессе и напечатать замеры JSON."""
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, ROOT_DIR)
+    import kodi_stubs
+    recorder = kodi_stubs.install(data_dir, search_query=SEARCH_QUERY)
+    modules_before = len(sys.modules)
+
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    main.router('plugin://plugin.video.arjlover/', 1, query)
+    finished = time.perf_counter()
+
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'action_ms': (finished - imported) * 1000,
+        'items': len(recorder.items),
+        'modules': len(sys.modules) - modules_before,
+        'notifications': recorder.notifications,
+    }))
+
+
+def prepare_cache(data_dir: str, rows: int) -> None:
+    """Сохранить кэш синтетического каталога в data_dir (в отдельном процессе)."""
+    code = (
+        'import sys; sys.path[:0] = [{bench!r}, {lib!r}]\n'
+        'import kodi_stubs; kodi_stubs.install({data!r})\n'
+        'from bench_parser import BASE_URL, make_catalog\n'
+        'from catalog_parser import parse_catalog\n'
+        'import cache\n'
+        'cache.save_cache(parse_catalog(make_catalog({rows}), BASE_URL))\n'
+    ).format(bench=BENCH_DIR, lib=os.path.join(ROOT_DIR, 'resources', 'lib'),
+             data=data_dir, rows=rows)
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def measure(action: str, data_dir: str, runs: int) -> dict:
+    """Медианы замеров действия по runs запускам."""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', ACTIONS[action],
+             '--data-dir', data_dir],
+            check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    errors = [message for message, icon in samples[-1]['notifications'] if icon == 'error']
+    if errors:
+        raise AssertionError(f'{action}: {errors}')
+
+    return {
+        'import_ms': statistics.median(s['import_ms'] for s in samples),
+        'action_ms': statistics.median(s['action_ms'] for s in samples),
+        'items': samples[-1]['items'],
+        'modules': samples[-1]['modules'],
+    }
+
+
+def check_budget(results: dict, budget: dict) -> list:
+    """Список нарушений бюджета (пустой, если всё в пределах)."""
+    violations = []
+    for action, result in results.items():
+        limits = budget.get(action, {})
+        for metric in ('import_ms', 'action_ms'):
+            limit = limits.get(metric, budget.get('default', {}).get(metric))
+            if limit is not None and result[metric] > limit:
+                violations.append(f'{action}.{metric}: {result[metric]:.0f} мс > {limit} мс')
+    return violations
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=10000)
+    arg_parser.add_argument('--runs', type=int, default=5)
+    arg_parser.add_argument('--actions', nargs='+', choices=sorted(ACTIONS), default=list(ACTIONS))
+    arg_parser.add_argument('--budget', help='JSON с лимитами, мс: {"действие": {"action_ms": ...}}')
+    arg_parser.add_argument('--child', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child, args.data_dir)
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        prepare_cache(data_dir, args.rows)
+
+        results = {}
+        print(f'Каталог: {args.rows} записей, медиана из {args.runs} запусков')
+        for action in args.actions:
+            result = results[action] = measure(action, data_dir, args.runs)
+            print(f'  {action:<10} импорт {result["import_ms"]:6.1f} мс  '
+                  f'действие {result["action_ms"]:7.1f} мс  '
+                  f'пунктов {result["items"]:>5}  модулей {result["modules"]:>4}')
+
+    if args.budget:
+        with open(args.budget, 'r', encoding='utf-8') as f:
+            violations = check_budget(results, json.load(f))
+        if violations:
+            print('Превышен бюджет холодного старта:')
+            for violation in violations:
+                print(f'  {violation}')
+            sys.exit(1)
+        print('Бюджет холодного старта соблюдён')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Локальный заменитель multiki.arjlover.net для бенчмарков.
+
+Отдаёт синтетический каталог заданного размера в windows-1251 (как
+сайт), с ETag/304, сжатием gzip и искусственными задержкой ответа и
+ограничением пропускной способности. Запросы к плагину идут на
+http://127.0.0.1:<порт>/multiki/ вместо сайта.
+
+    python3 benchmarks/catalog_server.py --rows 10000 --latency 200 --bandwidth 512
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_parser import make_catalog
+
+# Размер блока, которым отправляется ответ при ограничении скорости
+SEND_CHUNK = 16 * 1024
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов каталога; параметры берутся из self.server."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        time.sleep(server.latency)
+
+        if not self.path.startswith('/multiki/'):
+            self.send_error(404)
+            return
+
+        if self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.send_header('ETag', server.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        gzipped = server.gzip and 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = server.gzip_body if gzipped else server.body
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=windows-1251')
+        self.send_header('ETag', server.etag)
+        self.send_header('Last-Modified', 'Mon, 01 Jan 2024 00:00:00 GMT')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.send_body(body)
+
+    def send_body(self, body: bytes) -> None:
+        """Отправить тело, соблюдая ограничение скорости сервера."""
+        if not self.server.bandwidth:
+            self.wfile.write(body)
+            return
+
+        for start in range(0, len(body), SEND_CHUNK):
+            chunk = body[start:start + SEND_CHUNK]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / self.server.bandwidth)
+
+    def log_message(self, *args):
+        pass
+
+
+class CatalogServer(ThreadingHTTPServer):
+    """
+    Сервер синтетического каталога в фоновом потоке.
+
+        with CatalogServer(rows=10000, latency=0.1) as server:
+            catalog.BASE_URL = server.url
+
+    Args:
+        rows: число мультфильмов в каталоге
+        latency: задержка перед каждым ответом, секунд
+        bandwidth: скорость отдачи тела, байт/с (0 - без ограничения)
+        use_gzip: сжимать ответ, если клиент поддерживает gzip
+        port: порт (0 - любой свободный)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, rows: int, latency: float = 0.0, bandwidth: int = 0,
+                 use_gzip: bool = True, port: int = 0):
+        super().__init__(('127.0.0.1', port), CatalogHandler)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.gzip = use_gzip
+        self.body = make_catalog(rows).encode('windows-1251')
+        self.gzip_body = gzip.compress(self.body, 6)
+        self.etag = f'"catalog-{rows}"'
+        self.requests = 0
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}/multiki/'
+
+    def __enter__(self) -> 'CatalogServer':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=10000)
+    arg_parser.add_argument('--latency', type=float, default=0, help='задержка ответа, мс')
+    arg_parser.add_argument('--bandwidth', type=int, default=0, help='скорость отдачи, КБ/с (0 - без ограничения)')
+    arg_parser.add_argument('--no-gzip', action='store_true')
+    arg_parser.add_argument('--port', type=int, default=8080)
+    args = arg_parser.parse_args()
+
+    server = CatalogServer(args.rows, args.latency / 1000, args.bandwidth * 1024,
+                           not args.no_gzip, args.port)
+    print(f'Каталог из {args.rows} записей: {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Заглушки модулей Kodi (xbmc, xbmcaddon, xbmcgui, xbmcplugin, xbmcvfs)
+для запуска main.py вне Kodi в бенчмарках.
+
+Заглушки ничего не рисуют, а только запоминают вызовы в KodiRecorder:
+пункты списка, уведомления, завершение каталога, разрешённый URL.
+
+    recorder = kodi_stubs.install(data_dir, settings={'page_size': '0'})
+    import main
+    main.router('plugin://plugin.video.arjlover/', 1, 'action=listing')
+    print(len(recorder.items))
+"""
+
+import os
+import sys
+import types
+from typing import Dict, Optional
+
+ADDON_ID = 'plugin.video.arjlover'
+
+
+class KodiRecorder:
+    """Вызовы плагина, записанные заглушками."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.items = []
+        self.notifications = []
+        self.sort_methods = []
+        self.succeeded = None
+        self.cache_to_disc = None
+        self.resolved = None
+        self.calls = 0
+
+
+def install(data_dir: str, settings: Optional[Dict[str, str]] = None,
+            search_query: str = '') -> KodiRecorder:
+    """
+    Зарегистрировать заглушки в sys.modules.
+
+    Args:
+        data_dir: каталог, куда отображается special://userdata/addon_data/...
+        settings: значения настроек плагина (остальные - пустые, т.е. по умолчанию)
+        search_query: что «введёт» пользователь в диалоге поиска
+    """
+    recorder = KodiRecorder()
+    settings = dict(settings or {})
+
+    xbmc = types.ModuleType('xbmc')
+    xbmc.LOGDEBUG, xbmc.LOGINFO, xbmc.LOGWARNING, xbmc.LOGERROR = 0, 1, 2, 3
+    xbmc.log = lambda message, level=xbmc.LOGDEBUG: None
+    xbmc.executebuiltin = lambda command, wait=False: None
+
+    class Monitor:
+        def abortRequested(self):
+            return False
+
+        def waitForAbort(self, timeout=0):
+            return False
+
+    xbmc.Monitor = Monitor
+
+    xbmcaddon = types.ModuleType('xbmcaddon')
+
+    class Addon:
+        def __init__(self, addon_id=ADDON_ID):
+            self.addon_id = addon_id
+
+        def getSetting(self, setting_id):
+            return settings.get(setting_id, '')
+
+        def getAddonInfo(self, info):
+            return {'id': self.addon_id, 'name': 'ArjLover Cartoons'}.get(info, '')
+
+    xbmcaddon.Addon = Addon
+
+    xbmcvfs = types.ModuleType('xbmcvfs')
+
+    def translate_path(path):
+        prefix = f'special://userdata/addon_data/{ADDON_ID}/'
+        if path.startswith(prefix):
+            return os.path.join(data_dir, path[len(prefix):])
+        return path
+
+    xbmcvfs.translatePath = translate_path
+    xbmcvfs.exists = os.path.exists
+    xbmcvfs.mkdirs = lambda path: os.makedirs(path, exist_ok=True) or True
+
+    xbmcgui = types.ModuleType('xbmcgui')
+    xbmcgui.NOTIFICATION_INFO, xbmcgui.NOTIFICATION_WARNING, xbmcgui.NOTIFICATION_ERROR = (
+        'info', 'warning', 'error'
+    )
+    xbmcgui.INPUT_ALPHANUM = 0
+
+    class ListItem:
+        def __init__(self, label='', label2='', path='', offscreen=False):
+            self.label = label
+            self.path = path
+            self.info = {}
+            self.art = {}
+            self.properties = {}
+
+        def setInfo(self, media_type, info):
+            self.info = info
+
+        def setArt(self, art):
+            self.art = art
+
+        def setProperty(self, key, value):
+            self.properties[key] = value
+
+    class Dialog:
+        def notification(self, heading, message, icon='', time=0, sound=True):
+            recorder.notifications.append((message, icon))
+
+        def input(self, heading, default='', type=0, option=0, autoclose=0):
+            return search_query
+
+    xbmcgui.ListItem = ListItem
+    xbmcgui.Dialog = Dialog
+
+    xbmcplugin = types.ModuleType('xbmcplugin')
+    for number, name in enumerate(('UNSORTED', 'TITLE', 'DURATION', 'SIZE', 'LABEL')):
+        setattr(xbmcplugin, f'SORT_METHOD_{name}', number)
+
+    def add_directory_item(handle, url, listitem, isFolder=False, totalItems=0):
+        recorder.calls += 1
+        recorder.items.append((url, listitem, isFolder))
+        return True
+
+    def add_directory_items(handle, items, totalItems=0):
+        recorder.calls += 1
+        recorder.items.extend(items)
+        return True
+
+    def end_of_directory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+        recorder.succeeded = succeeded
+        recorder.cache_to_disc = cacheToDisc
+
+    def set_resolved_url(handle, succeeded, listitem):
+        recorder.succeeded = succeeded
+        recorder.resolved = listitem.path
+
+    xbmcplugin.addDirectoryItem = add_directory_item
+    xbmcplugin.addDirectoryItems = add_directory_items
+    xbmcplugin.endOfDirectory = end_of_directory
+    xbmcplugin.setResolvedUrl = set_resolved_url
+    xbmcplugin.setContent = lambda handle, content: None
+    xbmcplugin.addSortMethod = lambda handle, method, label2Mask='': recorder.sort_methods.append(method)
+
+    sys.modules.update(
+        xbmc=xbmc,
+        xbmcaddon=xbmcaddon,
+        xbmcvfs=xbmcvfs,
+        xbmcgui=xbmcgui,
+        xbmcplugin=xbmcplugin
+    )
+    return recorder
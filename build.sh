@@ -25,6 +25,7 @@ mkdir -p "$BUILD_DIR/$PLUGIN_NAME"
 echo "📋 Копирование файлов плагина..."
 cp addon.xml "$BUILD_DIR/$PLUGIN_NAME/"
 cp main.py "$BUILD_DIR/$PLUGIN_NAME/"
+cp service.py "$BUILD_DIR/$PLUGIN_NAME/"
 cp -r resources "$BUILD_DIR/$PLUGIN_NAME/"
 
 # Удалить __pycache__ если есть
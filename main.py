@@ -8,35 +8,42 @@ from urllib.parse import parse_qsl
 
 import xbmcplugin
 import xbmcgui
-import xbmcaddon
 
+# Модули плагина. При reuselanguageinvoker интерпретатор переиспользуется
+# между переходами, поэтому путь добавляется только один раз. Каталог
+# ставится первым, чтобы модули плагина не перекрывались одноимёнными
+# модулями стандартной библиотеки
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', 'lib')
+if LIB_DIR not in sys.path:
+    sys.path.insert(0, LIB_DIR)
 
-def router(paramstring):
-    """Роутер для обработки URL параметров от Kodi."""
+import timing
+
+
+# Сколько пунктов списка передаётся в Kodi за один вызов addDirectoryItems
+RENDER_BATCH_SIZE = 500
+
+# Общая часть информации о видео для всех мультфильмов
+CARTOON_INFO = {'genre': 'Мультфильмы', 'mediatype': 'movie'}
+
+
+def router(addon_url, addon_handle, paramstring):
+    """
+    Роутер для обработки URL параметров от Kodi.
+    
+    Адрес и handle плагина передаются явно из sys.argv текущего вызова:
+    при переиспользовании интерпретатора их нельзя запоминать в модуле.
+    """
     try:
         params = dict(parse_qsl(paramstring))
+        action = params.get('action', '') if params else 'root'
         
-        if params:
-            action = params.get('action', '')
-            
-            if action == 'listing':
-                list_videos()
-            elif action == 'alphabet':
-                show_alphabet()
-            elif action == 'byletter':
-                list_by_letter(params.get('letter', ''))
-            elif action == 'search':
-                search_videos()
-            elif action == 'play':
-                play_video(params.get('path', ''))
-            elif action == 'refresh':
-                refresh_cache()
-            else:
-                raise ValueError(f'Invalid action: {action}')
-        else:
-            list_categories()
-            
+        # Время действия и его фаз пишется в лог Kodi (настройки «Диагностика»)
+        with timing.action(action):
+            dispatch(addon_url, addon_handle, action, params)
+    
     except Exception as e:
+        log_error(f'Ошибка действия {paramstring!r}', e)
         xbmcgui.Dialog().notification(
             'ArjLover Plugin', 
             f'Ошибка: {str(e)[:50]}',
@@ -45,24 +52,93 @@ def router(paramstring):
         )
 
 
-def list_categories():
-    """Показать главное меню с категориями."""
-    addon = xbmcaddon.Addon()
-    addon_url = sys.argv[0]
-    addon_handle = int(sys.argv[1])
+def dispatch(addon_url, addon_handle, action, params):
+    """Выполнить действие плагина."""
+    if action == 'root':
+        list_categories(addon_url, addon_handle)
+    elif action == 'listing':
+        list_videos(addon_url, addon_handle, parse_offset(params))
+    elif action == 'alphabet':
+        show_alphabet(addon_url, addon_handle)
+    elif action == 'byletter':
+        list_by_letter(addon_url, addon_handle, params.get('letter', ''), parse_offset(params))
+    elif action == 'durations':
+        show_durations(addon_url, addon_handle)
+    elif action == 'byduration':
+        list_by_duration(addon_url, addon_handle, params.get('bucket', ''), parse_offset(params))
+    elif action == 'search':
+        search_videos(addon_url, addon_handle)
+    elif action == 'new':
+        list_new_arrivals(addon_url, addon_handle)
+    elif action == 'play':
+        play_video(addon_handle, params.get('path', ''))
+    elif action == 'refresh':
+        refresh_cache()
+    else:
+        raise ValueError(f'Invalid action: {action}')
+
+
+def parse_offset(params):
+    """Смещение страницы списка из параметров (0, если не задано или испорчено)."""
+    try:
+        return max(int(params.get('offset', 0)), 0)
+    except ValueError:
+        return 0
+
+
+def log_error(message, exc=None):
+    """
+    Записать ошибку в лог Kodi (уведомление пользователю показывается отдельно).
+    
+    Вызванная в обработчике исключения exc, пишет и его трассировку, а
+    ошибка попадает в строку замера действия.
+    """
+    if exc is not None:
+        import traceback
+        message = f'{message}: {exc!r}\n{traceback.format_exc()}'
+        timing.fail(exc)
+    
+    try:
+        import xbmc
+        xbmc.log(f'ArjLover: {message}', xbmc.LOGERROR)
+    except ImportError:
+        print(f'Error: {message}')
+
+
+def list_categories(addon_url, addon_handle):
+    """
+    Показать главное меню с категориями.
+    
+    Меню не кэшируется Kodi: в его ссылках текущая версия каталога, по
+    которой кэшируются списки.
+    """
+    from listing_version import listing_token
+    token = listing_token()
     
     # Все мультфильмы
-    url = f'{addon_url}?action=listing'
+    url = f'{addon_url}?action=listing&v={token}'
     li = xbmcgui.ListItem('Все мультфильмы')
     li.setInfo('video', {'title': 'Все мультфильмы', 'genre': 'Мультфильмы'})
     xbmcplugin.addDirectoryItem(handle=addon_handle, url=url, listitem=li, isFolder=True)
     
     # По алфавиту
-    url = f'{addon_url}?action=alphabet'
+    url = f'{addon_url}?action=alphabet&v={token}'
     li = xbmcgui.ListItem('По алфавиту')
     li.setInfo('video', {'title': 'По алфавиту', 'plot': 'Выбрать букву для фильтрации'})
     xbmcplugin.addDirectoryItem(handle=addon_handle, url=url, listitem=li, isFolder=True)
     
+    # По длительности
+    url = f'{addon_url}?action=durations&v={token}'
+    li = xbmcgui.ListItem('По длительности')
+    li.setInfo('video', {'title': 'По длительности', 'plot': 'Короткие, средние и длинные мультфильмы'})
+    xbmcplugin.addDirectoryItem(handle=addon_handle, url=url, listitem=li, isFolder=True)
+    
+    # Новые поступления
+    url = f'{addon_url}?action=new&v={token}'
+    li = xbmcgui.ListItem('Новые поступления')
+    li.setInfo('video', {'title': 'Новые поступления', 'plot': 'Мультфильмы, появившиеся при последних обновлениях каталога'})
+    xbmcplugin.addDirectoryItem(handle=addon_handle, url=url, listitem=li, isFolder=True)
+    
     # Поиск
     url = f'{addon_url}?action=search'
     li = xbmcgui.ListItem('Поиск')
@@ -75,83 +151,36 @@ def list_categories():
     li.setInfo('video', {'title': 'Обновить каталог', 'plot': 'Принудительно обновить список мультфильмов'})
     xbmcplugin.addDirectoryItem(handle=addon_handle, url=url, listitem=li, isFolder=False)
     
-    xbmcplugin.endOfDirectory(addon_handle)
+    xbmcplugin.endOfDirectory(addon_handle, cacheToDisc=False)
 
 
-def list_videos():
-    """Показать список мультфильмов из каталога."""
-    addon = xbmcaddon.Addon()
-    addon_url = sys.argv[0]
-    addon_handle = int(sys.argv[1])
-    
+def list_videos(addon_url, addon_handle, offset=0):
+    """Показать список мультфильмов из каталога (постранично, если включено)."""
     try:
-        # Импорт модулей из resources/lib
-        sys.path.append(os.path.join(os.path.dirname(__file__), 'resources', 'lib'))
-        from cache import load_cache, save_cache
-        from parser import fetch_catalog, parse_catalog
-        
-        # Попытка загрузить из кэша
-        cartoons = load_cache()
+        page_size = get_page_size()
+        page = load_listing_page(addon_handle, offset, page_size)
+        if page is None:
+            return
         
-        if cartoons is None:
-            # Кэш недоступен или устарел, загружаем с сайта
-            try:
-                base_url = 'https://multiki.arjlover.net/multiki/'
-                html = fetch_catalog(base_url)
-                cartoons = parse_catalog(html, base_url)
-                
-                # Сохранить в кэш
-                save_cache(cartoons)
-                
-            except ConnectionError as e:
-                # Показать ошибку пользователю
-                xbmcgui.Dialog().notification(
-                    'ArjLover Plugin', 
-                    'Сайт недоступен. Проверьте подключение к интернету.',
-                    xbmcgui.NOTIFICATION_ERROR,
-                    5000
-                )
-                xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
-                return
+        cartoons, total = page
         
-        # Создать ListItem для каждого мультфильма
-        for cartoon in cartoons:
-            url = f'{addon_url}?action=play&path={urllib.parse.quote(cartoon.url)}'
-            li = xbmcgui.ListItem(cartoon.title)
-            
-            li.setInfo('video', {
-                'title': cartoon.title,
-                'genre': 'Мультфильмы',
-                'mediatype': 'movie',
-                'plot': cartoon.plot,
-                'duration': cartoon.duration
-            })
-            
-            if cartoon.thumbnail:
-                li.setArt({
-                    'thumb': cartoon.thumbnail,
-                    'poster': cartoon.thumbnail,
-                    'fanart': cartoon.thumbnail
-                })
-            
-            li.setProperty('IsPlayable', 'true')
-            
-            xbmcplugin.addDirectoryItem(
-                handle=addon_handle, 
-                url=url, 
-                listitem=li, 
-                isFolder=False
-            )
+        from listing_version import listing_token
+        render_cartoons(
+            addon_handle,
+            addon_url,
+            cartoons,
+            next_page_items(addon_url, f'action=listing&v={listing_token()}', offset, page_size, total)
+        )
         
         # Установить тип контента и вид отображения
         xbmcplugin.setContent(addon_handle, 'movies')
-        xbmcplugin.addSortMethod(addon_handle, xbmcplugin.SORT_METHOD_TITLE)
-        xbmcplugin.addSortMethod(addon_handle, xbmcplugin.SORT_METHOD_UNSORTED)
-        
-        xbmcplugin.endOfDirectory(addon_handle)
+        add_sort_methods(addon_handle, xbmcplugin.SORT_METHOD_TITLE, xbmcplugin.SORT_METHOD_UNSORTED)
         
+        # Адрес списка содержит версию каталога - его можно кэшировать
+        xbmcplugin.endOfDirectory(addon_handle, cacheToDisc=True)
+    
     except Exception as e:
-        # Общая обработка ошибок
+        log_error('Ошибка загрузки каталога', e)
         xbmcgui.Dialog().notification(
             'ArjLover Plugin', 
             'Ошибка загрузки каталога',
@@ -161,106 +190,358 @@ def list_videos():
         xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
 
 
-def play_video(path):
+def add_sort_methods(addon_handle, *methods):
+    """
+    Способы сортировки списка мультфильмов: переданные, затем по
+    длительности и размеру (Kodi сортирует по числам из setInfo).
+    """
+    for method in methods + (xbmcplugin.SORT_METHOD_DURATION, xbmcplugin.SORT_METHOD_SIZE):
+        xbmcplugin.addSortMethod(addon_handle, method)
+
+
+def get_page_size():
+    """Размер страницы списка (0 - показывать всё одним списком)."""
+    from settings import get_int_setting
+    return max(get_int_setting('page_size', 500), 0)
+
+
+def fetch_catalog_data(addon_handle, method, *args):
+    """
+    Получить данные каталога для действия (общий путь всех списков).
+    
+    Запрос к кэшу, а при его отсутствии - загрузка каталога с сайта
+    выполняются в catalog.acquire_catalog.
+    
+    Returns:
+        Результат метода хранилища или None, если сайт недоступен
+        (пользователь уже уведомлён, каталог Kodi закрыт)
+    """
+    from catalog import acquire_catalog
+    
+    try:
+        return acquire_catalog(method, *args)
+    except ConnectionError:
+        xbmcgui.Dialog().notification(
+            'ArjLover Plugin', 
+            'Сайт недоступен. Проверьте подключение к интернету.',
+            xbmcgui.NOTIFICATION_ERROR,
+            5000
+        )
+        xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
+        return None
+
+
+def load_listing_page(addon_handle, offset, page_size, letter=None, duration=None):
+    """
+    Загрузить страницу списка (весь каталог, одну букву или одну
+    группу длительности).
+    
+    При постраничном отображении хранилище отдаёт только нужный срез,
+    не загружая весь каталог.
+    
+    Returns:
+        (мультфильмы, всего записей) или None, если сайт недоступен
+    """
+    if page_size:
+        return fetch_catalog_data(addon_handle, 'load_page', offset, page_size, letter, duration)
+    
+    if letter is not None:
+        cartoons = fetch_catalog_data(addon_handle, 'load_by_letter', letter)
+    elif duration is not None:
+        cartoons = fetch_catalog_data(addon_handle, 'load_by_duration', duration)
+    else:
+        cartoons = fetch_catalog_data(addon_handle, 'load_cache')
+    
+    if cartoons is None:
+        return None
+    return cartoons, len(cartoons)
+
+
+def next_page_items(addon_url, query, offset, page_size, total):
+    """Пункт «Следующая страница» (пустой список, если страница последняя)."""
+    next_offset = offset + page_size
+    if not page_size or next_offset >= total:
+        return []
+    
+    page = next_offset // page_size + 1
+    pages = (total + page_size - 1) // page_size
+    label = f'Следующая страница ({page} из {pages})'
+    
+    url = f'{addon_url}?{query}&offset={next_offset}'
+    li = xbmcgui.ListItem(label)
+    li.setInfo('video', {'title': label})
+    li.setProperty('SpecialSort', 'bottom')
+    return [(url, li, True)]
+
+
+def render_cartoons(addon_handle, addon_url, cartoons, extra_items=()):
+    """
+    Вывести мультфильмы (и дополнительные пункты) в список Kodi.
+    
+    Пункты собираются в кортежи (url, listitem, isFolder) и передаются
+    пачками через addDirectoryItems с totalItems, а не по одному.
+    """
+    with timing.phase('render'):
+        details = load_listing_details()
+        thumbnails = load_listing_thumbnails()
+        total = len(cartoons) + len(extra_items)
+        
+        for start in range(0, len(cartoons), RENDER_BATCH_SIZE):
+            items = [
+                create_cartoon_item(addon_url, cartoon, details, thumbnails) + (False,)
+                for cartoon in cartoons[start:start + RENDER_BATCH_SIZE]
+            ]
+            xbmcplugin.addDirectoryItems(addon_handle, items, total)
+        
+        if extra_items:
+            xbmcplugin.addDirectoryItems(addon_handle, list(extra_items), total)
+        
+        if thumbnails is not None:
+            thumbnails.flush()
+
+
+def load_listing_details():
+    """Загрузить хранилище подробностей, если обогащение включено в настройках."""
+    from settings import get_bool_setting
+    
+    if not get_bool_setting('details_enabled'):
+        return {}
+    
+    from details import load_details
+    return load_details()
+
+
+def load_listing_thumbnails():
+    """Локальные обложки (None, если их кэш выключен в настройках)."""
+    from settings import get_bool_setting
+    
+    if not get_bool_setting('thumbnails_enabled'):
+        return None
+    
+    from thumbnails import ThumbnailLookup
+    return ThumbnailLookup()
+
+
+def create_cartoon_item(addon_url, cartoon, details, thumbnails=None):
+    """
+    Создать ListItem мультфильма.
+    
+    Подробности со страницы мультфильма (форматы, настоящая обложка)
+    берутся только из локального хранилища, без запросов к сайту.
+    Загруженная службой обложка подставляется локальным файлом.
+    """
+    plot = cartoon.plot
+    thumbnail = cartoon.thumbnail
+    
+    entry = details.get(cartoon.info_url)
+    if entry:
+        from details import details_info
+        extra = details_info(entry)
+        plot = '\n'.join(part for part in (plot, extra['plot']) if part)
+        thumbnail = extra['thumbnail'] or thumbnail
+    
+    # Экранированный путь вычислен при построении кэша
+    url = f'{addon_url}?action=play&path={cartoon.play_path}'
+    li = xbmcgui.ListItem(cartoon.title)
+    
+    info = dict(CARTOON_INFO)
+    info['title'] = cartoon.title
+    info['plot'] = plot
+    # Числа, а не строки: по ним работают сортировки Kodi
+    info['duration'] = cartoon.duration_seconds
+    if cartoon.size_bytes:
+        info['size'] = cartoon.size_bytes
+    li.setInfo('video', info)
+    
+    if thumbnail and thumbnails is not None:
+        thumbnail = thumbnails.get(thumbnail)
+    
+    if thumbnail:
+        li.setArt({
+            'thumb': thumbnail,
+            'poster': thumbnail,
+            'fanart': thumbnail
+        })
+    
+    li.setProperty('IsPlayable', 'true')
+    return url, li
+
+
+def play_video(addon_handle, path):
     """Начать воспроизведение видео."""
     try:
         video_url = urllib.parse.unquote(path)
         li = xbmcgui.ListItem(path=video_url)
-        xbmcplugin.setResolvedUrl(int(sys.argv[1]), True, li)
-        
+        xbmcplugin.setResolvedUrl(addon_handle, True, li)
+    
     except Exception as e:
+        log_error('Ошибка воспроизведения', e)
         xbmcgui.Dialog().notification(
             'ArjLover Plugin', 
             'Видео недоступно',
             xbmcgui.NOTIFICATION_ERROR,
             5000
         )
-        xbmcplugin.setResolvedUrl(int(sys.argv[1]), False, xbmcgui.ListItem())
+        xbmcplugin.setResolvedUrl(addon_handle, False, xbmcgui.ListItem())
 
 
-def show_alphabet():
-    """Показать алфавитный указатель."""
-    addon_url = sys.argv[0]
-    addon_handle = int(sys.argv[1])
-    
-    # Русский алфавит + цифры
-    letters = ['0-9'] + list('АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ')
-    
-    for letter in letters:
-        url = f'{addon_url}?action=byletter&letter={urllib.parse.quote(letter)}'
-        li = xbmcgui.ListItem(letter)
-        li.setInfo('video', {'title': letter})
-        xbmcplugin.addDirectoryItem(handle=addon_handle, url=url, listitem=li, isFolder=True)
+def show_alphabet(addon_url, addon_handle):
+    """Показать алфавитный указатель (только непустые буквы, с количеством)."""
+    try:
+        from catalog_parser import letter_sort_key
+        
+        # Количества по буквам хранятся в индексе, каталог целиком не читается
+        counts = fetch_catalog_data(addon_handle, 'letter_counts')
+        if counts is None:
+            return
+        
+        from listing_version import listing_token
+        token = listing_token()
+        with timing.phase('render'):
+            items = []
+            for letter in sorted(counts, key=letter_sort_key):
+                label = f'{letter} ({counts[letter]})'
+                url = f'{addon_url}?action=byletter&letter={urllib.parse.quote(letter)}&v={token}'
+                li = xbmcgui.ListItem(label)
+                li.setInfo('video', {'title': label})
+                items.append((url, li, True))
+            
+            xbmcplugin.addDirectoryItems(addon_handle, items, len(items))
+        xbmcplugin.endOfDirectory(addon_handle, cacheToDisc=True)
     
-    xbmcplugin.endOfDirectory(addon_handle)
+    except Exception as e:
+        log_error('Ошибка алфавитного указателя', e)
+        xbmcgui.Dialog().notification('ArjLover Plugin', 'Ошибка', xbmcgui.NOTIFICATION_ERROR, 5000)
+        xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
 
 
-def list_by_letter(letter):
+def list_by_letter(addon_url, addon_handle, letter, offset=0):
     """Показать мультфильмы на выбранную букву."""
-    addon_url = sys.argv[0]
-    addon_handle = int(sys.argv[1])
-    
     letter = urllib.parse.unquote(letter)
     
     try:
-        sys.path.append(os.path.join(os.path.dirname(__file__), 'resources', 'lib'))
-        from cache import load_cache, save_cache
-        from parser import fetch_catalog, parse_catalog
+        page_size = get_page_size()
+        
+        # Хранилище само выбирает записи на букву (SQLite - по индексу)
+        page = load_listing_page(addon_handle, offset, page_size, letter)
+        if page is None:
+            return
         
-        cartoons = load_cache()
+        results, total = page
         
-        if cartoons is None:
-            try:
-                base_url = 'https://multiki.arjlover.net/multiki/'
-                html = fetch_catalog(base_url)
-                cartoons = parse_catalog(html, base_url)
-                save_cache(cartoons)
-            except ConnectionError:
-                xbmcgui.Dialog().notification('ArjLover Plugin', 'Сайт недоступен', xbmcgui.NOTIFICATION_ERROR, 5000)
-                xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
-                return
+        from listing_version import listing_token
+        query = f'action=byletter&letter={urllib.parse.quote(letter)}&v={listing_token()}'
+        render_cartoons(
+            addon_handle,
+            addon_url,
+            results,
+            next_page_items(addon_url, query, offset, page_size, total)
+        )
         
-        # Фильтруем по букве
-        if letter == '0-9':
-            results = [c for c in cartoons if c.title and c.title[0].isdigit()]
-        else:
-            results = [c for c in cartoons if c.title and c.title[0].upper() == letter]
+        xbmcplugin.setContent(addon_handle, 'movies')
+        add_sort_methods(addon_handle, xbmcplugin.SORT_METHOD_TITLE, xbmcplugin.SORT_METHOD_UNSORTED)
+        xbmcplugin.endOfDirectory(addon_handle, cacheToDisc=True)
+    
+    except Exception as e:
+        log_error('Ошибка списка на букву', e)
+        xbmcgui.Dialog().notification('ArjLover Plugin', 'Ошибка', xbmcgui.NOTIFICATION_ERROR, 5000)
+        xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
+
+
+def show_durations(addon_url, addon_handle):
+    """Показать группы по длительности (только непустые, с количеством)."""
+    try:
+        from catalog_parser import DURATION_BUCKETS
         
-        for cartoon in results:
-            url = f'{addon_url}?action=play&path={urllib.parse.quote(cartoon.url)}'
-            li = xbmcgui.ListItem(cartoon.title)
-            
-            li.setInfo('video', {
-                'title': cartoon.title,
-                'genre': 'Мультфильмы',
-                'mediatype': 'movie',
-                'plot': cartoon.plot,
-                'duration': cartoon.duration
-            })
-            
-            if cartoon.thumbnail:
-                li.setArt({
-                    'thumb': cartoon.thumbnail,
-                    'poster': cartoon.thumbnail,
-                    'fanart': cartoon.thumbnail
-                })
+        # Количества хранятся в индексе групп, каталог целиком не читается
+        counts = fetch_catalog_data(addon_handle, 'duration_counts')
+        if counts is None:
+            return
+        
+        from listing_version import listing_token
+        token = listing_token()
+        with timing.phase('render'):
+            items = []
+            for key, title, _, _ in DURATION_BUCKETS:
+                if not counts.get(key):
+                    continue
+                label = f'{title} ({counts[key]})'
+                url = f'{addon_url}?action=byduration&bucket={key}&v={token}'
+                li = xbmcgui.ListItem(label)
+                li.setInfo('video', {'title': label})
+                items.append((url, li, True))
             
-            li.setProperty('IsPlayable', 'true')
-            xbmcplugin.addDirectoryItem(handle=addon_handle, url=url, listitem=li, isFolder=False)
+            xbmcplugin.addDirectoryItems(addon_handle, items, len(items))
+        xbmcplugin.endOfDirectory(addon_handle, cacheToDisc=True)
+    
+    except Exception as e:
+        log_error('Ошибка групп по длительности', e)
+        xbmcgui.Dialog().notification('ArjLover Plugin', 'Ошибка', xbmcgui.NOTIFICATION_ERROR, 5000)
+        xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
+
+
+def list_by_duration(addon_url, addon_handle, bucket, offset=0):
+    """Показать мультфильмы из группы длительности (short, medium, long)."""
+    try:
+        page_size = get_page_size()
+        
+        # Хранилище само выбирает записи группы (SQLite - по индексу)
+        page = load_listing_page(addon_handle, offset, page_size, duration=bucket)
+        if page is None:
+            return
+        
+        results, total = page
+        
+        from listing_version import listing_token
+        query = f'action=byduration&bucket={bucket}&v={listing_token()}'
+        render_cartoons(
+            addon_handle,
+            addon_url,
+            results,
+            next_page_items(addon_url, query, offset, page_size, total)
+        )
         
         xbmcplugin.setContent(addon_handle, 'movies')
-        xbmcplugin.endOfDirectory(addon_handle)
+        add_sort_methods(addon_handle, xbmcplugin.SORT_METHOD_TITLE, xbmcplugin.SORT_METHOD_UNSORTED)
+        xbmcplugin.endOfDirectory(addon_handle, cacheToDisc=True)
+    
+    except Exception as e:
+        log_error('Ошибка списка по длительности', e)
+        xbmcgui.Dialog().notification('ArjLover Plugin', 'Ошибка', xbmcgui.NOTIFICATION_ERROR, 5000)
+        xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
+
+
+def list_new_arrivals(addon_url, addon_handle):
+    """Показать мультфильмы, появившиеся при последних обновлениях каталога."""
+    try:
+        # Список хранится отдельно от каталога - кэш целиком не читается
+        from changes import load_new_arrivals
+        cartoons = load_new_arrivals()
+        
+        if not cartoons:
+            xbmcgui.Dialog().notification(
+                'ArjLover Plugin', 
+                'Новых поступлений пока нет',
+                xbmcgui.NOTIFICATION_INFO,
+                3000
+            )
+            xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
+            return
         
+        render_cartoons(addon_handle, addon_url, cartoons)
+        
+        xbmcplugin.setContent(addon_handle, 'movies')
+        add_sort_methods(addon_handle, xbmcplugin.SORT_METHOD_UNSORTED, xbmcplugin.SORT_METHOD_TITLE)
+        xbmcplugin.endOfDirectory(addon_handle, cacheToDisc=True)
+    
     except Exception as e:
+        log_error('Ошибка новых поступлений', e)
         xbmcgui.Dialog().notification('ArjLover Plugin', 'Ошибка', xbmcgui.NOTIFICATION_ERROR, 5000)
         xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
 
 
-def search_videos():
+def search_videos(addon_url, addon_handle):
     """Поиск мультфильмов по названию."""
-    addon_url = sys.argv[0]
-    addon_handle = int(sys.argv[1])
-    
     # Показать диалог ввода
     keyboard = xbmcgui.Dialog()
     query = keyboard.input('Поиск мультфильмов', type=xbmcgui.INPUT_ALPHANUM)
@@ -269,33 +550,11 @@ def search_videos():
         xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
         return
     
-    query_lower = query.lower()
-    
     try:
-        sys.path.append(os.path.join(os.path.dirname(__file__), 'resources', 'lib'))
-        from cache import load_cache, save_cache
-        from parser import fetch_catalog, parse_catalog
-        
-        cartoons = load_cache()
-        
-        if cartoons is None:
-            try:
-                base_url = 'https://multiki.arjlover.net/multiki/'
-                html = fetch_catalog(base_url)
-                cartoons = parse_catalog(html, base_url)
-                save_cache(cartoons)
-            except ConnectionError:
-                xbmcgui.Dialog().notification(
-                    'ArjLover Plugin', 
-                    'Сайт недоступен',
-                    xbmcgui.NOTIFICATION_ERROR,
-                    5000
-                )
-                xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
-                return
-        
-        # Фильтруем по запросу
-        results = [c for c in cartoons if query_lower in c.title.lower()]
+        # Хранилище ищет по заранее построенному триграммному индексу
+        results = fetch_catalog_data(addon_handle, 'search_cartoons', query)
+        if results is None:
+            return
         
         if not results:
             xbmcgui.Dialog().notification(
@@ -307,37 +566,13 @@ def search_videos():
             xbmcplugin.endOfDirectory(addon_handle, succeeded=False)
             return
         
-        # Показать результаты
-        for cartoon in results:
-            url = f'{addon_url}?action=play&path={urllib.parse.quote(cartoon.url)}'
-            li = xbmcgui.ListItem(cartoon.title)
-            
-            li.setInfo('video', {
-                'title': cartoon.title,
-                'genre': 'Мультфильмы',
-                'mediatype': 'movie',
-                'plot': cartoon.plot,
-                'duration': cartoon.duration
-            })
-            
-            if cartoon.thumbnail:
-                li.setArt({
-                    'thumb': cartoon.thumbnail,
-                    'poster': cartoon.thumbnail,
-                    'fanart': cartoon.thumbnail
-                })
-            
-            li.setProperty('IsPlayable', 'true')
-            
-            xbmcplugin.addDirectoryItem(
-                handle=addon_handle, 
-                url=url, 
-                listitem=li, 
-                isFolder=False
-            )
+        # Показать результаты. Адрес поиска не зависит от запроса - кэш
+        # Kodi показал бы прошлые результаты вместо диалога ввода
+        render_cartoons(addon_handle, addon_url, results)
         
         xbmcplugin.setContent(addon_handle, 'movies')
-        xbmcplugin.endOfDirectory(addon_handle)
+        add_sort_methods(addon_handle, xbmcplugin.SORT_METHOD_UNSORTED, xbmcplugin.SORT_METHOD_TITLE)
+        xbmcplugin.endOfDirectory(addon_handle, cacheToDisc=False)
         
         xbmcgui.Dialog().notification(
             'ArjLover Plugin', 
@@ -345,8 +580,9 @@ def search_videos():
             xbmcgui.NOTIFICATION_INFO,
             2000
         )
-        
+    
     except Exception as e:
+        log_error('Ошибка поиска', e)
         xbmcgui.Dialog().notification(
             'ArjLover Plugin', 
             'Ошибка поиска',
@@ -359,24 +595,27 @@ def search_videos():
 def refresh_cache():
     """Принудительно обновить кэш каталога."""
     try:
-        sys.path.append(os.path.join(os.path.dirname(__file__), 'resources', 'lib'))
-        from cache import clear_cache, save_cache
-        from parser import fetch_catalog, parse_catalog
+        from catalog import get_storage, refresh_catalog
+        from net import reset_breaker
         
-        clear_cache()
+        # Пользователь явно просит обновить каталог - пробуем сеть,
+        # даже если предохранитель после недавних ошибок ещё не остыл
+        reset_breaker()
         
-        base_url = 'https://multiki.arjlover.net/multiki/'
-        html = fetch_catalog(base_url)
-        cartoons = parse_catalog(html, base_url)
-        save_cache(cartoons)
+        # Условный запрос: если каталог на сайте не менялся, кэш только продлевается
+        storage = get_storage()
+        downloaded = refresh_catalog(storage, force=True)
         
+        # Количество берётся из индекса букв, каталог целиком не читается
+        total = sum((storage.letter_counts(allow_stale=True) or {}).values())
+        status = 'обновлен' if downloaded else 'не изменился'
         xbmcgui.Dialog().notification(
             'ArjLover Plugin', 
-            f'Каталог обновлен: {len(cartoons)} мультфильмов',
+            f'Каталог {status}: {total} мультфильмов',
             xbmcgui.NOTIFICATION_INFO,
             3000
         )
-        
+    
     except ConnectionError:
         xbmcgui.Dialog().notification(
             'ArjLover Plugin', 
@@ -384,7 +623,8 @@ def refresh_cache():
             xbmcgui.NOTIFICATION_ERROR,
             5000
         )
-    except Exception:
+    except Exception as e:
+        log_error('Ошибка обновления каталога', e)
         xbmcgui.Dialog().notification(
             'ArjLover Plugin', 
             'Ошибка обновления',
@@ -394,4 +634,4 @@ def refresh_cache():
 
 
 if __name__ == '__main__':
-    router(sys.argv[2][1:])
\ No newline at end of file
+    router(sys.argv[0], int(sys.argv[1]), sys.argv[2][1:])
\ No newline at end of file
@@ -1,149 +1,748 @@
+import itertools
 import json
 import os
+import struct
+import zlib
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 
 try:
-    from .parser import Cartoon
+    from .catalog_parser import Cartoon, duration_bucket, title_letter
+    from .settings import get_data_dir, get_int_setting, get_setting
+    from .locking import atomic_write
+    from . import search
 except ImportError:
     # Fallback for testing
-    from parser import Cartoon
+    from catalog_parser import Cartoon, duration_bucket, title_letter
+    from settings import get_data_dir, get_int_setting, get_setting
+    from locking import atomic_write
+    import search
 
 CACHE_DURATION_HOURS = 24
 
+# Версия формата файла кэша. Файл начинается с заголовка фиксированного
+# размера (JSON, дополненный пробелами), за которым построчно идут записи.
+# Заголовок можно проверить, не читая тело каталога.
+CACHE_VERSION = 5
+HEADER_SIZE = 512
+
+# Кодирование тела кэша: json - строки JSON подряд, zlib - сжатые блоки
+# строк с префиксом длины (меньше записей на флеш-память ТВ-приставок)
+ENCODINGS = ('json', 'zlib')
+DEFAULT_ENCODING = 'zlib'
+BLOCK_RECORDS = 256
+ZLIB_LEVEL = 6
+_BLOCK_LENGTH = struct.Struct('>I')
+
+# Начало файла кэша прежнего формата (json.dump с indent=2)
+_LEGACY_PREFIX = b'{\n'
+
+# Каталог, уже загруженный в этом процессе. При reuselanguageinvoker модуль
+# живёт между переходами по меню, и пока поколение кэша в заголовке и размер
+# файла не изменились, записи берутся из памяти, а не читаются с диска заново.
+# Ключи: key, cartoons, letters и durations (группа -> номера записей), search.
+_memo = {}
+
+# Группировки каталога для указателей: вид -> ключ группы записи (None -
+# запись не входит ни в одну группу)
+_GROUP_KEYS = {
+    'letters': lambda cartoon: title_letter(cartoon.title),
+    'durations': lambda cartoon: duration_bucket(cartoon.duration_seconds),
+}
+
 
 def get_cache_path() -> str:
     """Получить путь к файлу кэша в userdata плагина."""
+    return os.path.join(get_data_dir(), 'catalog_cache.json')
+
+
+def get_search_index_path() -> str:
+    """Получить путь к файлу поискового индекса."""
+    return os.path.join(get_data_dir(), 'search_index.json')
+
+
+def get_letter_index_path() -> str:
+    """Получить путь к файлу индекса групп (по буквам и по длительности)."""
+    return os.path.join(get_data_dir(), 'letter_index.json')
+
+
+def _encode_header(header: dict) -> bytes:
+    """Сериализовать заголовок в блок ровно из HEADER_SIZE байт."""
+    raw = json.dumps(header, ensure_ascii=True).encode('ascii')
+    if len(raw) >= HEADER_SIZE:
+        raise ValueError('Заголовок кэша не помещается в HEADER_SIZE')
+    return raw.ljust(HEADER_SIZE - 1) + b'\n'
+
+
+def _decode_header(block: bytes) -> Optional[dict]:
+    """Разобрать блок заголовка. Вернуть None для чужого или старого формата."""
+    if len(block) != HEADER_SIZE:
+        return None
+    
     try:
-        # Попытка использовать Kodi API для получения пути userdata
-        import xbmcvfs
-        import xbmcaddon
-        
-        addon = xbmcaddon.Addon()
-        addon_id = addon.getAddonInfo('id')
-        userdata_path = xbmcvfs.translatePath(f'special://userdata/addon_data/{addon_id}/')
-        
-        # Создать директорию если не существует
-        if not xbmcvfs.exists(userdata_path):
-            xbmcvfs.mkdirs(userdata_path)
-        
-        return os.path.join(userdata_path, 'catalog_cache.json')
+        header = json.loads(block.decode('ascii'))
+    except (UnicodeDecodeError, ValueError):
+        return None
     
-    except ImportError:
-        # Fallback для тестирования без Kodi
-        cache_dir = os.path.expanduser('~/.kodi_arjlover_cache')
-        os.makedirs(cache_dir, exist_ok=True)
-        return os.path.join(cache_dir, 'catalog_cache.json')
-
-
-def save_cache(cartoons: List[Cartoon]) -> None:
-    """Сохранить список мультфильмов в кэш."""
-    cache_path = get_cache_path()
-    
-    cache_data = {
-        'timestamp': datetime.now().isoformat(),
-        'cartoons': [
-            {
-                'title': cartoon.title,
-                'url': cartoon.url,
-                'extension': cartoon.extension,
-                'thumbnail': cartoon.thumbnail,
-                'info_url': cartoon.info_url,
-                'duration': cartoon.duration,
-                'plot': cartoon.plot
-            }
-            for cartoon in cartoons
+    if not isinstance(header, dict) or header.get('version') != CACHE_VERSION:
+        return None
+    
+    return header
+
+
+def get_cache_duration() -> timedelta:
+    """Срок жизни кэша из настроек (по умолчанию CACHE_DURATION_HOURS)."""
+    return timedelta(hours=max(1, get_int_setting('cache_hours', CACHE_DURATION_HOURS)))
+
+
+def _is_header_fresh(header: dict) -> bool:
+    """Проверить, не истёк ли срок жизни кэша по заголовку."""
+    try:
+        cache_time = datetime.fromisoformat(header['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return False
+    
+    return datetime.now() - cache_time < get_cache_duration()
+
+
+def _open_cache() -> Tuple[BinaryIO, Optional[dict]]:
+    """
+    Открыть файл кэша и прочитать заголовок.
+    
+    Кэш прежнего формата (один JSON-объект с отступами) прозрачно
+    преобразуется в текущий при первом чтении.
+    
+    Returns:
+        (открытый файл, заголовок или None для неподдерживаемого формата)
+    
+    Raises:
+        FileNotFoundError: если кэша нет
+    """
+    f = open(get_cache_path(), 'rb')
+    block = f.read(HEADER_SIZE)
+    header = _decode_header(block)
+    
+    if header is None and block.startswith(_LEGACY_PREFIX):
+        f.close()
+        _migrate_legacy_cache()
+        f = open(get_cache_path(), 'rb')
+        header = _decode_header(f.read(HEADER_SIZE))
+    
+    return f, header
+
+
+def _migrate_legacy_cache() -> None:
+    """Переписать кэш прежнего JSON-формата в текущий, сохранив его timestamp."""
+    try:
+        with open(get_cache_path(), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        timestamp = data['timestamp']
+        datetime.fromisoformat(timestamp)
+        cartoons = [
+            Cartoon(
+                title=item['title'],
+                url=item['url'],
+                extension=item.get('extension'),
+                thumbnail=item.get('thumbnail'),
+                info_url=item.get('info_url', ''),
+                duration=item.get('duration', ''),
+                plot=item.get('plot')
+            )
+            for item in data['cartoons']
         ]
+    except (OSError, IOError, ValueError, KeyError, TypeError, AttributeError) as e:
+        _log_read_error(e)
+        return
+    
+    _write_cache(cartoons, timestamp, encoding=get_cache_encoding())
+
+
+def read_cache_header() -> Optional[dict]:
+    """
+    Прочитать только заголовок файла кэша.
+    
+    Returns:
+        Словарь с полями version, timestamp, count или None,
+        если файла нет или он в неподдерживаемом формате
+    """
+    try:
+        f, header = _open_cache()
+        f.close()
+        return header
+    except (OSError, IOError):
+        return None
+
+
+def get_generation() -> str:
+    """Поколение кэша: меняется при каждой перезаписи каталога ('' - кэша нет)."""
+    header = read_cache_header()
+    return header.get('generation', '') if header else ''
+
+
+def get_validators() -> Dict[str, str]:
+    """
+    Валидаторы HTTP (ETag/Last-Modified) сохранённого каталога.
+    
+    Возвращаются и для устаревшего кэша: по ним сервер может ответить 304.
+    """
+    header = read_cache_header() or {}
+    return {
+        'etag': header.get('etag', ''),
+        'last_modified': header.get('last_modified', '')
     }
+
+
+def touch_cache(etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+    """
+    Продлить срок жизни кэша без перезаписи каталога.
     
+    Используется при ответе 304 и когда загруженный каталог не изменился
+    (тогда заодно сохраняются новые валидаторы ответа). Тело каталога
+    копируется байт в байт без разбора, а файл заменяется целиком через
+    atomic_write: запись заголовка на месте могла оборваться посередине и
+    оставить кэш без читаемого заголовка. Вызывающий держит блокировку
+    обновления, поэтому параллельный save_cache не вклинится между чтением
+    и заменой.
+    
+    Returns:
+        True если кэш существует и его заголовок обновлён
+    """
+    path = get_cache_path()
     try:
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
-    except (OSError, IOError) as e:
+        with open(path, 'rb') as f:
+            header = _decode_header(f.read(HEADER_SIZE))
+            if header is None:
+                return False
+            body = f.read()
+        header['timestamp'] = datetime.now().isoformat()
+        if etag is not None:
+            header['etag'] = etag
+        if last_modified is not None:
+            header['last_modified'] = last_modified
+        atomic_write(path, _encode_header(header) + body)
+        return True
+    except (OSError, IOError, ValueError) as e:
         try:
             import xbmc
-            xbmc.log(f"ArjLover: Не удалось сохранить кэш: {e}", xbmc.LOGWARNING)
+            xbmc.log(f"ArjLover: Не удалось продлить кэш: {e}", xbmc.LOGWARNING)
         except ImportError:
-            print(f"Warning: Не удалось сохранить кэш: {e}")
+            print(f"Warning: Не удалось продлить кэш: {e}")
+        return False
 
 
-def load_cache() -> Optional[List[Cartoon]]:
-    """Загрузить список мультфильмов из кэша."""
-    if not is_cache_valid():
-        return None
+def get_cache_encoding() -> str:
+    """Кодирование тела кэша из настроек: 'json' или 'zlib'."""
+    encoding = get_setting('cache_encoding', DEFAULT_ENCODING)
+    return encoding if encoding in ENCODINGS else DEFAULT_ENCODING
+
+
+def save_cache(cartoons: List[Cartoon], etag: str = '', last_modified: str = '',
+               encoding: Optional[str] = None) -> bool:
+    """
+    Сохранить список мультфильмов в кэш вместе с валидаторами HTTP.
     
-    cache_path = get_cache_path()
+    Args:
+        encoding: кодирование тела ('json' или 'zlib'), по умолчанию из настроек
+    
+    Returns:
+        True, если кэш записан (ошибка записи только логируется)
+    """
+    return _write_cache(cartoons, datetime.now().isoformat(), etag, last_modified,
+                        encoding or get_cache_encoding())
+
+
+def _write_cache(cartoons: List[Cartoon], timestamp: str, etag: str = '',
+                 last_modified: str = '', encoding: str = DEFAULT_ENCODING) -> bool:
+    header = {
+        'version': CACHE_VERSION,
+        'timestamp': timestamp,
+        # Поколение кэша меняется только при перезаписи (не в touch_cache),
+        # к нему привязаны поисковый и алфавитный индексы
+        'generation': datetime.now().isoformat(),
+        'count': len(cartoons),
+        'encoding': encoding,
+        'etag': etag,
+        'last_modified': last_modified
+    }
+    if encoding == 'zlib':
+        header['block'] = BLOCK_RECORDS
+    
+    # Общие префиксы URL хранятся в заголовке, записи ссылаются на них номерами
+    prefix_ids = {}
+    records = [cartoon.to_record(prefix_ids) for cartoon in cartoons]
+    header['prefixes'] = sorted(prefix_ids, key=prefix_ids.get)
     
     try:
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
-        
-        cartoons = []
-        for c in cache_data.get('cartoons', []):
-            cartoon = Cartoon(
-                title=c['title'],
-                url=c['url'],
-                extension=c['extension'],
-                thumbnail=c['thumbnail'],
-                info_url=c.get('info_url', ''),
-                duration=c.get('duration', ''),
-                plot=c.get('plot', '')
-            )
-            cartoons.append(cartoon)
-        
-        return cartoons
+        _encode_header(header)
+    except ValueError:
+        # Слишком длинные валидаторы не храним: кэш просто не будет условным
+        header['etag'] = header['last_modified'] = ''
+    
+    try:
+        _encode_header(header)
+    except ValueError:
+        # Префиксы не поместились - записи хранят их целиком
+        header['prefixes'] = []
+        records = [cartoon.to_record() for cartoon in cartoons]
+    
+    body, positions = _encode_body([_encode_record(record) for record in records], encoding)
     
-    except (OSError, IOError, json.JSONDecodeError, KeyError) as e:
+    # Индекс групп: буква (группа длительности) -> позиции записей в теле кэша
+    groups = {kind: {} for kind in _GROUP_KEYS}
+    for cartoon, position in zip(cartoons, positions):
+        for kind, group_key in _GROUP_KEYS.items():
+            key = group_key(cartoon)
+            if key is not None:
+                groups[kind].setdefault(key, []).append(position)
+    
+    try:
+        # Поисковый и алфавитный индексы строятся вместе с кэшем и привязаны
+        # к нему по поколению. Все файлы пишутся атомарно: читатель видит либо
+        # старую, либо новую версию, а при несовпадении поколения индекс
+        # перестраивается в памяти.
+        index = search.build_index(cartoon.title for cartoon in cartoons)
+        index['generation'] = header['generation']
+        # Позиции записей в теле: холодный поиск читает только найденные
+        index['positions'] = positions
+        atomic_write(
+            get_search_index_path(),
+            json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        )
+        atomic_write(
+            get_letter_index_path(),
+            json.dumps(
+                dict(groups, generation=header['generation']),
+                ensure_ascii=False,
+                separators=(',', ':')
+            ).encode('utf-8')
+        )
+        
+        data = _encode_header(header) + body
+        atomic_write(get_cache_path(), data)
+        _remember((header['generation'], len(data)), list(cartoons))
+    except (OSError, IOError) as e:
         try:
             import xbmc
-            xbmc.log(f"ArjLover: Ошибка чтения кэша: {e}", xbmc.LOGWARNING)
+            xbmc.log(f"ArjLover: Не удалось сохранить кэш: {e}", xbmc.LOGWARNING)
         except ImportError:
-            print(f"Warning: Ошибка чтения кэша: {e}")
-        return None
+            print(f"Warning: Не удалось сохранить кэш: {e}")
+        return False
+    return True
 
 
-def is_cache_valid() -> bool:
+def _encode_body(lines: List[bytes], encoding: str) -> Tuple[bytes, List[int]]:
     """
-    Проверить валидность кэша (не истёк ли срок).
+    Собрать тело кэша из строк записей.
+    
+    json: строки подряд, позиция записи - её смещение в файле.
+    zlib: блоки по BLOCK_RECORDS строк, каждый сжат zlib и предварён
+    длиной (4 байта, big-endian); позиция записи - её номер.
     
     Returns:
-        True если кэш существует и не старше CACHE_DURATION_HOURS
+        (тело, позиции записей для алфавитного индекса)
     """
-    cache_path = get_cache_path()
+    if encoding == 'zlib':
+        blocks = []
+        for start in range(0, len(lines), BLOCK_RECORDS):
+            data = zlib.compress(b''.join(lines[start:start + BLOCK_RECORDS]), ZLIB_LEVEL)
+            blocks.append(_BLOCK_LENGTH.pack(len(data)) + data)
+        return b''.join(blocks), list(range(len(lines)))
     
-    # Проверить существование файла
-    if not os.path.exists(cache_path):
-        return False
+    positions = []
+    position = HEADER_SIZE
+    for line in lines:
+        positions.append(position)
+        position += len(line)
+    return b''.join(lines), positions
+
+
+def _iter_blocks(f: BinaryIO, wanted: Optional[set] = None) -> Iterator[Tuple[int, List[bytes]]]:
+    """
+    Прочитать блоки zlib-тела: (номер блока, строки записей).
+    
+    Блоки не из wanted пропускаются по длине без чтения и распаковки.
+    """
+    number = 0
+    while True:
+        prefix = f.read(_BLOCK_LENGTH.size)
+        if not prefix:
+            return
+        if len(prefix) != _BLOCK_LENGTH.size:
+            raise ValueError('Обрезанный блок кэша')
+        size, = _BLOCK_LENGTH.unpack(prefix)
+        
+        if wanted is None or number in wanted:
+            data = f.read(size)
+            if len(data) != size:
+                raise ValueError('Обрезанный блок кэша')
+            yield number, zlib.decompress(data).split(b'\n')[:-1]
+        else:
+            f.seek(size, os.SEEK_CUR)
+        
+        number += 1
+
+
+def _read_body(f: BinaryIO, header: dict) -> List[bytes]:
+    """Прочитать все строки записей тела (файл - сразу после заголовка)."""
+    if header.get('encoding') == 'zlib':
+        return [line for _, lines in _iter_blocks(f) for line in lines]
+    
+    # Разбиваем только по '\n': json.dumps экранирует его внутри строк,
+    # а прочие разделители строк (U+2028 и т.п.) могут встретиться в данных
+    return f.read().split(b'\n')[:-1]
+
+
+def _read_positions(f: BinaryIO, header: dict, positions: List[int]) -> List[bytes]:
+    """Прочитать строки записей по позициям (смещениям или номерам записей)."""
+    if header.get('encoding') != 'zlib':
+        lines = []
+        for position in positions:
+            f.seek(position)
+            lines.append(f.readline())
+        return lines
+    
+    block_records = header['block']
+    wanted = {position // block_records for position in positions}
+    blocks = dict(_iter_blocks(f, wanted)) if wanted else {}
+    return [blocks[position // block_records][position % block_records] for position in positions]
+
+
+def load_cache(allow_stale: bool = False) -> Optional[List[Cartoon]]:
+    """
+    Загрузить список мультфильмов из кэша.
+    
+    Args:
+        allow_stale: вернуть каталог и после истечения срока жизни кэша
+    """
+    loaded = _read_cache(allow_stale)
+    return loaded[1] if loaded is not None else None
+
+
+def _read_cache(allow_stale: bool = False) -> Optional[Tuple[dict, List[Cartoon]]]:
+    """Прочитать заголовок и записи кэша.
     
+    Файл открывается один раз: сначала проверяется заголовок,
+    затем тело читается и декодируется единожды.
+    """
     try:
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
+        f, header = _open_cache()
+        with f:
+            if header is None or not (allow_stale or _is_header_fresh(header)):
+                return None
+            key = _memo_key(header, f)
+            if _memo.get('key') == key:
+                return header, _memo['cartoons']
+            lines = _read_body(f, header)
         
-        # Получить timestamp из кэша
-        timestamp_str = cache_data.get('timestamp')
-        if not timestamp_str:
-            return False
+        prefixes = header.get('prefixes', [])
+        cartoons = [_decode_record(line, prefixes) for line in lines]
         
-        # Парсить timestamp
-        cache_time = datetime.fromisoformat(timestamp_str)
-        current_time = datetime.now()
+        if len(cartoons) != header.get('count'):
+            raise ValueError('Количество записей не совпадает с заголовком')
         
-        # Проверить, не истёк ли срок
-        time_diff = current_time - cache_time
-        return time_diff < timedelta(hours=CACHE_DURATION_HOURS)
+        _remember(key, cartoons)
+        return header, cartoons
     
-    except (OSError, IOError, json.JSONDecodeError, ValueError, KeyError):
-        # Любая ошибка означает невалидный кэш
-        return False
+    except FileNotFoundError:
+        return None
+    except (OSError, IOError, UnicodeDecodeError, ValueError, TypeError,
+            KeyError, IndexError, zlib.error) as e:
+        _log_read_error(e)
+        return None
 
 
-def clear_cache() -> None:
-    """Удалить файл кэша."""
-    cache_path = get_cache_path()
+def _memo_key(header: dict, f: BinaryIO) -> tuple:
+    """Ключ каталога в памяти: поколение кэша и размер открытого файла."""
+    return header.get('generation'), os.fstat(f.fileno()).st_size
+
+
+def _memo_cartoons(header: dict, f: BinaryIO) -> Optional[List[Cartoon]]:
+    """Каталог из памяти процесса, если файл кэша с тех пор не менялся."""
+    if _memo.get('key') != _memo_key(header, f):
+        return None
+    return _memo['cartoons']
+
+
+def _memo_groups(kind: str) -> Dict[str, List[int]]:
+    """Номера записей каталога из памяти по группам (строятся при первом запросе)."""
+    groups = _memo.get(kind)
+    if groups is None:
+        groups = {}
+        group_key = _GROUP_KEYS[kind]
+        for number, cartoon in enumerate(_memo['cartoons']):
+            key = group_key(cartoon)
+            if key is not None:
+                groups.setdefault(key, []).append(number)
+        _memo[kind] = groups
+    return groups
+
+
+def _remember(key: tuple, cartoons: List[Cartoon]) -> None:
+    """Запомнить каталог в памяти процесса (список не должен изменяться)."""
+    _memo.clear()
+    _memo['key'] = key
+    _memo['cartoons'] = cartoons
+
+
+def _encode_record(record: list) -> bytes:
+    """Закодировать запись Cartoon.to_record в строку тела кэша."""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def _decode_record(line: bytes, prefixes: List[str]) -> Cartoon:
+    """Декодировать одну строку тела кэша."""
+    return Cartoon.from_record(json.loads(line.decode('utf-8')), prefixes)
+
+
+def _log_read_error(error: Exception) -> None:
+    try:
+        import xbmc
+        xbmc.log(f"ArjLover: Ошибка чтения кэша: {error}", xbmc.LOGWARNING)
+    except ImportError:
+        print(f"Warning: Ошибка чтения кэша: {error}")
+
+
+def load_page(offset: int, limit: int, letter: Optional[str] = None,
+              duration: Optional[str] = None,
+              allow_stale: bool = False) -> Optional[Tuple[List[Cartoon], int]]:
+    """
+    Загрузить одну страницу каталога (буквы или группы длительности).
+    
+    Для всего каталога декодируются только записи страницы: предыдущие
+    строки (или сжатые блоки) пропускаются без разбора, общее число
+    берётся из заголовка. Страница буквы (группы) читается по позициям
+    из индекса групп.
+    
+    Returns:
+        (мультфильмы страницы, всего записей) или None, если кэша нет
+    """
+    if letter is not None:
+        return _read_group('letters', letter, allow_stale, offset, offset + limit)
+    if duration is not None:
+        return _read_group('durations', duration, allow_stale, offset, offset + limit)
+    
+    try:
+        f, header = _open_cache()
+        with f:
+            if header is None or not (allow_stale or _is_header_fresh(header)):
+                return None
+            
+            cartoons = _memo_cartoons(header, f)
+            if cartoons is not None:
+                return cartoons[offset:offset + limit], len(cartoons)
+            
+            if header.get('encoding') == 'zlib':
+                positions = list(range(offset, min(offset + limit, header['count'])))
+                lines = _read_positions(f, header, positions)
+            else:
+                lines = list(itertools.islice(f, offset, offset + limit))
+        
+        page = [_decode_record(line, header['prefixes']) for line in lines]
+        return page, header['count']
     
+    except FileNotFoundError:
+        return None
+    except (OSError, IOError, UnicodeDecodeError, ValueError, TypeError,
+            KeyError, IndexError, zlib.error) as e:
+        _log_read_error(e)
+        return None
+
+
+def load_by_letter(letter: str, allow_stale: bool = False) -> Optional[List[Cartoon]]:
+    """Загрузить мультфильмы, название которых начинается на букву."""
+    loaded = _read_group('letters', letter, allow_stale)
+    return loaded[0] if loaded is not None else None
+
+
+def load_by_duration(duration: str, allow_stale: bool = False) -> Optional[List[Cartoon]]:
+    """Загрузить мультфильмы группы длительности (ключ из catalog_parser.DURATION_BUCKETS)."""
+    loaded = _read_group('durations', duration, allow_stale)
+    return loaded[0] if loaded is not None else None
+
+
+def letter_counts(allow_stale: bool = False) -> Optional[Dict[str, int]]:
+    """
+    Количество мультфильмов на каждую букву (только непустые буквы).
+    
+    Берётся из индекса групп, тело каталога не читается.
+    """
+    return _group_counts('letters', allow_stale)
+
+
+def duration_counts(allow_stale: bool = False) -> Optional[Dict[str, int]]:
+    """Количество мультфильмов в каждой группе длительности (только непустые)."""
+    return _group_counts('durations', allow_stale)
+
+
+def _group_counts(kind: str, allow_stale: bool = False) -> Optional[Dict[str, int]]:
+    try:
+        f, header = _open_cache()
+        with f:
+            if header is None or not (allow_stale or _is_header_fresh(header)):
+                return None
+            if _memo_cartoons(header, f) is not None:
+                return {key: len(numbers) for key, numbers in _memo_groups(kind).items()}
+    except (OSError, IOError):
+        return None
+    
+    groups = _load_group_index(header['generation'], kind)
+    if groups is None:
+        # Индекс потерян или устарел - считаем по каталогу
+        cartoons = load_cache(allow_stale)
+        if cartoons is None:
+            return None
+        counts = Counter(map(_GROUP_KEYS[kind], cartoons))
+        counts.pop(None, None)
+        return dict(counts)
+    
+    return {key: len(positions) for key, positions in groups.items()}
+
+
+def _load_group_index(generation: str, kind: str) -> Optional[Dict[str, List[int]]]:
+    """Загрузить индекс групп вида kind, если он построен для этого поколения кэша."""
+    try:
+        with open(get_letter_index_path(), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, IOError, ValueError):
+        return None
+    
+    if not isinstance(index, dict) or index.get('generation') != generation:
+        return None
+    
+    # Индекс прежней версии без групп длительности - как потерянный
+    return index.get(kind)
+
+
+def _read_group(kind: str, key: str, allow_stale: bool = False, start: int = 0,
+                stop: Optional[int] = None) -> Optional[Tuple[List[Cartoon], int]]:
+    """
+    Прочитать записи группы (срез start:stop) по индексу групп.
+    
+    Returns:
+        (мультфильмы среза, всего в группе) или None, если кэша нет
+    """
+    try:
+        f, header = _open_cache()
+        with f:
+            if header is None or not (allow_stale or _is_header_fresh(header)):
+                return None
+            
+            cartoons = _memo_cartoons(header, f)
+            if cartoons is not None:
+                numbers = _memo_groups(kind).get(key, [])
+                return [cartoons[number] for number in numbers[start:stop]], len(numbers)
+            
+            groups = _load_group_index(header['generation'], kind)
+            if groups is not None:
+                positions = groups.get(key, [])
+                lines = _read_positions(f, header, positions[start:stop])
+                page = [_decode_record(line, header['prefixes']) for line in lines]
+                return page, len(positions)
+    
+    except FileNotFoundError:
+        return None
+    except (OSError, IOError, UnicodeDecodeError, ValueError, TypeError,
+            KeyError, IndexError, zlib.error) as e:
+        _log_read_error(e)
+        return None
+    
+    # Индекс потерян или устарел - фильтруем весь каталог
+    cartoons = load_cache(allow_stale)
+    if cartoons is None:
+        return None
+    
+    group_key = _GROUP_KEYS[kind]
+    selected = [c for c in cartoons if group_key(c) == key]
+    return selected[start:stop], len(selected)
+
+
+def _load_search_index(generation: str) -> Optional[Dict]:
+    """Загрузить поисковый индекс, если он построен для этого поколения кэша."""
+    try:
+        with open(get_search_index_path(), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, IOError, ValueError):
+        return None
+    
+    if not isinstance(index, dict) or index.get('generation') != generation:
+        return None
+    
+    return index
+
+
+def search_cartoons(query: str, allow_stale: bool = False) -> Optional[List[Cartoon]]:
+    """
+    Найти мультфильмы по названию через триграммный индекс.
+    
+    Поиск не зависит от регистра и различия Ё/Е, допускает опечатки;
+    результаты отсортированы по релевантности. Если каталога нет в памяти,
+    поиск идёт по индексу с диска, а декодируются только найденные
+    записи - по позициям, как страницы букв в _read_group.
+    """
+    try:
+        f, header = _open_cache()
+        with f:
+            if header is None or not (allow_stale or _is_header_fresh(header)):
+                return None
+            
+            cartoons = _memo_cartoons(header, f)
+            if cartoons is not None:
+                index = _memo.get('search')
+                if index is None:
+                    index = _load_search_index(header['generation'])
+                if index is None:
+                    # Индекс потерян или устарел - строим его в памяти
+                    index = search.build_index(c.title for c in cartoons)
+                _memo['search'] = index
+                return [cartoons[i] for i in search.search(index, query)]
+            
+            index = _load_search_index(header['generation'])
+            if index is not None and len(index.get('positions', ())) == header.get('count'):
+                positions = index['positions']
+                found = search.search(index, query)
+                lines = _read_positions(f, header, [positions[i] for i in found])
+                return [_decode_record(line, header['prefixes']) for line in lines]
+    
+    except FileNotFoundError:
+        return None
+    except (OSError, IOError, UnicodeDecodeError, ValueError, TypeError,
+            KeyError, IndexError, zlib.error) as e:
+        _log_read_error(e)
+        return None
+    
+    # Индекс потерян или устарел - загружаем каталог и строим индекс в памяти
+    cartoons = load_cache(allow_stale)
+    if cartoons is None:
+        return None
+    
+    index = search.build_index(c.title for c in cartoons)
+    if _memo.get('cartoons') is cartoons:
+        _memo['search'] = index
+    return [cartoons[i] for i in search.search(index, query)]
+
+
+def is_cache_valid() -> bool:
+    """
+    Проверить валидность кэша (не истёк ли срок).
+    
+    Читает только заголовок фиксированного размера, тело каталога
+    не разбирается.
+    
+    Returns:
+        True если кэш существует и не старше срока жизни из настроек
+    """
+    header = read_cache_header()
+    return header is not None and _is_header_fresh(header)
+
+
+def clear_cache() -> None:
+    """Удалить файл кэша и его индексы."""
+    _memo.clear()
     try:
-        if os.path.exists(cache_path):
-            os.remove(cache_path)
+        for path in (get_cache_path(), get_search_index_path(), get_letter_index_path()):
+            if os.path.exists(path):
+                os.remove(path)
     
     except OSError as e:
         try:
@@ -151,4 +750,4 @@ def clear_cache() -> None:
             xbmc.log(f"ArjLover: Не удалось удалить кэш: {e}", xbmc.LOGWARNING)
         except ImportError:
             # Fallback для тестирования
-            print(f"Warning: Не удалось удалить кэш: {e}")
\ No newline at end of file
+            print(f"Warning: Не удалось удалить кэш: {e}")
@@ -0,0 +1,298 @@
+import os
+from typing import List
+
+try:
+    from .settings import get_bool_setting, get_data_dir, get_setting
+    from .catalog_parser import Cartoon, CatalogStream
+    from .locking import FileLock
+    from .timing import phase
+    from . import changes, listing_version
+except ImportError:
+    # Fallback for testing
+    from settings import get_bool_setting, get_data_dir, get_setting
+    from catalog_parser import Cartoon, CatalogStream
+    from locking import FileLock
+    from timing import phase
+    import changes
+    import listing_version
+
+BASE_URL = 'https://multiki.arjlover.net/multiki/'
+
+# Сколько ждать обновления каталога другим процессом, секунд
+REFRESH_LOCK_TIMEOUT = 90
+
+# Сообщение NotifyAll, по которому фоновая служба сразу проверяет кэш
+REFRESH_MESSAGE = 'arjlover.refresh'
+
+# Какая доля записей может исчезнуть из каталога за одно обновление: если
+# больше, загрузка считается неполной (кроме ручного обновления)
+MAX_REMOVED_SHARE = 0.5
+
+
+class IncompleteCatalogError(Exception):
+    """Сайт отдал каталог, из которого пропала большая часть записей."""
+
+
+def get_storage():
+    """
+    Вернуть модуль хранилища каталога, выбранный в настройках.
+    
+    Оба модуля (cache и sqlite_cache) реализуют одинаковый контракт:
+    save_cache, load_cache, load_page, load_by_letter, letter_counts, load_by_duration,
+    duration_counts, search_cartoons, is_cache_valid, clear_cache, get_validators,
+    touch_cache, get_generation.
+    """
+    if get_setting('storage', 'json') == 'sqlite':
+        try:
+            try:
+                from . import sqlite_cache
+            except ImportError:
+                import sqlite_cache
+            return sqlite_cache
+        except ImportError:
+            # sqlite3 может отсутствовать в сборке Python
+            pass
+    
+    try:
+        from . import cache
+    except ImportError:
+        import cache
+    return cache
+
+
+def refresh_catalog(storage, force: bool = False, conditional: bool = True) -> bool:
+    """
+    Обновить кэш каталога с сайта.
+    
+    Обновление выполняется в одном процессе за раз: остальные вызовы
+    плагина ждут на межпроцессной блокировке и затем пользуются уже
+    сохранённым результатом вместо повторной загрузки. Каталог не
+    возвращается: вызывающий сам запрашивает у хранилища то, что ему нужно.
+    
+    Args:
+        storage: модуль хранилища из get_storage()
+        force: загрузить каталог, даже если кэш актуален (ручное обновление)
+        conditional: условный запрос с валидаторами кэша (False - кэш не
+            читается и каталог загружается целиком)
+    
+    Returns:
+        True, если каталог загружен и сохранён; False, если кэш уже был
+        актуален (сервер ответил 304 или каталог обновил другой процесс)
+    
+    Raises:
+        ConnectionError: если сайт недоступен
+        IncompleteCatalogError: если загруженный каталог отклонён (см. _save_catalog)
+    """
+    lock = FileLock(os.path.join(get_data_dir(), 'refresh.lock'))
+    
+    if not lock.acquire(REFRESH_LOCK_TIMEOUT):
+        # Чужое обновление затянулось - остаётся предыдущий снимок, если он есть
+        if not storage.get_generation():
+            raise ConnectionError('Каталог обновляется другим процессом')
+        return False
+    
+    try:
+        if (lock.waited or not force) and conditional:
+            # Пока мы ждали, каталог мог обновить другой процесс
+            with phase('cache_validate'):
+                valid = storage.is_cache_valid()
+            if valid:
+                return False
+        
+        return _download_catalog(storage, allow_shrink=force, conditional=conditional)
+    finally:
+        lock.release()
+
+
+def _download_catalog(storage, allow_shrink: bool = False, conditional: bool = True) -> bool:
+    """
+    Загрузить каталог и сохранить его в хранилище.
+    
+    Запрос условный: если сервер ответил 304, каталог не загружается и
+    не разбирается, а срок жизни кэша просто продлевается.
+    
+    Args:
+        allow_shrink: сохранить каталог, даже если из него исчезла большая
+            часть записей (см. _save_catalog)
+        conditional: использовать валидаторы кэша (False - кэш не читается)
+    
+    Returns:
+        True, если каталог загружен; False, если продлён кэш
+    """
+    validators = storage.get_validators() if conditional else {}
+    
+    with CatalogStream(BASE_URL, **validators) as stream:
+        if not stream.not_modified:
+            # Сеть и распаковка замеряются внутри потока, остаток - разбор
+            with phase('parse'):
+                cartoons = list(stream)
+            _save_catalog(storage, cartoons, stream.etag, stream.last_modified,
+                          reuse_cache=conditional, allow_shrink=allow_shrink)
+            return True
+    
+    with phase('save'):
+        touched = storage.touch_cache()
+    if touched:
+        return False
+    
+    # Кэш пропал за время запроса - загружаем каталог целиком
+    return _download_catalog(storage, allow_shrink, conditional=False)
+
+
+def _save_catalog(storage, cartoons: List[Cartoon], etag: str, last_modified: str,
+                  reuse_cache: bool = True, allow_shrink: bool = False) -> None:
+    """
+    Сохранить загруженный каталог с учётом изменений.
+    
+    Каталог сравнивается с сохранённым состоянием по адресам видео.
+    Если ничего не изменилось (и кэш не повреждён - reuse_cache), кэш и
+    его индексы не перезаписываются, а только продлеваются. Иначе
+    хранилище перезаписывает каталог и его индексы целиком: позиции
+    записей в индексах привязаны к порядку каталога на сайте. В
+    состояние дописываются только изменения (журнал changes), а
+    подробности изменившихся записей сбрасываются. Состояние
+    обновляется, только если хранилище сохранило каталог.
+    
+    Raises:
+        IncompleteCatalogError: если исчезло больше MAX_REMOVED_SHARE записей,
+            а в хранилище есть прежний снимок (и не allow_shrink) -
+            вероятно, каталог загружен не целиком
+    """
+    # Состояние относится к хранилищу, которое его записало: после смены
+    # хранилища в настройках в нём может лежать другой снимок каталога
+    storage_name = storage.__name__.rsplit('.', 1)[-1]
+    
+    with phase('diff'):
+        state = changes.load_state()
+        diff = changes.diff_catalog(cartoons, state)
+    
+    # Отклонять каталог есть смысл, только если вместо него есть что показать
+    known = len(state['entries']) if state else 0
+    if (not allow_shrink and known and len(diff.removed) > known * MAX_REMOVED_SHARE
+            and reuse_cache and storage.get_generation()):
+        raise IncompleteCatalogError(
+            f'Каталог на сайте уменьшился с {known} до {len(cartoons)} записей, '
+            'оставлен прежний снимок'
+        )
+    
+    if diff.is_empty and reuse_cache and state.get('storage') == storage_name:
+        with phase('save'):
+            if storage.touch_cache(etag=etag, last_modified=last_modified):
+                return
+    
+    with phase('save'):
+        if not storage.save_cache(cartoons, etag=etag, last_modified=last_modified):
+            # Ошибка записана хранилищем; состояние должно описывать
+            # сохранённый каталог, поэтому оно не меняется
+            return
+        changes.record_changes(cartoons, diff, state, storage_name)
+        # Новая версия списков: кэш Kodi со старыми адресами не используется
+        listing_version.bump('catalog', f'{storage_name}:{storage.get_generation()}')
+    
+    if not (diff.initial or diff.is_empty):
+        _log_info(f'Каталог изменился: {diff.summary()}')
+    
+    if diff.changed or diff.removed:
+        try:
+            from . import details
+        except ImportError:
+            import details
+        details.forget(
+            {cartoons[i].info_url for i in diff.changed},
+            keep={cartoon.info_url for cartoon in cartoons}
+        )
+
+
+def _log_info(message: str) -> None:
+    try:
+        import xbmc
+        xbmc.log(f"ArjLover: {message}", xbmc.LOGINFO)
+    except ImportError:
+        print(f"Info: {message}")
+
+
+def request_background_refresh() -> None:
+    """Попросить фоновую службу обновить каталог, не дожидаясь расписания."""
+    try:
+        import xbmc
+        xbmc.executebuiltin(f'NotifyAll(plugin.video.arjlover,{REFRESH_MESSAGE})')
+    except ImportError:
+        # Вне Kodi фоновой службы нет
+        pass
+
+
+def query_catalog(storage, method: str, *args):
+    """
+    Выполнить запрос к хранилищу в режиме stale-while-revalidate.
+    
+    Если режим включён (и работает фоновая служба), устаревший кэш
+    отдаётся сразу, а обновление поручается службе. Ждать сеть
+    приходится только при полностью пустом кэше.
+    
+    Args:
+        storage: модуль хранилища из get_storage()
+        method: имя метода хранилища (load_cache, load_by_letter, ...)
+    
+    Returns:
+        Результат запроса или None, если каталог нужно загрузить с сайта
+    """
+    allow_stale = (get_bool_setting('stale_while_revalidate', True)
+                   and get_bool_setting('background_refresh', True))
+    
+    with phase('cache_load'):
+        results = getattr(storage, method)(*args, allow_stale=allow_stale)
+    
+    if results is not None and allow_stale:
+        with phase('cache_validate'):
+            valid = storage.is_cache_valid()
+        if not valid:
+            request_background_refresh()
+    
+    return results
+
+
+def acquire_catalog(method: str, *args):
+    """
+    Получить данные каталога: единый путь для всех действий плагина.
+    
+    Сначала запрос к кэшу (query_catalog), при его отсутствии - загрузка
+    каталога с сайта и повторный запрос уже к сохранённому кэшу. Если
+    сайт недоступен (или сработал предохранитель net), отдаётся
+    устаревший кэш, если он есть; если кэш не читается, каталог
+    загружается заново целиком.
+    
+    Args:
+        method: имя метода хранилища (load_page, letter_counts, search_cartoons, ...)
+    
+    Raises:
+        ConnectionError: если сайт недоступен и кэша нет
+        OSError: если загруженный каталог не удалось прочитать из хранилища
+    """
+    storage = get_storage()
+    
+    results = query_catalog(storage, method, *args)
+    if results is not None:
+        return results
+    
+    try:
+        refresh_catalog(storage)
+    except (ConnectionError, IncompleteCatalogError):
+        with phase('cache_load'):
+            results = getattr(storage, method)(*args, allow_stale=True)
+        if results is None:
+            raise
+        return results
+    
+    with phase('cache_load'):
+        results = getattr(storage, method)(*args, allow_stale=True)
+    if results is not None:
+        return results
+    
+    # Кэш актуален, но не читается (после 304 он только продлевается) -
+    # загружаем каталог целиком, без валидаторов
+    refresh_catalog(storage, force=True, conditional=False)
+    with phase('cache_load'):
+        results = getattr(storage, method)(*args, allow_stale=True)
+    if results is None:
+        raise OSError('Каталог не сохранён в хранилище')
+    return results
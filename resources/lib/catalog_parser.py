@@ -0,0 +1,649 @@
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import codecs
+import sys
+import zlib
+import urllib.parse
+import re
+
+try:
+    from .timing import phase, timed_iter
+except ImportError:
+    # Fallback for testing
+    from timing import phase, timed_iter
+
+# Размер блока чтения HTTP-ответа при потоковой загрузке каталога
+CHUNK_SIZE = 64 * 1024
+
+_ROW_START_RE = re.compile(r'<tr class=[eo]>', re.IGNORECASE)
+_ROW_END_RE = re.compile(r'</tr>', re.IGNORECASE)
+# Хвост буфера, в котором может начинаться ещё не дочитанный тег строки
+_ROW_START_TAIL = len('<tr class=e>') - 1
+
+# Поля строки каталога
+_TITLE_PATTERN = r'<td class=l><a href="(?P<info>[^"]*)"[^>]*>(?P<title>[^<]+)</a></td>'
+_VIDEO_PATTERN = r'href="(?P<video>[^"]*multiki/[^"]+\.(?:avi|mp4|mkv|flv))"'
+_SIZE_PATTERN = r'<td class=r>(?P<size>[0-9.]+)</td>'
+_DURATION_PATTERN = r'<td>(?P<duration>\d{2}:\d{2}:\d{2})</td>'
+
+# Все поля строки за один проход: альтернативы начинаются с разных
+# литералов, поэтому в одной позиции может совпасть только одна из них
+_ROW_FIELDS_RE = re.compile(
+    '|'.join((_TITLE_PATTERN, _VIDEO_PATTERN, _SIZE_PATTERN, _DURATION_PATTERN)),
+    re.IGNORECASE
+)
+
+_TITLE_RE = re.compile(_TITLE_PATTERN, re.IGNORECASE)
+_VIDEO_RE = re.compile(_VIDEO_PATTERN, re.IGNORECASE)
+_SIZE_RE = re.compile(_SIZE_PATTERN, re.IGNORECASE)
+_DURATION_RE = re.compile(_DURATION_PATTERN, re.IGNORECASE)
+_VIDEO_URL_RE = re.compile(r'[^"]*multiki/[^"]+\.(?:avi|mp4|mkv|flv)', re.IGNORECASE)
+
+_SITE_URL = 'https://multiki.arjlover.net'
+
+
+def parse_duration(value: str) -> int:
+    """Длительность вида 'ЧЧ:ММ:СС' в секундах (0, если не разобрать)."""
+    seconds = 0
+    for part in value.split(':'):
+        if not part.isdigit():
+            return 0
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def format_duration(seconds: int) -> str:
+    """Секунды в строку 'ЧЧ:ММ:СС' (пустая строка для 0)."""
+    if not seconds:
+        return ''
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}'
+
+
+def _split_url(url: str) -> Tuple[str, str]:
+    """Разбить URL на общий (интернированный) префикс до '/' и имя."""
+    prefix, slash, name = url.rpartition('/')
+    return sys.intern(prefix + slash), name
+
+
+# Экранированные префиксы URL (их в каталоге единицы)
+_QUOTED_PREFIXES = {}
+
+
+def _quote_prefix(prefix: str) -> str:
+    quoted = _QUOTED_PREFIXES.get(prefix)
+    if quoted is None:
+        quoted = _QUOTED_PREFIXES[prefix] = urllib.parse.quote(prefix)
+    return quoted
+
+
+class Cartoon:
+    """
+    Мультфильм каталога в компактном представлении.
+    
+    Префиксы URL интернируются и общие для всех записей, длительность
+    и размер хранятся числами. Расширение, обложка, описание и адрес
+    страницы подробностей выводятся из имени файла, длительности и размера
+    при обращении; явно переданное значение хранится, только если оно
+    отличается от выводимого.
+    """
+    
+    __slots__ = (
+        'title', '_prefix', 'filename', '_info_prefix', '_info_name',
+        'duration_seconds', 'size_bytes', 'year',
+        '_extension', '_thumbnail', '_plot', '_play_name'
+    )
+    
+    def __init__(self, title: str, url: str, extension: Optional[str] = None,
+                 thumbnail: Optional[str] = None, info_url: str = "",
+                 duration='', year: str = "", plot: Optional[str] = None,
+                 play_path: str = "", size_bytes: int = 0):
+        self.title = title
+        self._prefix, self.filename = _split_url(url)
+        self._info_prefix, info_name = _split_url(info_url)
+        # Страница подробностей обычно называется по файлу: 13.reis.avi.html
+        self._info_name = info_name if info_name != self.filename + '.html' else None
+        self.duration_seconds = duration if isinstance(duration, int) else parse_duration(duration)
+        self.size_bytes = size_bytes
+        self.year = year
+        self._extension = self._thumbnail = self._plot = None
+        
+        if extension is not None and extension != self.extension:
+            self._extension = sys.intern(extension)
+        if thumbnail is not None and thumbnail != self.thumbnail:
+            self._thumbnail = thumbnail
+        if plot is not None and plot != self.plot:
+            self._plot = plot
+        
+        # Экранированный путь для ссылки action=play вычисляется один раз
+        # при построении каталога; хранится только отличающееся имя файла
+        quoted_prefix = _quote_prefix(self._prefix)
+        if play_path and play_path.startswith(quoted_prefix):
+            play_name = play_path[len(quoted_prefix):]
+        else:
+            play_name = urllib.parse.quote(self.filename)
+        self._play_name = play_name if play_name != self.filename else None
+    
+    @property
+    def url(self) -> str:
+        return self._prefix + self.filename
+    
+    @property
+    def info_url(self) -> str:
+        """URL страницы с подробностями."""
+        name = self._info_name if self._info_name is not None else self.filename + '.html'
+        return self._info_prefix + name
+    
+    @property
+    def duration(self) -> str:
+        return format_duration(self.duration_seconds)
+    
+    @property
+    def extension(self) -> str:
+        if self._extension is not None:
+            return self._extension
+        # Как os.path.splitext для имени файла
+        stem, dot, suffix = self.filename.rpartition('.')
+        return dot + suffix if stem.strip('.') else ''
+    
+    @property
+    def thumbnail(self) -> str:
+        if self._thumbnail is not None:
+            return self._thumbnail
+        return f"{_SITE_URL}/ap/{self.filename}/{self.filename}.thumb1.jpg"
+    
+    @property
+    def plot(self) -> str:
+        if self._plot is not None:
+            return self._plot
+        
+        plot_parts = []
+        if self.duration_seconds:
+            plot_parts.append(f"Длительность: {self.duration}")
+        if self.size_bytes:
+            plot_parts.append(f"Размер: {self.size_bytes / (1024 * 1024):.0f} МБ")
+        return "\n".join(plot_parts)
+    
+    @property
+    def play_path(self) -> str:
+        """Экранированный URL видео для параметра path ссылки воспроизведения."""
+        name = self._play_name if self._play_name is not None else self.filename
+        return _quote_prefix(self._prefix) + name
+    
+    def to_record(self, prefix_ids: Optional[Dict[str, int]] = None, trim: bool = True) -> list:
+        """
+        Компактная запись для кэша.
+        
+        Префиксы заменяются номерами из prefix_ids (если он передан), вместо
+        выводимых значений хранится None; при trim хвостовые None отбрасываются.
+        """
+        if prefix_ids is not None:
+            prefix = prefix_ids.setdefault(self._prefix, len(prefix_ids))
+            info_prefix = prefix_ids.setdefault(self._info_prefix, len(prefix_ids))
+        else:
+            prefix, info_prefix = self._prefix, self._info_prefix
+        
+        record = [
+            self.title, prefix, self.filename, info_prefix, self._info_name,
+            self.duration_seconds, self.size_bytes,
+            self._play_name, self._extension, self._thumbnail, self._plot
+        ]
+        while trim and record[-1] is None:
+            record.pop()
+        return record
+    
+    @classmethod
+    def from_record(cls, record, prefixes: Sequence[str] = ()) -> 'Cartoon':
+        """Восстановить мультфильм из записи to_record (без повторных вычислений)."""
+        cartoon = cls.__new__(cls)
+        (cartoon.title, prefix, cartoon.filename, info_prefix, cartoon._info_name,
+         cartoon.duration_seconds, cartoon.size_bytes, cartoon._play_name,
+         extension, cartoon._thumbnail, cartoon._plot) = _pad_record(record)
+        cartoon._prefix = sys.intern(prefixes[prefix] if isinstance(prefix, int) else prefix)
+        cartoon._info_prefix = sys.intern(
+            prefixes[info_prefix] if isinstance(info_prefix, int) else info_prefix
+        )
+        cartoon._extension = sys.intern(extension) if extension is not None else None
+        cartoon.year = ''
+        return cartoon
+    
+    def _key(self) -> tuple:
+        return (self.title, self.url, self.extension, self.thumbnail, self.info_url,
+                self.duration_seconds, self.size_bytes, self.year, self.plot)
+    
+    def __eq__(self, other):
+        if not isinstance(other, Cartoon):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f'Cartoon(title={self.title!r}, url={self.url!r})'
+
+
+_RECORD_SIZE = 11
+
+
+def _pad_record(record) -> list:
+    record = list(record)
+    if len(record) < _RECORD_SIZE:
+        record.extend([None] * (_RECORD_SIZE - len(record)))
+    return record
+
+
+class CartoonDetails(NamedTuple):
+    title: str
+    duration: str
+    size: str
+    video_format: str
+    audio_format: str
+    thumbnail: str
+    plot: str = ""
+
+
+def title_letter(title: str) -> str:
+    """Буква алфавитного указателя для названия ('0-9' для цифр)."""
+    first = title[:1]
+    if first.isdigit():
+        return '0-9'
+    return first.upper()
+
+
+_CYRILLIC_LETTERS = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+
+
+def letter_sort_key(letter: str) -> tuple:
+    """Порядок букв в указателе: '0-9', латиница, кириллица, прочие символы."""
+    if letter == '0-9':
+        return (0, 0, '')
+    if 'A' <= letter <= 'Z':
+        return (1, 0, letter)
+    position = _CYRILLIC_LETTERS.find(letter)
+    if letter and position >= 0:
+        return (2, position, '')
+    return (3, 0, letter)
+
+
+# Группы по длительности для выбора короткого мультфильма:
+# (ключ, название, от, до) - секунды, верхняя граница не включается
+DURATION_BUCKETS = (
+    ('short', 'До 5 минут', 0, 5 * 60),
+    ('medium', '5–15 минут', 5 * 60, 15 * 60),
+    ('long', '15 минут и больше', 15 * 60, None),
+)
+
+
+def duration_bucket(seconds: int) -> Optional[str]:
+    """Ключ группы длительности (None, если длительность неизвестна)."""
+    if not seconds:
+        return None
+    for key, _, low, high in DURATION_BUCKETS:
+        if seconds >= low and (high is None or seconds < high):
+            return key
+    return None
+
+
+def parse_catalog(html: str, base_url: str) -> List[Cartoon]:
+    """Распарсить HTML и извлечь список мультфильмов."""
+    return list(iter_parse_catalog([html], base_url))
+
+
+def iter_rows(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Выделить содержимое строк <tr class=e|o> из потока фрагментов HTML.
+    
+    Строка отдаётся, как только дочитан её закрывающий тег; в буфере
+    хранится только необработанный хвост, а не весь документ.
+    """
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        pos = 0
+        
+        while True:
+            start = _ROW_START_RE.search(buffer, pos)
+            if start is None:
+                pos = max(pos, len(buffer) - _ROW_START_TAIL)
+                break
+            
+            end = _ROW_END_RE.search(buffer, start.end())
+            if end is None:
+                pos = start.start()
+                break
+            
+            yield buffer[start.end():end.start()]
+            pos = end.end()
+        
+        buffer = buffer[pos:]
+
+
+def iter_parse_catalog(chunks: Iterable[str], base_url: str) -> Iterator[Cartoon]:
+    """Потоково распарсить HTML каталога, отдавая мультфильмы по мере готовности."""
+    for row in iter_rows(chunks):
+        cartoon = _parse_row(row, base_url)
+        if cartoon is not None:
+            yield cartoon
+
+
+def _extract_fields_slow(row: str) -> Tuple[Optional[str], ...]:
+    """Извлечь поля строки отдельным поиском каждого (эталонный вариант)."""
+    title_match = _TITLE_RE.search(row)
+    video_match = _VIDEO_RE.search(row)
+    size_match = _SIZE_RE.search(row)
+    duration_match = _DURATION_RE.search(row)
+    
+    return (
+        title_match.group('info') if title_match else None,
+        title_match.group('title') if title_match else None,
+        video_match.group('video') if video_match else None,
+        size_match.group('size') if size_match else None,
+        duration_match.group('duration') if duration_match else None,
+    )
+
+
+def _extract_fields(row: str) -> Tuple[Optional[str], ...]:
+    """
+    Извлечь поля строки за один проход _ROW_FIELDS_RE.
+    
+    Результат совпадает с _extract_fields_slow: для каждого поля берётся
+    самое левое совпадение. Единственное штатное перекрытие - ссылка на
+    видео внутри ячейки названия - учитывается явно, а строки, где
+    совпадения могли бы скрыть друг друга иначе, разбираются эталонно.
+    """
+    info = title = video = size = duration = None
+    
+    for match in _ROW_FIELDS_RE.finditer(row):
+        kind = match.lastgroup
+        
+        if kind == 'title':
+            span_info = match.group('info')
+            if '<' in span_info or match.group(0).lower().count('href') > 1:
+                return _extract_fields_slow(row)
+            if title is None:
+                info, title = span_info, match.group('title')
+            # Ссылка из ячейки названия сама может быть ссылкой на видео
+            if video is None and _VIDEO_URL_RE.fullmatch(span_info):
+                video = span_info
+        elif kind == 'video':
+            if '<' in match.group('video'):
+                return _extract_fields_slow(row)
+            if video is None:
+                video = match.group('video')
+        elif kind == 'size':
+            if size is None:
+                size = match.group('size')
+        elif duration is None:
+            duration = match.group('duration')
+    
+    return info, title, video, size, duration
+
+
+def _parse_row(row: str, base_url: str) -> Optional[Cartoon]:
+    """Извлечь мультфильм из содержимого одной строки таблицы."""
+    info_url, title, video_url, size, duration = _extract_fields(row)
+    if title is None or video_url is None:
+        return None
+    
+    title = title.strip()
+    
+    if info_url.startswith('/'):
+        info_url = _SITE_URL + info_url
+    
+    if video_url.startswith('/'):
+        video_url = _SITE_URL + video_url
+    elif not video_url.startswith('http'):
+        video_url = urllib.parse.urljoin(base_url, video_url)
+    
+    # Размер файла (третья ячейка <td class=r>, с точками между разрядами)
+    size_bytes = 0
+    has_size = False
+    if size is not None:
+        digits = size.replace('.', '')
+        if digits:
+            size_bytes = int(digits)
+            has_size = True
+    
+    # Описание выводится из чисел; если строки из ячеек по ним не
+    # восстановить ('00:00:00', '00:99:00', размер 0), оно собирается из
+    # самих ячеек и хранится явно, как выводил его прежний разбор.
+    # Ячейка длительности уже проверена регулярным выражением (ЧЧ:ММ:СС)
+    plot = None
+    duration = duration or ""
+    if ((has_size and not size_bytes)
+            or (duration and (duration[3] > '5' or duration[6] > '5' or duration == '00:00:00'))):
+        plot = _cells_plot(duration, size_bytes if has_size else None)
+    
+    # Расширение, обложка и описание выводятся из имени файла,
+    # длительности (пятая ячейка, формат 00:09:44) и размера
+    return Cartoon(
+        title=title,
+        url=video_url,
+        info_url=info_url,
+        duration=duration,
+        plot=plot,
+        size_bytes=size_bytes
+    )
+
+
+def _cells_plot(duration: str, size_bytes: Optional[int]) -> str:
+    """Описание из строк ячеек как есть (None - ячейки размера нет)."""
+    plot_parts = []
+    if duration:
+        plot_parts.append(f"Длительность: {duration}")
+    if size_bytes is not None:
+        plot_parts.append(f"Размер: {size_bytes / (1024 * 1024):.0f} МБ")
+    return "\n".join(plot_parts)
+
+
+def fetch_details(info_url: str) -> CartoonDetails:
+    """Загрузить и распарсить страницу с подробностями мультфильма."""
+    # Сетевой модуль (http.client) импортируется только при обращении к сети:
+    # это самый дорогой импорт при холодном старте плагина
+    try:
+        from . import net
+    except ImportError:
+        import net
+    
+    try:
+        with net.request(info_url) as response:
+            if response.status != 200:
+                raise ConnectionError(f"HTTP {response.status}")
+            raw_content = response.read()
+            html = raw_content.decode('windows-1251', errors='ignore')
+        
+        # Извлечь название
+        title_match = re.search(r'<h1>([^<]+)</h1>', html)
+        title = title_match.group(1).strip() if title_match else ""
+        
+        # Извлечь продолжительность
+        duration_match = re.search(r'<strong>Продолжительность:</strong></td><td>([^<]+)</td>', html)
+        duration = duration_match.group(1).strip() if duration_match else ""
+        
+        # Извлечь размер
+        size_match = re.search(r'<strong>Размер:</strong></td><td>([^<]+)</td>', html)
+        size = size_match.group(1).strip() if size_match else ""
+        
+        # Извлечь видеоформат
+        video_match = re.search(r'<strong>Видеоформат:</strong></td><td>([^<]+)</td>', html)
+        video_format = video_match.group(1).strip() if video_match else ""
+        
+        # Извлечь аудиоформат
+        audio_match = re.search(r'<strong>Аудиоформат:</strong></td><td>([^<]+)</td>', html)
+        audio_format = audio_match.group(1).strip() if audio_match else ""
+        
+        # Извлечь thumbnail
+        thumb_match = re.search(r'src="([^"]*thumb1\.jpg)"', html)
+        thumbnail = ""
+        if thumb_match:
+            thumbnail = thumb_match.group(1)
+            if thumbnail.startswith('/'):
+                thumbnail = 'https://multiki.arjlover.net' + thumbnail
+        
+        return CartoonDetails(
+            title=title,
+            duration=duration,
+            size=size,
+            video_format=video_format,
+            audio_format=audio_format,
+            thumbnail=thumbnail
+        )
+    
+    except Exception as e:
+        return CartoonDetails(title="", duration="", size="", video_format="", audio_format="", thumbnail="")
+
+
+def decode_chunks(byte_chunks: Iterable[bytes]) -> Iterator[str]:
+    """Инкрементально декодировать поток байтов в кодировке сайта (windows-1251)."""
+    decoder = codecs.getincrementaldecoder('windows-1251')(errors='ignore')
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def _read_chunks(response, chunk_size: int) -> Iterator[bytes]:
+    """
+    Читать тело ответа блоками.
+    
+    http.client при обрыве соединения отдаёт b'' без ошибки, поэтому
+    полученный объём сверяется с Content-Length.
+    
+    Raises:
+        ConnectionError: если ответ оборван
+    """
+    expected = response.headers.get('Content-Length', '').strip()
+    received = 0
+    while True:
+        chunk = response.read(chunk_size)
+        if not chunk:
+            break
+        received += len(chunk)
+        yield chunk
+    
+    if expected.isdigit() and received < int(expected):
+        raise ConnectionError(f"Ответ оборван: получено {received} из {expected} байт")
+
+
+def _decompress_chunks(byte_chunks: Iterable[bytes], content_encoding: str) -> Iterator[bytes]:
+    """
+    Распаковать поток по заголовку Content-Encoding (gzip, deflate).
+    
+    Raises:
+        ConnectionError: если сжатие не поддерживается или поток оборван
+    """
+    content_encoding = content_encoding.strip().lower()
+    if content_encoding in ('', 'identity'):
+        yield from byte_chunks
+        return
+    
+    if content_encoding in ('gzip', 'x-gzip'):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif content_encoding == 'deflate':
+        # Серверы отдают deflate и в обёртке zlib, и "сырым" потоком
+        decompressor = None
+    else:
+        raise ConnectionError(f"Неподдерживаемое сжатие ответа: {content_encoding}")
+    
+    for chunk in byte_chunks:
+        if decompressor is None:
+            wrapped = len(chunk) >= 2 and (chunk[0] & 0x0F) == 8 and ((chunk[0] << 8) | chunk[1]) % 31 == 0
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS if wrapped else -zlib.MAX_WBITS)
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    
+    # Без конца сжатого потока ответ оборван (даже если Content-Length нет)
+    if decompressor is None or not decompressor.eof:
+        raise ConnectionError("Сжатый ответ оборван")
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+class CatalogStream:
+    """
+    Условная потоковая загрузка каталога.
+    
+    Запрос отправляется с If-None-Match/If-Modified-Since и
+    Accept-Encoding: gzip, deflate. Если сервер ответил 304,
+    not_modified равен True и итерация ничего не отдаёт; иначе
+    итерация по объекту отдаёт мультфильмы по мере загрузки, а
+    etag/last_modified содержат валидаторы нового ответа.
+    
+    Использование:
+        with CatalogStream(url, etag=...) as stream:
+            if not stream.not_modified:
+                cartoons = list(stream)
+    """
+    
+    def __init__(self, base_url: str, etag: str = '', last_modified: str = '',
+                 chunk_size: int = CHUNK_SIZE):
+        self.base_url = base_url
+        self.chunk_size = chunk_size
+        self.request_etag = etag
+        self.request_last_modified = last_modified
+        self.not_modified = False
+        self.etag = ''
+        self.last_modified = ''
+        self._response = None
+    
+    def __enter__(self) -> 'CatalogStream':
+        try:
+            from . import net
+        except ImportError:
+            import net
+        
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        if self.request_etag:
+            headers['If-None-Match'] = self.request_etag
+        if self.request_last_modified:
+            headers['If-Modified-Since'] = self.request_last_modified
+        
+        # net.request повторяет неудачные попытки и бросает ConnectionError
+        with phase('fetch'):
+            response = net.request(self.base_url, headers=headers)
+        
+        if response.status == 304:
+            response.close()
+            self.not_modified = True
+            self.etag = response.headers.get('ETag', '') or self.request_etag
+            self.last_modified = response.headers.get('Last-Modified', '') or self.request_last_modified
+            return self
+        
+        if response.status != 200:
+            response.close()
+            raise ConnectionError(f"Не удалось загрузить каталог: HTTP {response.status}")
+        
+        self._response = response
+        self.etag = response.headers.get('ETag', '')
+        self.last_modified = response.headers.get('Last-Modified', '')
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+    
+    def __iter__(self) -> Iterator[Cartoon]:
+        if self._response is None:
+            return
+        
+        import http.client
+        
+        content_encoding = self._response.headers.get('Content-Encoding', '')
+        try:
+            chunks = _decompress_chunks(
+                timed_iter('fetch', _read_chunks(self._response, self.chunk_size)),
+                content_encoding
+            )
+            yield from iter_parse_catalog(timed_iter('decode', decode_chunks(chunks)), self.base_url)
+        except ConnectionError:
+            raise
+        except (OSError, zlib.error, http.client.HTTPException) as e:
+            # HTTPException - в том числе IncompleteRead оборванного chunked-ответа
+            raise ConnectionError(f"Ошибка при загрузке каталога: {e}")
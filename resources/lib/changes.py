@@ -0,0 +1,263 @@
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+try:
+    from .catalog_parser import Cartoon
+    from .settings import get_data_dir
+    from .locking import atomic_write
+except ImportError:
+    # Fallback for testing
+    from catalog_parser import Cartoon
+    from settings import get_data_dir
+    from locking import atomic_write
+
+# Сколько последних поступлений хранить для списка «Новые поступления»
+NEW_ARRIVALS_LIMIT = 200
+
+# Журнал изменений сворачивается в снимок, когда становится больше
+# этой доли снимка: чтение состояния не должно расти без границ
+JOURNAL_COMPACT_SHARE = 0.5
+
+
+class CatalogDiff(NamedTuple):
+    """
+    Изменения каталога относительно сохранённого состояния.
+    
+    added/changed - номера записей в новом каталоге, removed - адреса
+    видео исчезнувших записей. initial - состояния ещё не было (первая
+    загрузка): все записи считаются известными, а не новыми.
+    """
+    added: List[int]
+    changed: List[int]
+    removed: List[str]
+    hashes: List[int]
+    initial: bool = False
+    
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.changed or self.removed or self.initial)
+    
+    def summary(self) -> str:
+        return f'+{len(self.added)} ~{len(self.changed)} -{len(self.removed)}'
+
+
+def get_state_path() -> str:
+    """Путь к состоянию каталога: адрес видео -> [хэш записи, когда впервые встречен]."""
+    return os.path.join(get_data_dir(), 'catalog_state.json')
+
+
+def get_journal_path() -> str:
+    """Путь к журналу изменений состояния, дописываемому после снимка."""
+    return os.path.join(get_data_dir(), 'catalog_state.journal')
+
+
+def get_arrivals_path() -> str:
+    """Путь к списку последних поступлений."""
+    return os.path.join(get_data_dir(), 'new_arrivals.json')
+
+
+def _log_warning(message: str) -> None:
+    try:
+        import xbmc
+        xbmc.log(f"ArjLover: {message}", xbmc.LOGWARNING)
+    except ImportError:
+        print(f"Warning: {message}")
+
+
+def row_hash(cartoon: Cartoon) -> int:
+    """
+    Хэш содержимого записи (CRC32 полей to_record).
+    
+    Сравниваются только записи с одним адресом видео, поэтому 32 бит
+    достаточно, а CRC32 заметно дешевле json.dumps каждой записи.
+    """
+    fields = '\x1f'.join(map(str, cartoon.to_record(trim=False)))
+    return zlib.crc32(fields.encode('utf-8'))
+
+
+def _load_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, IOError, ValueError) as e:
+        _log_warning(f"Ошибка чтения {os.path.basename(path)}: {e}")
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def load_state() -> Optional[dict]:
+    """
+    Состояние каталога ({'baseline', 'storage', 'entries'}) или None.
+    
+    Снимок дополняется записями журнала, сделанными поверх него.
+    """
+    state = _load_json(get_state_path())
+    if state is None or not isinstance(state.get('entries'), dict):
+        return None
+    
+    for delta in _read_journal(state.get('snapshot')):
+        entries = state['entries']
+        entries.update(delta.get('set', {}))
+        for url in delta.get('del', []):
+            entries.pop(url, None)
+        state['storage'] = delta.get('storage', state.get('storage'))
+    return state
+
+
+def _read_journal(snapshot: Optional[str]) -> List[dict]:
+    """
+    Записи журнала, сделанные поверх снимка snapshot.
+    
+    Записи от другого снимка (свёртка оборвалась до удаления журнала)
+    пропускаются, как и оборванная последняя строка.
+    """
+    deltas = []
+    try:
+        with open(get_journal_path(), 'rb') as f:
+            for line in f:
+                try:
+                    delta = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break
+                if isinstance(delta, dict) and delta.get('snapshot') == snapshot:
+                    deltas.append(delta)
+    except FileNotFoundError:
+        pass
+    except (OSError, IOError) as e:
+        _log_warning(f"Ошибка чтения журнала изменений: {e}")
+    return deltas
+
+
+def diff_catalog(cartoons: List[Cartoon], state: Optional[dict]) -> CatalogDiff:
+    """Сравнить новый каталог с сохранённым состоянием по адресам видео."""
+    hashes = [row_hash(cartoon) for cartoon in cartoons]
+    if state is None:
+        return CatalogDiff([], [], [], hashes, initial=True)
+    
+    entries = state['entries']
+    added, changed = [], []
+    seen = set()
+    for i, cartoon in enumerate(cartoons):
+        url = cartoon.url
+        seen.add(url)
+        entry = entries.get(url)
+        if entry is None:
+            added.append(i)
+        elif entry[0] != hashes[i]:
+            changed.append(i)
+    
+    removed = [url for url in entries if url not in seen]
+    return CatalogDiff(added, changed, removed, hashes)
+
+
+def record_changes(cartoons: List[Cartoon], diff: CatalogDiff, state: Optional[dict],
+                   storage: str = '', now: Optional[str] = None) -> None:
+    """
+    Сохранить изменения: обновить состояние и список поступлений.
+    
+    На диск дописываются только добавленные, изменённые и удалённые
+    записи (строка журнала); время первого появления остальных
+    сохраняется. Снимок состояния перезаписывается целиком только при
+    первой загрузке и при свёртке разросшегося журнала.
+    
+    Args:
+        storage: имя хранилища, в которое сохранён этот каталог
+    """
+    now = now or datetime.now().isoformat(timespec='seconds')
+    
+    try:
+        if diff.initial or state is None:
+            entries = {cartoon.url: [crc, now] for cartoon, crc in zip(cartoons, diff.hashes)}
+            _write_snapshot({'baseline': now, 'storage': storage, 'entries': entries})
+        else:
+            _append_journal(cartoons, diff, state, storage, now)
+        _update_arrivals(cartoons, diff, now)
+    except (OSError, IOError) as e:
+        _log_warning(f"Не удалось сохранить изменения каталога: {e}")
+
+
+def _write_snapshot(state: dict) -> None:
+    """Записать снимок состояния и начать журнал заново."""
+    # Новая метка снимка отвязывает строки прежнего журнала, даже если
+    # удалить его не успели
+    state['snapshot'] = datetime.now().isoformat()
+    atomic_write(get_state_path(), json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    try:
+        os.remove(get_journal_path())
+    except FileNotFoundError:
+        pass
+
+
+def _append_journal(cartoons: List[Cartoon], diff: CatalogDiff, state: dict,
+                    storage: str, now: str) -> None:
+    """Дописать изменения строкой журнала; свернуть журнал, если он разросся."""
+    entries = state['entries']
+    changed = {}
+    for i in diff.added:
+        changed[cartoons[i].url] = [diff.hashes[i], now]
+    for i in diff.changed:
+        changed[cartoons[i].url] = [diff.hashes[i], entries[cartoons[i].url][1]]
+    
+    delta = {'snapshot': state.get('snapshot'), 'storage': storage,
+             'set': changed, 'del': diff.removed}
+    with open(get_journal_path(), 'ab') as f:
+        f.write(json.dumps(delta, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+        f.flush()
+        os.fsync(f.fileno())
+    
+    if os.path.getsize(get_journal_path()) > os.path.getsize(get_state_path()) * JOURNAL_COMPACT_SHARE:
+        entries.update(changed)
+        for url in diff.removed:
+            del entries[url]
+        state['storage'] = storage
+        _write_snapshot(state)
+
+
+def _update_arrivals(cartoons: List[Cartoon], diff: CatalogDiff, now: str) -> None:
+    """Добавить новые записи в начало списка поступлений, убрать удалённые."""
+    if diff.initial:
+        arrivals = []
+    else:
+        arrivals = (_load_json(get_arrivals_path()) or {}).get('arrivals', [])
+    
+    updated = {cartoons[i].url: cartoons[i] for i in diff.changed}
+    removed = set(diff.removed)
+    
+    kept = []
+    for first_seen, record in arrivals:
+        cartoon = Cartoon.from_record(record)
+        if cartoon.url in removed:
+            continue
+        cartoon = updated.get(cartoon.url, cartoon)
+        kept.append([first_seen, cartoon.to_record()])
+    
+    fresh = [[now, cartoons[i].to_record()] for i in diff.added]
+    atomic_write(
+        get_arrivals_path(),
+        json.dumps({'arrivals': (fresh + kept)[:NEW_ARRIVALS_LIMIT]},
+                   ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    )
+
+
+def load_new_arrivals() -> List[Cartoon]:
+    """Последние поступления, самые новые первыми (каталог целиком не читается)."""
+    data = _load_json(get_arrivals_path()) or {}
+    try:
+        return [Cartoon.from_record(record) for _, record in data.get('arrivals', [])]
+    except (TypeError, ValueError, IndexError) as e:
+        _log_warning(f"Ошибка чтения списка поступлений: {e}")
+        return []
+
+
+def clear_changes() -> None:
+    """Удалить состояние каталога и список поступлений."""
+    for path in (get_state_path(), get_journal_path(), get_arrivals_path()):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,264 @@
+import json
+import os
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Set
+
+try:
+    from .catalog_parser import CartoonDetails, fetch_details
+    from .settings import get_data_dir
+    from .locking import FileLock, atomic_write
+    from . import listing_version
+except ImportError:
+    # Fallback for testing
+    from catalog_parser import CartoonDetails, fetch_details
+    from settings import get_data_dir
+    from locking import FileLock, atomic_write
+    import listing_version
+
+# Через сколько дней подробности считаются устаревшими
+DETAILS_MAX_AGE_DAYS = 30
+
+DEFAULT_WORKERS = 4
+DEFAULT_PER_HOST = 2
+DEFAULT_RATE = 2.0
+
+# Как часто сбрасывать накопленные результаты на диск, записей
+SAVE_EVERY = 50
+
+
+def get_details_path() -> str:
+    """Получить путь к файлу хранилища подробностей."""
+    return os.path.join(get_data_dir(), 'details_cache.json')
+
+
+def _store_lock() -> FileLock:
+    """
+    Блокировка чтения-изменения-записи хранилища.
+    
+    Хранилище меняют и служба (enrich), и плагин (forget после
+    обновления каталога): без блокировки одна запись затирает другую.
+    """
+    return FileLock(os.path.join(get_data_dir(), 'details.lock'))
+
+
+def _log_warning(message: str) -> None:
+    try:
+        import xbmc
+        xbmc.log(f"ArjLover: {message}", xbmc.LOGWARNING)
+    except ImportError:
+        print(f"Warning: {message}")
+
+
+def load_details() -> Dict[str, dict]:
+    """
+    Загрузить хранилище подробностей.
+    
+    Returns:
+        info_url → поля CartoonDetails и время загрузки ('fetched')
+    """
+    try:
+        with open(get_details_path(), 'r', encoding='utf-8') as f:
+            store = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, IOError, ValueError) as e:
+        _log_warning(f"Ошибка чтения подробностей: {e}")
+        return {}
+    
+    return store if isinstance(store, dict) else {}
+
+
+def save_details(store: Dict[str, dict]) -> None:
+    """Атомарно сохранить хранилище подробностей."""
+    try:
+        atomic_write(
+            get_details_path(),
+            json.dumps(store, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        )
+    except (OSError, IOError) as e:
+        _log_warning(f"Не удалось сохранить подробности: {e}")
+        return
+    listing_version.bump('details')
+
+
+def forget(info_urls: Set[str], keep: Optional[Set[str]] = None) -> int:
+    """
+    Удалить подробности изменившихся записей (и всех, кого нет в keep).
+    
+    Вызывается после обновления каталога, чтобы служба перезагрузила
+    только затронутые страницы, а не всё хранилище.
+    
+    Returns:
+        Количество удалённых записей
+    """
+    with _store_lock():
+        store = load_details()
+        stale = [
+            url for url in store
+            if url in info_urls or (keep is not None and url not in keep)
+        ]
+        for url in stale:
+            del store[url]
+        
+        if stale:
+            save_details(store)
+    return len(stale)
+
+
+def _merge_details(entries: Dict[str, dict]) -> None:
+    """Добавить загруженные записи в хранилище, перечитав его под блокировкой."""
+    with _store_lock():
+        store = load_details()
+        store.update(entries)
+        save_details(store)
+
+
+def is_stale(entry: Optional[dict], max_age: timedelta) -> bool:
+    """Нужно ли (пере)загрузить подробности для записи хранилища."""
+    if not entry:
+        return True
+    
+    try:
+        fetched = datetime.fromisoformat(entry['fetched'])
+    except (KeyError, TypeError, ValueError):
+        return True
+    
+    return datetime.now() - fetched >= max_age
+
+
+class RateLimiter:
+    """Потокобезопасный ограничитель частоты запросов (не чаще rate в секунду)."""
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        
+        if delay > 0:
+            time.sleep(delay)
+
+
+class HostLimiter:
+    """Ограничение числа одновременных запросов к одному хосту."""
+    
+    def __init__(self, per_host: int):
+        self.per_host = max(1, per_host)
+        self._semaphores: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, url: str) -> threading.Semaphore:
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.Semaphore(self.per_host)
+            return self._semaphores[host]
+
+
+def _has_content(details: CartoonDetails) -> bool:
+    # fetch_details при ошибке возвращает пустую запись - её не сохраняем
+    return any((details.duration, details.size, details.video_format,
+                details.audio_format, details.thumbnail))
+
+
+def enrich(info_urls: Iterable[str],
+           workers: int = DEFAULT_WORKERS,
+           per_host: int = DEFAULT_PER_HOST,
+           rate: float = DEFAULT_RATE,
+           max_age: timedelta = timedelta(days=DETAILS_MAX_AGE_DAYS),
+           limit: Optional[int] = None,
+           should_stop: Optional[Callable[[], bool]] = None,
+           fetch: Callable[[str], CartoonDetails] = fetch_details) -> int:
+    """
+    Параллельно загрузить подробности для записей без них или с устаревшими.
+    
+    Каждая страница загружается не более одного раза за вызов; запросы
+    ограничены пулом потоков, числом одновременных запросов к хосту и
+    общей частотой. Результаты сохраняются в хранилище по info_url:
+    в свежую копию хранилища добавляются только загруженные записи, так
+    что изменения, сделанные за время загрузки (forget), не теряются.
+    
+    Args:
+        info_urls: адреса страниц подробностей
+        limit: максимум загрузок за вызов
+        should_stop: проверка прерывания (например, monitor.abortRequested)
+        fetch: функция загрузки одной страницы
+    
+    Returns:
+        Количество успешно загруженных страниц
+    """
+    store = load_details()
+    
+    pending = []
+    seen = set()
+    for url in info_urls:
+        if url and url not in seen and is_stale(store.get(url), max_age):
+            seen.add(url)
+            pending.append(url)
+            if limit is not None and len(pending) >= limit:
+                break
+    
+    if not pending:
+        return 0
+    
+    limiter = RateLimiter(rate)
+    hosts = HostLimiter(per_host)
+    
+    def task(url: str) -> Optional[CartoonDetails]:
+        if should_stop is not None and should_stop():
+            return None
+        with hosts.get(url):
+            limiter.wait()
+            return fetch(url)
+    
+    fetched = 0
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(task, url): url for url in pending}
+        
+        for future in as_completed(futures):
+            details = future.result()
+            if details is None or not _has_content(details):
+                continue
+            
+            entry = details._asdict()
+            entry['fetched'] = datetime.now().isoformat()
+            results[futures[future]] = entry
+            fetched += 1
+            
+            if len(results) >= SAVE_EVERY:
+                _merge_details(results)
+                results = {}
+    
+    if results:
+        _merge_details(results)
+    return fetched
+
+
+def details_info(entry: Optional[dict]) -> Dict[str, str]:
+    """
+    Дополнительные строки описания для ListItem из записи хранилища.
+    
+    Returns:
+        Словарь с ключами 'plot' (форматы видео/аудио) и 'thumbnail'
+        (настоящая обложка со страницы), пустые если данных нет
+    """
+    if not entry:
+        return {'plot': '', 'thumbnail': ''}
+    
+    plot_parts = []
+    if entry.get('video_format'):
+        plot_parts.append(f"Видео: {entry['video_format']}")
+    if entry.get('audio_format'):
+        plot_parts.append(f"Аудио: {entry['audio_format']}")
+    
+    return {'plot': '\n'.join(plot_parts), 'thumbnail': entry.get('thumbnail', '')}
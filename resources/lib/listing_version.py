@@ -0,0 +1,77 @@
+import os
+import time
+import zlib
+
+try:
+    from .settings import get_bool_setting, get_data_dir, get_setting
+except ImportError:
+    # Fallback for testing
+    from settings import get_bool_setting, get_data_dir, get_setting
+
+# Версии источников, из которых строятся списки: catalog (поколение
+# каталога), details, thumbnails. Файл в строках «источник значение»:
+# его читает каждый вызов главного меню, поэтому ни json, ни хранилища
+# каталога здесь не импортируются
+VERSION_FILE = 'listing_version'
+
+
+def get_version_path() -> str:
+    return os.path.join(get_data_dir(), VERSION_FILE)
+
+
+def read_versions() -> dict:
+    """Текущие версии источников ({} если ничего ещё не сохранялось)."""
+    try:
+        with open(get_version_path(), 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except (OSError, IOError, ValueError):
+        return {}
+    return dict(line.split(' ', 1) for line in lines if ' ' in line)
+
+
+def bump(source: str, value: str = '') -> None:
+    """
+    Отметить, что источник списков изменился.
+    
+    Args:
+        source: catalog, details или thumbnails
+        value: новая версия (по умолчанию - текущее время)
+    """
+    try:
+        from .locking import atomic_write
+    except ImportError:
+        from locking import atomic_write
+    
+    versions = read_versions()
+    versions[source] = value or str(time.time_ns())
+    try:
+        atomic_write(
+            get_version_path(),
+            ''.join(f'{name} {version}\n' for name, version in sorted(versions.items())).encode('utf-8')
+        )
+    except (OSError, IOError):
+        # Без версии списки просто дольше берутся из кэша Kodi
+        pass
+
+
+def listing_token() -> str:
+    """
+    Версия содержимого списков для адресов плагина (v=...).
+    
+    Kodi кэширует списки (cacheToDisc) по адресу, поэтому в адрес входит
+    всё, от чего зависит вывод: версии источников, хранилище и размер
+    страницы. Новая версия - новый адрес, и устаревший список из кэша
+    Kodi не показывается.
+    """
+    versions = read_versions()
+    parts = [
+        versions.get('catalog', ''),
+        get_setting('storage', 'json'),
+        get_setting('page_size', '500'),
+    ]
+    if get_bool_setting('details_enabled'):
+        parts.append(versions.get('details', ''))
+    if get_bool_setting('thumbnails_enabled'):
+        parts.append(versions.get('thumbnails', ''))
+    
+    return f"{zlib.crc32('|'.join(parts).encode('utf-8')):08x}"
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Интервал опроса занятой блокировки, секунд
+POLL_INTERVAL = 0.1
+
+
+class FileLock:
+    """
+    Межпроцессная блокировка на файле (flock, на Windows - msvcrt.locking).
+    
+    Блокировка снимается операционной системой при завершении процесса,
+    поэтому упавший вызов плагина не оставляет её висеть.
+    
+    Использование:
+        with FileLock(path, timeout=30) as lock:
+            if lock.waited:
+                ...  # кто-то другой держал блокировку до нас
+    """
+    
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        self.path = path
+        self.timeout = timeout
+        self.waited = False
+        self._fd = None
+    
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Захватить блокировку.
+        
+        Args:
+            timeout: сколько ждать, секунд (None - без ограничения, 0 - не ждать)
+        
+        Returns:
+            True если блокировка захвачена
+        """
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.waited = False
+        
+        while not self._try_lock(fd):
+            self.waited = True
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                return False
+            time.sleep(POLL_INTERVAL)
+        
+        self._fd = fd
+        return True
+    
+    def release(self) -> None:
+        """Освободить блокировку."""
+        if self._fd is None:
+            return
+        
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+    
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+    
+    def __enter__(self) -> 'FileLock':
+        if not self.acquire(self.timeout):
+            raise TimeoutError(f'Не удалось захватить блокировку {self.path}')
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """
+    Записать файл атомарно: во временный файл рядом и os.replace.
+    
+    Временный файл уникален (mkstemp), поэтому одновременные записи из
+    разных процессов и потоков не портят друг другу данные.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                    dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
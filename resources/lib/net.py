@@ -0,0 +1,328 @@
+import http.client
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+from typing import Dict, Optional, Tuple
+
+try:
+    from .settings import get_data_dir, get_int_setting
+    from .locking import atomic_write
+    from . import timing
+except ImportError:
+    # Fallback for testing
+    from settings import get_data_dir, get_int_setting
+    from locking import atomic_write
+    import timing
+
+# Таймауты по умолчанию, секунд: установка соединения и ожидание данных
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+
+# Повторы после неудачной попытки и задержка между ними (экспоненциальная
+# с полным джиттером: случайная от 0 до BACKOFF_BASE * 2^попытка), секунд
+RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 4.0
+
+# Ответы сервера, после которых запрос стоит повторить
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+# Предохранитель: после BREAKER_THRESHOLD неудачных запросов подряд к
+# хосту сеть не используется BREAKER_COOLDOWN секунд
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 300
+
+# Пул keep-alive соединений: сколько простаивающих соединений держать на
+# хост и через сколько секунд простоя соединение считается закрытым сервером
+POOL_SIZE = 4
+IDLE_TIMEOUT = 30
+
+# Остаток тела ответа (байт), который дочитывается при закрытии, чтобы
+# вернуть соединение в пул
+DRAIN_LIMIT = 64 * 1024
+
+# Ошибки, с которыми сервер закрывает простаивавшее keep-alive соединение
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+USER_AGENT = 'Kodi plugin.video.arjlover'
+
+# Символы, которые не экранируются в пути запроса (уже экранированные остаются)
+_PATH_SAFE = "/%?=&;:@!$'()*+,~"
+
+
+class CircuitOpenError(ConnectionError):
+    """Сеть не используется: предохранитель хоста сработал недавно."""
+
+
+class Response:
+    """
+    Ответ на запрос: статус, заголовки и потоковое чтение тела.
+    
+    При close() (или при выходе из with) соединение возвращается в пул,
+    если тело прочитано и сервер не просил закрыть соединение.
+    """
+    
+    def __init__(self, connection: http.client.HTTPConnection,
+                 response: http.client.HTTPResponse, url: str, key: tuple):
+        self.status = response.status
+        self.headers = response.headers
+        self.url = url
+        self._connection = connection
+        self._response = response
+        self._key = key
+    
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self._response.read(amt)
+    
+    def close(self) -> None:
+        if self._connection is None:
+            return
+        
+        response = self._response
+        try:
+            if not response.isclosed() and response.length is not None and response.length <= DRAIN_LIMIT:
+                response.read()
+            reusable = response.isclosed() and not response.will_close
+        except (OSError, http.client.HTTPException):
+            reusable = False
+        
+        response.close()
+        if reusable:
+            _pool.release(self._key, self._connection)
+        else:
+            self._connection.close()
+        self._connection = None
+    
+    def __enter__(self) -> 'Response':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Простаивающие keep-alive соединения по (схема, хост).
+    
+    Общий для потоков процесса; при reuselanguageinvoker соединения
+    переживают переходы между экранами плагина.
+    """
+    
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._stats = {'opened': 0, 'requests': 0, 'reused': 0}
+    
+    def acquire(self, key: tuple, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """Простаивающее соединение или новое (не подключённое). Returns: (соединение, из пула ли)."""
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                connection, released = idle.pop()
+                if now - released < IDLE_TIMEOUT:
+                    self._stats['reused'] += 1
+                    return connection, True
+                connection.close()
+            self._stats['opened'] += 1
+        
+        timing.count('net_connections')
+        scheme, netloc = key
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection_class(netloc, timeout=timeout), False
+    
+    def release(self, key: tuple, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.size:
+                idle.append((connection, time.monotonic()))
+                return
+        connection.close()
+    
+    def count_request(self) -> None:
+        with self._lock:
+            self._stats['requests'] += 1
+        timing.count('net_requests')
+    
+    def clear(self) -> None:
+        """Закрыть все простаивающие соединения."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection, _ in connections:
+                connection.close()
+    
+    def stats(self) -> Dict[str, int]:
+        """Счётчики с начала работы процесса: opened, requests, reused."""
+        with self._lock:
+            return dict(self._stats)
+
+
+_pool = ConnectionPool()
+
+
+def get_stats() -> Dict[str, int]:
+    """Счётчики пула соединений: открыто соединений, выполнено запросов, повторных использований."""
+    return _pool.stats()
+
+
+def format_stats() -> str:
+    """Счётчики пула одной строкой для лога."""
+    stats = get_stats()
+    per_connection = stats['requests'] / stats['opened'] if stats['opened'] else 0
+    return (f"соединений {stats['opened']}, запросов {stats['requests']} "
+            f"({per_connection:.1f} на соединение)")
+
+
+def request(url: str, headers: Optional[Dict[str, str]] = None, method: str = 'GET',
+            retries: Optional[int] = None) -> Response:
+    """
+    Выполнить HTTP-запрос с повторами и предохранителем.
+    
+    Соединение устанавливается с коротким таймаутом (net_connect_timeout),
+    данные ждутся дольше (net_read_timeout). Сетевые ошибки и ответы
+    RETRY_STATUSES повторяются до retries раз с задержкой со случайным
+    разбросом; перенаправления выполняются автоматически.
+    
+    Returns:
+        Ответ с любым другим статусом (200, 304, 404, ...) - его проверяет вызывающий
+    
+    Raises:
+        CircuitOpenError: если предохранитель хоста сработал (без обращения к сети)
+        ConnectionError: если все попытки не удались
+    """
+    host = urllib.parse.urlsplit(url).netloc
+    open_until = _load_breaker().get(host, {}).get('open_until', 0)
+    if open_until > time.time():
+        raise CircuitOpenError(f'Сайт {host} недоступен, повтор через {open_until - time.time():.0f} с')
+    
+    if retries is None:
+        retries = max(get_int_setting('net_retries', RETRIES), 0)
+    
+    headers = dict(headers or {})
+    headers.setdefault('User-Agent', USER_AGENT)
+    
+    error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+        
+        try:
+            response = _open(url, headers, method)
+        except (OSError, http.client.HTTPException) as e:
+            error = e
+            continue
+        
+        if response.status in RETRY_STATUSES:
+            error = f'HTTP {response.status}'
+            response.close()
+            continue
+        
+        _record_result(host, success=True)
+        return response
+    
+    _record_result(host, success=False)
+    raise ConnectionError(f'Не удалось загрузить {url}: {error}')
+
+
+def _open(url: str, headers: Dict[str, str], method: str) -> Response:
+    """Одна попытка запроса (с перенаправлениями) через пул соединений."""
+    connect_timeout = get_int_setting('net_connect_timeout', CONNECT_TIMEOUT)
+    read_timeout = get_int_setting('net_read_timeout', READ_TIMEOUT)
+    
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise http.client.HTTPException(f'Неподдерживаемая схема: {url}')
+        key = (parts.scheme, parts.netloc)
+        
+        path = urllib.parse.quote(parts.path or '/', safe=_PATH_SAFE)
+        if parts.query:
+            path += '?' + parts.query
+        
+        while True:
+            connection, reused = _pool.acquire(key, connect_timeout)
+            try:
+                if not reused:
+                    connection.connect()
+                connection.sock.settimeout(read_timeout)
+                connection.request(method, path, headers=headers)
+                response = connection.getresponse()
+            except _STALE_ERRORS:
+                connection.close()
+                if reused:
+                    # Сервер закрыл простаивавшее соединение - это не ошибка сайта
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            break
+        
+        _pool.count_request()
+        result = Response(connection, response, url, key)
+        
+        location = response.getheader('Location')
+        if response.status not in REDIRECT_STATUSES or not location:
+            return result
+        
+        result.close()
+        url = urllib.parse.urljoin(url, location)
+    
+    raise http.client.HTTPException(f'Слишком много перенаправлений: {url}')
+
+
+# Состояние предохранителя обновляется и из рабочих потоков (подробности,
+# обложки): чтение-изменение-запись файла выполняется под этой блокировкой
+_breaker_lock = threading.Lock()
+
+
+def get_breaker_path() -> str:
+    """Путь к файлу состояния предохранителя (общему для плагина и службы)."""
+    return os.path.join(get_data_dir(), 'net_breaker.json')
+
+
+def _load_breaker() -> Dict[str, dict]:
+    try:
+        with open(get_breaker_path(), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, IOError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def _record_result(host: str, success: bool) -> None:
+    """Учесть исход запроса к хосту в состоянии предохранителя."""
+    with _breaker_lock:
+        state = _load_breaker()
+        entry = state.get(host)
+        
+        if success:
+            if not entry:
+                return
+            del state[host]
+        else:
+            entry = state.setdefault(host, {'failures': 0, 'open_until': 0})
+            entry['failures'] += 1
+            if entry['failures'] >= BREAKER_THRESHOLD:
+                entry['open_until'] = time.time() + BREAKER_COOLDOWN
+        
+        try:
+            atomic_write(get_breaker_path(), json.dumps(state).encode('utf-8'))
+        except (OSError, IOError):
+            pass
+
+
+def reset_breaker() -> None:
+    """Сбросить предохранитель (например, при ручном обновлении каталога)."""
+    with _breaker_lock:
+        try:
+            os.remove(get_breaker_path())
+        except FileNotFoundError:
+            pass
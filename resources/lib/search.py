@@ -0,0 +1,104 @@
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Минимальная доля совпавших триграмм запроса для нечёткого совпадения
+SIMILARITY_THRESHOLD = 0.5
+
+# Запросы короче этого проверяются простым поиском подстроки
+MIN_TRIGRAM_QUERY = 3
+
+_NON_WORD_RE = re.compile(r'[\W_]+')
+
+# Уровни релевантности: чем больше, тем выше в выдаче
+_EXACT, _PREFIX, _SUBSTRING, _FUZZY = 3, 2, 1, 0
+
+
+def normalize(text: str) -> str:
+    """Привести текст к виду для поиска: нижний регистр, Ё→Е, без пунктуации."""
+    text = text.lower().replace('ё', 'е')
+    return _NON_WORD_RE.sub(' ', text).strip()
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """Множество триграмм нормализованной строки (с пробелами по краям)."""
+    padded = f' {normalized} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_index(titles: Iterable[str]) -> Dict:
+    """
+    Построить поисковый индекс по названиям.
+    
+    Returns:
+        Словарь с нормализованными названиями ('titles') и
+        обратным индексом триграмма → номера записей ('trigrams')
+    """
+    normalized = []
+    postings: Dict[str, List[int]] = {}
+    
+    for i, title in enumerate(titles):
+        norm = normalize(title)
+        normalized.append(norm)
+        for gram in trigrams(norm):
+            postings.setdefault(gram, []).append(i)
+    
+    return {'titles': normalized, 'trigrams': postings}
+
+
+def rank(query: str, candidates: Dict[int, Tuple[str, int]]) -> List[int]:
+    """
+    Отсортировать кандидатов по релевантности.
+    
+    Args:
+        query: Нормализованный запрос
+        candidates: номер записи → (нормализованное название, число
+            совпавших триграмм запроса)
+    
+    Returns:
+        Номера подходящих записей, самые релевантные первыми
+    """
+    query_grams = len(trigrams(query))
+    scored = []
+    
+    for record_id, (title, hits) in candidates.items():
+        position = title.find(query)
+        if title == query:
+            level = _EXACT
+        elif position == 0:
+            level = _PREFIX
+        elif position > 0:
+            level = _SUBSTRING
+        else:
+            level = _FUZZY
+            position = len(title)
+        
+        similarity = hits / query_grams if query_grams else 0.0
+        if level == _FUZZY and similarity < SIMILARITY_THRESHOLD:
+            continue
+        
+        scored.append((-level, -similarity, position, record_id))
+    
+    scored.sort()
+    return [record_id for _, _, _, record_id in scored]
+
+
+def search(index: Dict, query: str) -> List[int]:
+    """Найти записи в индексе build_index, самые релевантные первыми."""
+    query = normalize(query)
+    if not query:
+        return []
+    
+    titles = index['titles']
+    
+    if len(query) < MIN_TRIGRAM_QUERY:
+        return rank(query, {
+            i: (title, 0) for i, title in enumerate(titles) if query in title
+        })
+    
+    hits: Dict[int, int] = {}
+    postings = index['trigrams']
+    for gram in trigrams(query):
+        for i in postings.get(gram, ()):
+            hits[i] = hits.get(i, 0) + 1
+    
+    return rank(query, {i: (titles[i], count) for i, count in hits.items()})
@@ -0,0 +1,50 @@
+import os
+
+
+def get_setting(setting_id: str, default: str = '') -> str:
+    """Прочитать настройку плагина (default вне Kodi или если не задана)."""
+    try:
+        import xbmcaddon
+        value = xbmcaddon.Addon().getSetting(setting_id)
+    except ImportError:
+        # Fallback для тестирования без Kodi
+        return default
+    
+    return value if value != '' else default
+
+
+def get_int_setting(setting_id: str, default: int = 0) -> int:
+    """Прочитать целочисленную настройку плагина."""
+    try:
+        return int(get_setting(setting_id, str(default)))
+    except ValueError:
+        return default
+
+
+def get_bool_setting(setting_id: str, default: bool = False) -> bool:
+    """Прочитать логическую настройку плагина."""
+    return get_setting(setting_id, 'true' if default else 'false').lower() == 'true'
+
+
+def get_data_dir() -> str:
+    """Получить каталог данных плагина (userdata/addon_data)."""
+    try:
+        # Попытка использовать Kodi API для получения пути userdata
+        import xbmcvfs
+        import xbmcaddon
+        
+        addon = xbmcaddon.Addon()
+        addon_id = addon.getAddonInfo('id')
+        userdata_path = xbmcvfs.translatePath(f'special://userdata/addon_data/{addon_id}/')
+        
+        # Создать директорию если не существует
+        if not xbmcvfs.exists(userdata_path):
+            xbmcvfs.mkdirs(userdata_path)
+        
+        return userdata_path
+    
+    except ImportError:
+        # Fallback для тестирования без Kodi
+        cache_dir = os.path.expanduser('~/.kodi_arjlover_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        return cache_dir
@@ -0,0 +1,446 @@
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .catalog_parser import DURATION_BUCKETS, Cartoon, title_letter
+    from .cache import get_cache_duration
+    from .settings import get_data_dir
+    from . import search
+except ImportError:
+    # Fallback for testing
+    from catalog_parser import DURATION_BUCKETS, Cartoon, title_letter
+    from cache import get_cache_duration
+    from settings import get_data_dir
+    import search
+
+# Версия схемы базы. При несовпадении кэш считается невалидным
+# и пересоздаётся при следующем сохранении.
+SCHEMA_VERSION = 6
+
+# Столбцы в порядке записи Cartoon.to_record
+_COLUMNS = ('title, prefix, filename, info_prefix, info_name, duration, size, '
+            'play_name, extension, thumbnail, plot')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cartoons (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    info_prefix TEXT NOT NULL,
+    info_name TEXT,
+    duration INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    play_name TEXT,
+    extension TEXT,
+    thumbnail TEXT,
+    plot TEXT,
+    letter TEXT NOT NULL,
+    title_norm TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cartoons_letter ON cartoons (letter);
+CREATE INDEX IF NOT EXISTS idx_cartoons_duration ON cartoons (duration);
+CREATE TABLE IF NOT EXISTS trigrams (
+    trigram TEXT NOT NULL,
+    cartoon_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trigrams_trigram ON trigrams (trigram);
+'''
+
+
+def get_db_path() -> str:
+    """Получить путь к базе SQLite в userdata плагина."""
+    return os.path.join(get_data_dir(), 'catalog.db')
+
+
+def _log_warning(message: str) -> None:
+    try:
+        import xbmc
+        xbmc.log(f"ArjLover: {message}", xbmc.LOGWARNING)
+    except ImportError:
+        print(f"Warning: {message}")
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    Соединение только для чтения.
+    
+    Схема при чтении не создаётся и не проверяется: устаревшую схему
+    отвергает _is_meta_valid, а пересоздаёт её только save_cache.
+    """
+    path = get_db_path().replace('\\', '/')
+    for char, escaped in (('%', '%25'), ('?', '%3f'), ('#', '%23')):
+        path = path.replace(char, escaped)
+    if not path.startswith('/'):
+        # Путь Windows с буквой диска: file:/C:/...
+        path = '/' + path
+    return sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+
+
+def _connect_for_write() -> sqlite3.Connection:
+    """Соединение для записи каталога: схема создаётся (или пересоздаётся при смене версии)."""
+    conn = sqlite3.connect(get_db_path())
+    meta = {}
+    try:
+        meta = _read_meta(conn)
+    except sqlite3.OperationalError:
+        pass
+    if meta and meta.get('schema_version') != str(SCHEMA_VERSION):
+        # Схема устарела: пересоздаём таблицы с нуля
+        conn.executescript(
+            'DROP TABLE IF EXISTS meta; DROP TABLE IF EXISTS cartoons; '
+            'DROP TABLE IF EXISTS trigrams;'
+        )
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _read_meta(conn: sqlite3.Connection) -> dict:
+    return dict(conn.execute('SELECT key, value FROM meta'))
+
+
+def _is_meta_valid(meta: dict, allow_stale: bool = False) -> bool:
+    """Проверить версию схемы и (если не allow_stale) срок жизни кэша."""
+    if meta.get('schema_version') != str(SCHEMA_VERSION):
+        return False
+    
+    try:
+        cache_time = datetime.fromisoformat(meta['timestamp'])
+    except (KeyError, ValueError):
+        return False
+    
+    return allow_stale or datetime.now() - cache_time < get_cache_duration()
+
+
+def _rows_to_cartoons(rows: list) -> List[Cartoon]:
+    return [Cartoon.from_record(row) for row in rows]
+
+
+def _query(sql: str, params: tuple = (), allow_stale: bool = False) -> Optional[List[Cartoon]]:
+    """Выполнить выборку мультфильмов, если кэш валиден."""
+    if not os.path.exists(get_db_path()):
+        return None
+    
+    try:
+        conn = _connect()
+        try:
+            if not _is_meta_valid(_read_meta(conn), allow_stale):
+                return None
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        _log_warning(f"Ошибка чтения кэша: {e}")
+        return None
+    
+    return _rows_to_cartoons(rows)
+
+
+def _load_meta() -> dict:
+    """Метаданные базы ({} если её нет или она не читается)."""
+    if not os.path.exists(get_db_path()):
+        return {}
+    try:
+        conn = _connect()
+        try:
+            return _read_meta(conn)
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return {}
+
+
+def get_generation() -> str:
+    """Поколение каталога: меняется при каждой перезаписи (save_cache), '' - каталога нет."""
+    return _load_meta().get('generation', '')
+
+
+def get_validators() -> Dict[str, str]:
+    """Валидаторы HTTP (ETag/Last-Modified) сохранённого каталога."""
+    meta = _load_meta()
+    return {
+        'etag': meta.get('etag', ''),
+        'last_modified': meta.get('last_modified', '')
+    }
+
+
+def touch_cache(etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+    """
+    Продлить срок жизни кэша без перезаписи каталога (ответ 304 или
+    неизменившийся каталог - тогда сохраняются и новые валидаторы).
+    """
+    if not os.path.exists(get_db_path()):
+        return False
+    
+    updates = [('timestamp', datetime.now().isoformat())]
+    if etag is not None:
+        updates.append(('etag', etag))
+    if last_modified is not None:
+        updates.append(('last_modified', last_modified))
+    
+    try:
+        conn = sqlite3.connect(get_db_path())
+        try:
+            with conn:
+                if not _is_meta_valid(_read_meta(conn), allow_stale=True):
+                    return False
+                conn.executemany(
+                    'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                    updates
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        _log_warning(f"Не удалось продлить кэш: {e}")
+        return False
+    
+    return True
+
+
+def save_cache(cartoons: List[Cartoon], etag: str = '', last_modified: str = '') -> bool:
+    """Сохранить список мультфильмов в базу (одной транзакцией); True, если сохранён."""
+    try:
+        conn = _connect_for_write()
+        try:
+            normalized = [search.normalize(c.title) for c in cartoons]
+            with conn:
+                conn.execute('DELETE FROM cartoons')
+                conn.execute('DELETE FROM trigrams')
+                conn.executemany(
+                    f'INSERT INTO cartoons (id, {_COLUMNS}, letter, title_norm) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        (i, *c.to_record(trim=False), title_letter(c.title), normalized[i])
+                        for i, c in enumerate(cartoons)
+                    )
+                )
+                conn.executemany(
+                    'INSERT INTO trigrams (trigram, cartoon_id) VALUES (?, ?)',
+                    (
+                        (gram, i)
+                        for i, norm in enumerate(normalized)
+                        for gram in search.trigrams(norm)
+                    )
+                )
+                conn.executemany(
+                    'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                    [
+                        ('schema_version', str(SCHEMA_VERSION)),
+                        ('timestamp', datetime.now().isoformat()),
+                        # В touch_cache не меняется: по нему плагин судит,
+                        # изменилось ли содержимое списков
+                        ('generation', datetime.now().isoformat()),
+                        ('count', str(len(cartoons))),
+                        ('etag', etag),
+                        ('last_modified', last_modified)
+                    ]
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        _log_warning(f"Не удалось сохранить кэш: {e}")
+        return False
+    return True
+
+
+def load_cache(allow_stale: bool = False) -> Optional[List[Cartoon]]:
+    """Загрузить весь каталог из базы."""
+    return _query(f'SELECT {_COLUMNS} FROM cartoons ORDER BY id', allow_stale=allow_stale)
+
+
+def load_by_letter(letter: str, allow_stale: bool = False) -> Optional[List[Cartoon]]:
+    """Загрузить мультфильмы на букву через индекс по первой букве."""
+    return _query(
+        f'SELECT {_COLUMNS} FROM cartoons WHERE letter = ? ORDER BY id',
+        (letter,),
+        allow_stale
+    )
+
+
+def _duration_filter(duration: str) -> Tuple[str, tuple]:
+    """Условие WHERE для группы длительности (неизвестная длительность 0 - вне групп)."""
+    for key, _, low, high in DURATION_BUCKETS:
+        if key == duration:
+            if high is None:
+                return 'WHERE duration >= ?', (max(low, 1),)
+            return 'WHERE duration >= ? AND duration < ?', (max(low, 1), high)
+    return 'WHERE 0', ()
+
+
+def load_by_duration(duration: str, allow_stale: bool = False) -> Optional[List[Cartoon]]:
+    """Загрузить мультфильмы группы длительности через индекс по длительности."""
+    where, params = _duration_filter(duration)
+    return _query(f'SELECT {_COLUMNS} FROM cartoons {where} ORDER BY id', params, allow_stale)
+
+
+def duration_counts(allow_stale: bool = False) -> Optional[Dict[str, int]]:
+    """Количество мультфильмов в каждой группе длительности (только непустые)."""
+    if not os.path.exists(get_db_path()):
+        return None
+    
+    try:
+        conn = _connect()
+        try:
+            if not _is_meta_valid(_read_meta(conn), allow_stale):
+                return None
+            counts = {}
+            for key, *_ in DURATION_BUCKETS:
+                where, params = _duration_filter(key)
+                counts[key] = conn.execute(f'SELECT COUNT(*) FROM cartoons {where}', params).fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        _log_warning(f"Ошибка чтения кэша: {e}")
+        return None
+    
+    return {key: count for key, count in counts.items() if count}
+
+
+def letter_counts(allow_stale: bool = False) -> Optional[Dict[str, int]]:
+    """Количество мультфильмов на каждую букву (только непустые буквы)."""
+    if not os.path.exists(get_db_path()):
+        return None
+    
+    try:
+        conn = _connect()
+        try:
+            if not _is_meta_valid(_read_meta(conn), allow_stale):
+                return None
+            rows = conn.execute('SELECT letter, COUNT(*) FROM cartoons GROUP BY letter').fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        _log_warning(f"Ошибка чтения кэша: {e}")
+        return None
+    
+    return dict(rows)
+
+
+def load_page(offset: int, limit: int, letter: Optional[str] = None,
+              duration: Optional[str] = None,
+              allow_stale: bool = False) -> Optional[Tuple[List[Cartoon], int]]:
+    """
+    Загрузить одну страницу каталога (буквы или группы длительности) через LIMIT/OFFSET.
+    
+    Returns:
+        (мультфильмы страницы, всего записей) или None, если кэша нет
+    """
+    if not os.path.exists(get_db_path()):
+        return None
+    
+    if letter is not None:
+        where, params = 'WHERE letter = ?', (letter,)
+    elif duration is not None:
+        where, params = _duration_filter(duration)
+    else:
+        where, params = '', ()
+    
+    try:
+        conn = _connect()
+        try:
+            if not _is_meta_valid(_read_meta(conn), allow_stale):
+                return None
+            total = conn.execute(f'SELECT COUNT(*) FROM cartoons {where}', params).fetchone()[0]
+            rows = conn.execute(
+                f'SELECT {_COLUMNS} FROM cartoons {where} ORDER BY id LIMIT ? OFFSET ?',
+                params + (limit, offset)
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        _log_warning(f"Ошибка чтения кэша: {e}")
+        return None
+    
+    return _rows_to_cartoons(rows), total
+
+
+def search_cartoons(query: str, allow_stale: bool = False) -> Optional[List[Cartoon]]:
+    """
+    Найти мультфильмы по названию через таблицу триграмм.
+    
+    Поиск не зависит от регистра и различия Ё/Е, допускает опечатки;
+    результаты отсортированы по релевантности.
+    """
+    if not os.path.exists(get_db_path()):
+        return None
+    
+    normalized = search.normalize(query)
+    
+    try:
+        conn = _connect()
+        try:
+            if not _is_meta_valid(_read_meta(conn), allow_stale):
+                return None
+            
+            if not normalized:
+                return []
+            
+            if len(normalized) < search.MIN_TRIGRAM_QUERY:
+                rows = conn.execute(
+                    'SELECT id, title_norm, 0 FROM cartoons WHERE instr(title_norm, ?) > 0',
+                    (normalized,)
+                )
+            else:
+                grams = sorted(search.trigrams(normalized))
+                rows = conn.execute(
+                    'SELECT c.id, c.title_norm, COUNT(*) FROM trigrams t '
+                    'JOIN cartoons c ON c.id = t.cartoon_id '
+                    f'WHERE t.trigram IN ({", ".join("?" * len(grams))}) '
+                    'GROUP BY c.id',
+                    grams
+                )
+            
+            ranked = search.rank(normalized, {
+                cartoon_id: (title_norm, hits) for cartoon_id, title_norm, hits in rows
+            })
+            if not ranked:
+                return []
+            
+            # Загружаем только найденные записи и сохраняем порядок релевантности
+            by_id = {}
+            for start in range(0, len(ranked), 500):
+                chunk = ranked[start:start + 500]
+                for row in conn.execute(
+                    f'SELECT id, {_COLUMNS} FROM cartoons '
+                    f'WHERE id IN ({", ".join("?" * len(chunk))})',
+                    chunk
+                ):
+                    by_id[row[0]] = row[1:]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        _log_warning(f"Ошибка поиска в кэше: {e}")
+        return None
+    
+    return _rows_to_cartoons([by_id[cartoon_id] for cartoon_id in ranked])
+
+
+def is_cache_valid() -> bool:
+    """Проверить валидность кэша (версия схемы и срок жизни)."""
+    if not os.path.exists(get_db_path()):
+        return False
+    
+    try:
+        conn = _connect()
+        try:
+            return _is_meta_valid(_read_meta(conn))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+
+def clear_cache() -> None:
+    """Удалить файл базы."""
+    for path in (get_db_path(), get_db_path() + '-journal'):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            _log_warning(f"Не удалось удалить кэш: {e}")
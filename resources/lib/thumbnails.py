@@ -0,0 +1,592 @@
+import json
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    from .settings import get_data_dir
+    from .locking import atomic_write
+    from . import listing_version
+except ImportError:
+    # Fallback for testing
+    from settings import get_data_dir
+    from locking import atomic_write
+    import listing_version
+
+# Сообщение NotifyAll, по которому служба сразу догружает обложки из очереди
+PREFETCH_MESSAGE = 'arjlover.thumbnails'
+
+DEFAULT_BUDGET_MB = 100
+DEFAULT_WORKERS = 4
+DEFAULT_PER_HOST = 2
+DEFAULT_RATE = 4.0
+DEFAULT_BATCH = 300
+
+# Обложки больше этого размера не сохраняются
+MAX_THUMBNAIL_BYTES = 1024 * 1024
+
+# Типичный размер обложки на сайте, байт (оценка, пока своих файлов нет)
+TYPICAL_THUMBNAIL_BYTES = 16 * 1024
+
+# Через сколько секунд повторять загрузку обложки, которой не оказалось на сайте
+FAILED_RETRY = 7 * 24 * 3600
+
+# Очередь от плагина не растёт больше этого размера, байт
+QUEUE_LIMIT = 256 * 1024
+
+# Проверка наличия обложек: скорость (запросы HEAD дешёвые), через сколько
+# секунд перепроверять найденные и варианты имени после угаданного thumb1
+DEFAULT_PROBE_RATE = 8.0
+DEFAULT_PROBE_BATCH = 1000
+PROBE_MAX_AGE = 30 * 24 * 3600
+THUMBNAIL_VARIANTS = ('thumb1', 'thumb2', 'thumb3')
+_THUMB_VARIANT = re.compile(r'\.(thumb1)\.jpg$')
+
+INDEX_FILE = 'index.json'
+QUEUE_FILE = 'queue.log'
+PROBES_FILE = 'probes.json'
+RESOLVED_FILE = 'resolved.json'
+
+
+def get_thumbnails_dir() -> str:
+    """Каталог локальных обложек в userdata плагина."""
+    return os.path.join(get_data_dir(), 'thumbnails')
+
+
+def thumbnail_name(url: str) -> str:
+    """
+    Имя локального файла обложки.
+    
+    64 бита из CRC32 и Adler-32 адреса: коллизии на десятках тысяч
+    обложек практически исключены, а hashlib при старте плагина не
+    импортируется (~3 мс).
+    """
+    data = url.encode('utf-8')
+    return f'{zlib.crc32(data):08x}{zlib.adler32(data):08x}.jpg'
+
+
+def _log(message: str, warning: bool = False) -> None:
+    try:
+        import xbmc
+        xbmc.log(f"ArjLover: {message}", xbmc.LOGWARNING if warning else xbmc.LOGINFO)
+    except ImportError:
+        print(f"{'Warning' if warning else 'Info'}: {message}")
+
+
+class ThumbnailLookup:
+    """
+    Подстановка локальных обложек при выводе списка.
+    
+    Наличие файлов проверяется одним listdir, без stat на каждый пункт.
+    Показанные обложки (для LRU) и недостающие (для догрузки) копятся
+    в памяти и одной записью отправляются службе в flush().
+    
+        lookup = ThumbnailLookup()
+        art = lookup.get(cartoon.thumbnail)
+        ...
+        lookup.flush()
+    """
+    
+    def __init__(self, prefetch: bool = True):
+        self.directory = get_thumbnails_dir()
+        self.prefetch = prefetch
+        try:
+            self.present = set(os.listdir(self.directory))
+        except OSError:
+            self.present = set()
+        
+        self.resolved = {}
+        if RESOLVED_FILE in self.present:
+            try:
+                with open(os.path.join(self.directory, RESOLVED_FILE), 'r', encoding='utf-8') as f:
+                    self.resolved = json.load(f)
+            except (OSError, IOError, ValueError):
+                pass
+        
+        self._lines = []
+        self.missing = 0
+    
+    def get(self, url: str) -> str:
+        """
+        Путь к локальной обложке или адрес на сайте, если её ещё нет.
+        
+        Адрес заменяется найденным при проверке; '' - проверка не нашла
+        обложку, и пункт выводится без неё.
+        """
+        if not url:
+            return url
+        
+        resolved = self.resolved.get(url, url)
+        if not resolved:
+            return ''
+        
+        name = thumbnail_name(resolved)
+        if name in self.present:
+            self._lines.append(name)
+            return os.path.join(self.directory, name)
+        
+        # Служба получает исходный адрес: по нему хранится результат проверки
+        self._lines.append(f'{name} {url}')
+        self.missing += 1
+        return resolved
+    
+    def flush(self) -> None:
+        """Дописать показанные обложки в очередь службы и разбудить её, если чего-то нет."""
+        if not (self.prefetch and self._lines):
+            return
+        
+        path = os.path.join(self.directory, QUEUE_FILE)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) > QUEUE_LIMIT:
+                return
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(self._lines) + '\n')
+        except OSError as e:
+            _log(f"Не удалось записать очередь обложек: {e}", warning=True)
+            return
+        finally:
+            self._lines = []
+        
+        if self.missing:
+            request_prefetch()
+
+
+def request_prefetch() -> None:
+    """Попросить фоновую службу загрузить недостающие обложки из очереди."""
+    try:
+        import xbmc
+        xbmc.executebuiltin(f'NotifyAll(plugin.video.arjlover,{PREFETCH_MESSAGE})')
+    except ImportError:
+        # Вне Kodi фоновой службы нет
+        pass
+
+
+def get_index_path() -> str:
+    """Путь к индексу локальных обложек (перезаписывается после каждой загрузки службой)."""
+    return os.path.join(get_thumbnails_dir(), INDEX_FILE)
+
+
+def load_index() -> dict:
+    """
+    Индекс локальных обложек, сверенный с содержимым каталога.
+    
+    Returns:
+        {'files': {имя: [размер, время последнего показа]}, 'failed': {имя: время}}
+    """
+    directory = get_thumbnails_dir()
+    try:
+        with open(get_index_path(), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        files, failed = index['files'], index['failed']
+    except (OSError, IOError, ValueError, KeyError, TypeError):
+        files, failed = {}, {}
+    
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith('.jpg')]
+    except OSError:
+        names = []
+    
+    # Файлы, удалённые или добавленные в обход индекса
+    now = time.time()
+    present = {}
+    for name in names:
+        entry = files.get(name)
+        if entry is None:
+            try:
+                entry = [os.path.getsize(os.path.join(directory, name)), now]
+            except OSError:
+                continue
+        present[name] = entry
+    
+    return {'files': present, 'failed': failed}
+
+
+def save_index(index: dict) -> None:
+    try:
+        atomic_write(
+            get_index_path(),
+            json.dumps(index, separators=(',', ':')).encode('utf-8')
+        )
+    except (OSError, IOError) as e:
+        _log(f"Не удалось сохранить индекс обложек: {e}", warning=True)
+
+
+def take_queue(index: dict) -> List[str]:
+    """
+    Забрать очередь от плагина: обновить время показа имеющихся обложек.
+    
+    Returns:
+        Исходные адреса недостающих обложек в порядке показа, без повторов
+    """
+    path = os.path.join(get_thumbnails_dir(), QUEUE_FILE)
+    taken = path + '.taken'
+    try:
+        # Переименование атомарно: строки, дописанные плагином после
+        # него, попадут в новую очередь
+        os.replace(path, taken)
+        with open(taken, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        os.remove(taken)
+    except OSError:
+        return []
+    
+    now = time.time()
+    files = index['files']
+    wanted = {}
+    for line in lines:
+        name, _, url = line.partition(' ')
+        if name in files:
+            files[name][1] = now
+        elif url:
+            wanted.setdefault(name, url)
+    return list(wanted.values())
+
+
+def evict(index: dict, budget: int) -> int:
+    """
+    Удалить давно не показывавшиеся обложки, пока их объём больше budget байт.
+    
+    Returns:
+        Количество удалённых файлов
+    """
+    files = index['files']
+    total = sum(size for size, _ in files.values())
+    if total <= budget:
+        return 0
+    
+    directory = get_thumbnails_dir()
+    removed = 0
+    for name in sorted(files, key=lambda n: files[n][1]):
+        if total <= budget:
+            break
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            continue
+        total -= files.pop(name)[0]
+        removed += 1
+    return removed
+
+
+def download(url: str, path: str) -> Optional[int]:
+    """
+    Загрузить обложку в файл.
+    
+    Returns:
+        Размер файла; 0 если обложки нет на сайте; None при сетевой ошибке
+    """
+    # Сетевые модули нужны только службе, плагин их не импортирует
+    import http.client
+    try:
+        from .net import request
+    except ImportError:
+        from net import request
+    
+    try:
+        with request(url, retries=0) as response:
+            if response.status in (404, 410):
+                return 0
+            content_type = response.headers.get('Content-Type', 'image/')
+            if response.status != 200 or not content_type.startswith('image/'):
+                return None
+            chunks = []
+            received = 0
+            while received <= MAX_THUMBNAIL_BYTES:
+                chunk = response.read(64 * 1024)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                received += len(chunk)
+    except (ConnectionError, OSError, http.client.HTTPException):
+        return None
+    
+    if not received or received > MAX_THUMBNAIL_BYTES:
+        return 0
+    
+    try:
+        atomic_write(path, b''.join(chunks))
+    except OSError:
+        return None
+    return received
+
+
+def _run_limited(items: List[str], task: Callable[[str], object], workers: int,
+                 per_host: int, rate: float, should_stop: Optional[Callable[[], bool]]):
+    """
+    Выполнить task(адрес) для адресов параллельно с ограничениями details.enrich.
+    
+    Yields:
+        (адрес, результат) в порядке завершения; None - прервано
+    """
+    try:
+        from .details import HostLimiter, RateLimiter
+    except ImportError:
+        from details import HostLimiter, RateLimiter
+    
+    limiter = RateLimiter(rate)
+    hosts = HostLimiter(per_host)
+    
+    def limited(url: str):
+        if should_stop is not None and should_stop():
+            return None
+        with hosts.get(url):
+            limiter.wait()
+            return task(url)
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(limited, url): url for url in items}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def prefetch(urls: Iterable[str],
+             budget: int = DEFAULT_BUDGET_MB * 1024 * 1024,
+             workers: int = DEFAULT_WORKERS,
+             per_host: int = DEFAULT_PER_HOST,
+             rate: float = DEFAULT_RATE,
+             limit: Optional[int] = None,
+             should_stop: Optional[Callable[[], bool]] = None,
+             fetch: Callable[[str, str], Optional[int]] = download,
+             check: Optional[Callable[[str], Optional[bool]]] = None) -> int:
+    """
+    Загрузить недостающие обложки в локальный кэш.
+    
+    Сначала загружаются обложки, которых не хватило при показе списков
+    (очередь плагина): ради них вытесняются давно не показывавшиеся, а
+    ещё не проверенные адреса предварительно проверяются probe().
+    Затем, пока есть место в бюджете, - остальные из urls по порядку.
+    Загружаются адреса, найденные проверкой, а не угаданные по имени файла.
+    
+    Args:
+        urls: адреса обложек каталога (для упреждающей загрузки)
+        budget: объём кэша обложек, байт
+        limit: максимум загрузок за вызов
+        should_stop: проверка прерывания (например, monitor.abortRequested)
+        fetch: функция загрузки (адрес, путь) -> размер, 0 или None
+        check: функция проверки для probe()
+    
+    Returns:
+        Количество загруженных обложек
+    """
+    directory = get_thumbnails_dir()
+    os.makedirs(directory, exist_ok=True)
+    
+    index = load_index()
+    files, failed = index['files'], index['failed']
+    demand = take_queue(index)
+    if limit is not None:
+        demand = demand[:limit]
+    
+    probes = load_probes()
+    probe(demand, workers=workers, per_host=per_host, rate=rate, should_stop=should_stop,
+          check=check or exists, probes=probes)
+    
+    now = time.time()
+    used = sum(size for size, _ in files.values())
+    
+    pending = []
+    seen = set()
+    
+    def add(url: str) -> None:
+        entry = probes.get(url)
+        target = url if entry is None else entry[0]
+        if not target or target in seen:
+            return
+        name = thumbnail_name(target)
+        if name not in files and now - failed.get(name, 0) >= FAILED_RETRY:
+            seen.add(target)
+            pending.append(target)
+    
+    for url in demand:
+        add(url)
+    demand_count = len(pending)
+    
+    # Упреждающая загрузка не вытесняет показанные обложки: оценка по
+    # среднему размеру, чтобы не превысить бюджет
+    average = used / len(files) if files else TYPICAL_THUMBNAIL_BYTES
+    room = int((budget - used) // max(average, 1))
+    if limit is not None:
+        room = min(room, limit - demand_count)
+    for url in urls:
+        if len(pending) - demand_count >= room:
+            break
+        add(url)
+    
+    def task(url: str) -> Optional[int]:
+        return fetch(url, os.path.join(directory, thumbnail_name(url)))
+    
+    fetched = 0
+    for url, size in _run_limited(pending, task, workers, per_host, rate, should_stop):
+        name = thumbnail_name(url)
+        if size:
+            files[name] = [size, time.time()]
+            failed.pop(name, None)
+            fetched += 1
+        elif size == 0:
+            failed[name] = time.time()
+    
+    # Загруженные только что обложки - самые свежие и вытесняются последними
+    evicted = evict(index, budget)
+    index['failed'] = {name: at for name, at in failed.items() if now - at < FAILED_RETRY}
+    save_index(index)
+    if fetched or evicted:
+        listing_version.bump('thumbnails')
+    return fetched
+
+
+def candidates(url: str) -> List[str]:
+    """Адреса, по которым может лежать обложка: угаданный и его варианты thumbN."""
+    match = _THUMB_VARIANT.search(url)
+    if match is None:
+        return [url]
+    return [url[:match.start(1)] + variant + url[match.end(1):] for variant in THUMBNAIL_VARIANTS]
+
+
+def exists(url: str) -> Optional[bool]:
+    """
+    Проверить, есть ли файл на сайте, не загружая его.
+    
+    Запрос HEAD; если сервер его не поддерживает - GET первого байта.
+    
+    Returns:
+        True/False; None при сетевой ошибке (результат неизвестен)
+    """
+    import http.client
+    try:
+        from .net import request
+    except ImportError:
+        from net import request
+    
+    try:
+        with request(url, method='HEAD', retries=0) as response:
+            status = response.status
+        if status in (405, 501):
+            with request(url, headers={'Range': 'bytes=0-0'}, retries=0) as response:
+                status = response.status
+    except (ConnectionError, OSError, http.client.HTTPException):
+        return None
+    
+    if status in (200, 206):
+        return True
+    if status in (403, 404, 410):
+        return False
+    return None
+
+
+def get_probes_path() -> str:
+    """Результаты проверки: угаданный адрес -> [найденный адрес или '', время проверки]."""
+    return os.path.join(get_thumbnails_dir(), PROBES_FILE)
+
+
+def load_probes() -> Dict[str, list]:
+    try:
+        with open(get_probes_path(), 'r', encoding='utf-8') as f:
+            probes = json.load(f)
+    except (OSError, IOError, ValueError):
+        return {}
+    return probes if isinstance(probes, dict) else {}
+
+
+def save_probes(probes: Dict[str, list]) -> None:
+    """
+    Сохранить результаты проверки и замены адресов для плагина.
+    
+    Плагину нужны только отличия от угаданных адресов, поэтому они
+    пишутся отдельным маленьким файлом и список не читает весь каталог
+    проверок.
+    """
+    resolved = {url: entry[0] for url, entry in probes.items() if entry[0] != url}
+    try:
+        directory = get_thumbnails_dir()
+        os.makedirs(directory, exist_ok=True)
+        atomic_write(get_probes_path(), json.dumps(probes, separators=(',', ':')).encode('utf-8'))
+        atomic_write(os.path.join(directory, RESOLVED_FILE),
+                     json.dumps(resolved, separators=(',', ':')).encode('utf-8'))
+    except (OSError, IOError) as e:
+        _log(f"Не удалось сохранить проверки обложек: {e}", warning=True)
+
+
+def probe(urls: Iterable[str],
+          workers: int = DEFAULT_WORKERS,
+          per_host: int = DEFAULT_PER_HOST,
+          rate: float = DEFAULT_PROBE_RATE,
+          limit: Optional[int] = None,
+          should_stop: Optional[Callable[[], bool]] = None,
+          check: Callable[[str], Optional[bool]] = exists,
+          probes: Optional[Dict[str, list]] = None) -> int:
+    """
+    Параллельно проверить угаданные адреса обложек и их варианты.
+    
+    Для каждого адреса проверяются candidates() по порядку до первого
+    существующего; результат (адрес или '' - обложки нет) сохраняется
+    по угаданному адресу. Найденные обложки перепроверяются через
+    PROBE_MAX_AGE, ненайденные - через FAILED_RETRY.
+    
+    Args:
+        urls: угаданные адреса обложек (Cartoon.thumbnail)
+        limit: максимум проверяемых записей за вызов
+        check: функция проверки одного адреса -> True/False/None
+        probes: уже загруженные результаты (обновляются на месте)
+    
+    Returns:
+        Количество проверенных записей
+    """
+    if probes is None:
+        probes = load_probes()
+    
+    now = time.time()
+    pending = []
+    seen = set()
+    for url in urls:
+        if not url or url in seen:
+            continue
+        entry = probes.get(url)
+        if entry is not None and now - entry[1] < (PROBE_MAX_AGE if entry[0] else FAILED_RETRY):
+            continue
+        seen.add(url)
+        pending.append(url)
+        if limit is not None and len(pending) >= limit:
+            break
+    
+    if not pending:
+        return 0
+    
+    def task(url: str) -> Optional[str]:
+        for candidate in candidates(url):
+            found = check(candidate)
+            if found is None:
+                return None
+            if found:
+                return candidate
+        return ''
+    
+    probed = 0
+    for url, found in _run_limited(pending, task, workers, per_host, rate, should_stop):
+        if found is not None:
+            probes[url] = [found, time.time()]
+            probed += 1
+    
+    save_probes(probes)
+    if probed:
+        listing_version.bump('thumbnails')
+    return probed
+
+
+def clear_thumbnails() -> None:
+    """Удалить все локальные обложки и результаты их проверки."""
+    directory = get_thumbnails_dir()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
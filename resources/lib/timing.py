@@ -0,0 +1,205 @@
+import os
+import time
+
+try:
+    from .settings import get_bool_setting, get_data_dir, get_setting
+except ImportError:
+    # Fallback for testing
+    from settings import get_bool_setting, get_data_dir, get_setting
+
+# Уровни записи замеров в лог Kodi (значения настройки timing_log_level)
+LOG_LEVELS = ('off', 'debug', 'info')
+
+# Сколько последних профилей хранить в addon_data/profiles
+PROFILES_KEEP = 20
+
+# Замеры текущего действия: фаза -> секунды (None - замер не идёт).
+# Плагин выполняет действие в одном потоке, поэтому состояние общее.
+# typing не импортируется: модуль загружается при каждом старте плагина
+_phases = None
+_counters = None
+_current = None
+_stack = []
+_mark = 0.0
+
+
+def _switch(now: float) -> None:
+    """Начислить время с прошлой отметки фазе на вершине стека."""
+    global _mark
+    if _stack:
+        _phases[_stack[-1]] += now - _mark
+    _mark = now
+
+
+class phase:
+    """
+    Замер фазы действия (cache_load, fetch, parse, render, ...).
+    
+    Фазы могут быть вложенными: время вложенной фазы не входит во
+    внешнюю. Вне timing.action замер ничего не делает.
+    
+        with phase('save'):
+            storage.save_cache(cartoons)
+    """
+    
+    __slots__ = ('name',)
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __enter__(self) -> 'phase':
+        if _phases is not None:
+            _switch(time.perf_counter())
+            _phases.setdefault(self.name, 0.0)
+            _stack.append(self.name)
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        if _phases is not None and _stack:
+            _switch(time.perf_counter())
+            _stack.pop()
+
+
+def count(name: str, value: int = 1) -> None:
+    """Увеличить счётчик текущего действия (например, число HTTP-запросов)."""
+    if _counters is not None:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def fail(exc: BaseException) -> None:
+    """Отметить ошибку, обработанную внутри действия: она попадёт в его строку лога."""
+    if _current is not None:
+        _current.error = exc
+
+
+def timed_iter(name: str, iterable):
+    """
+    Итератор, время получения каждого элемента которого относится к фазе.
+    
+    Нужен для потоковой загрузки: сеть, распаковка и разбор чередуются,
+    и обернуть их одним with нельзя.
+    """
+    if _phases is None:
+        yield from iterable
+        return
+    
+    iterator = iter(iterable)
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class action:
+    """
+    Замер действия роутера целиком.
+    
+    По завершении время действия и его фаз пишется в лог Kodi с уровнем
+    из настройки timing_log_level, а при включённой настройке
+    profile_enabled действие выполняется под cProfile и профиль
+    сохраняется в addon_data/profiles для разбора через pstats.
+    
+        with timing.action('listing'):
+            list_videos(...)
+    """
+    
+    def __init__(self, name: str, log_level=None, profile=None):
+        self.name = name
+        self.log_level = get_setting('timing_log_level', 'debug') if log_level is None else log_level
+        self.profile = get_bool_setting('profile_enabled') if profile is None else profile
+        self.phases = {}
+        self.counters = {}
+        self.elapsed = 0.0
+        self.error = None
+        self.profile_path = ''
+        self._profiler = None
+        self._start = 0.0
+    
+    def __enter__(self) -> 'action':
+        global _phases, _counters, _current
+        if self.log_level not in LOG_LEVELS[1:] and not self.profile:
+            return self
+        
+        _phases = self.phases
+        _counters = self.counters
+        _current = self
+        del _stack[:]
+        
+        if self.profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        
+        self._start = time.perf_counter()
+        _switch(self._start)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        global _phases, _counters, _current
+        if _phases is not self.phases:
+            return
+        
+        finished = time.perf_counter()
+        _switch(finished)
+        _phases = None
+        _counters = None
+        _current = None
+        del _stack[:]
+        self.elapsed = finished - self._start
+        
+        if self._profiler is not None:
+            self._profiler.disable()
+            self.profile_path = _dump_profile(self.name, self._profiler)
+        
+        if self.log_level in LOG_LEVELS[1:]:
+            _log(self.summary(exc), self.log_level)
+    
+    def summary(self, exc=None) -> str:
+        """Строка для лога: время действия и фаз, мс (и ошибка - исключение или отмеченная fail)."""
+        exc = exc if exc is not None else self.error
+        parts = [f'{name} {seconds * 1000:.1f}' for name, seconds in self.phases.items()]
+        other = self.elapsed - sum(self.phases.values())
+        parts.append(f'прочее {other * 1000:.1f}')
+        
+        message = f'{self.name} {self.elapsed * 1000:.1f} мс ({", ".join(parts)})'
+        if self.counters:
+            message += ', ' + ', '.join(f'{name} {value}' for name, value in self.counters.items())
+        if exc is not None:
+            message += f', ошибка: {exc!r}'
+        if self.profile_path:
+            message += f', профиль: {self.profile_path}'
+        return message
+
+
+def _dump_profile(name: str, profiler) -> str:
+    """Сохранить профиль действия, удалив самые старые. Возвращает путь ('' при ошибке)."""
+    directory = os.path.join(get_data_dir(), 'profiles')
+    path = os.path.join(directory, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}.pstats')
+    
+    try:
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(path)
+        
+        profiles = sorted(
+            (os.path.join(directory, filename) for filename in os.listdir(directory)
+             if filename.endswith('.pstats')),
+            key=os.path.getmtime
+        )
+        for old in profiles[:-PROFILES_KEEP]:
+            os.remove(old)
+    except OSError as e:
+        _log(f'Не удалось сохранить профиль: {e}', 'info')
+        return ''
+    
+    return path
+
+
+def _log(message: str, level: str) -> None:
+    try:
+        import xbmc
+        xbmc.log(f"ArjLover: {message}", xbmc.LOGINFO if level == 'info' else xbmc.LOGDEBUG)
+    except ImportError:
+        print(f"Timing: {message}")
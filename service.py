@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+
+import xbmc
+
+# Каталог модулей плагина ставится первым, чтобы их не перекрывали
+# одноимённые модули стандартной библиотеки
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', 'lib'))
+
+from catalog import REFRESH_MESSAGE, IncompleteCatalogError, get_storage, refresh_catalog
+from settings import get_bool_setting, get_int_setting, get_setting
+from thumbnails import PREFETCH_MESSAGE
+
+# Пауза после запуска Kodi перед первой проверкой кэша, секунд
+STARTUP_DELAY = 30
+
+
+class RefreshMonitor(xbmc.Monitor):
+    """Монитор Kodi, принимающий запросы на обновление от плагина."""
+    
+    def __init__(self):
+        super().__init__()
+        self.refresh_requested = False
+        self.prefetch_requested = False
+    
+    def onNotification(self, sender, method, data):
+        if method == f'Other.{REFRESH_MESSAGE}':
+            self.refresh_requested = True
+        elif method == f'Other.{PREFETCH_MESSAGE}':
+            self.prefetch_requested = True
+
+
+def refresh_if_stale():
+    """Обновить каталог, если срок жизни кэша истёк."""
+    storage = get_storage()
+    if storage.is_cache_valid():
+        return
+    
+    try:
+        if refresh_catalog(storage):
+            xbmc.log('ArjLover: Каталог обновлён в фоне', xbmc.LOGINFO)
+        else:
+            xbmc.log('ArjLover: Каталог на сайте не изменился, кэш продлён', xbmc.LOGDEBUG)
+    except ConnectionError as e:
+        xbmc.log(f'ArjLover: Фоновое обновление не удалось: {e}', xbmc.LOGWARNING)
+    except IncompleteCatalogError as e:
+        xbmc.log(f'ArjLover: Фоновое обновление отклонено: {e}', xbmc.LOGWARNING)
+
+
+def enrich_details(monitor):
+    """Догрузить подробности для очередной порции мультфильмов."""
+    from details import DEFAULT_RATE, enrich
+    
+    cartoons = get_storage().load_cache(allow_stale=True)
+    if not cartoons:
+        return
+    
+    try:
+        rate = float(get_setting('details_rate', str(DEFAULT_RATE)))
+    except ValueError:
+        rate = DEFAULT_RATE
+    
+    fetched = enrich(
+        (cartoon.info_url for cartoon in cartoons),
+        workers=get_int_setting('details_workers', 4),
+        rate=rate,
+        limit=get_int_setting('details_batch', 200),
+        should_stop=monitor.abortRequested
+    )
+    if fetched:
+        from net import format_stats
+        xbmc.log(f'ArjLover: Загружены подробности: {fetched}; {format_stats()}', xbmc.LOGINFO)
+
+
+def prefetch_thumbnails(monitor, probe_catalog=False):
+    """
+    Загрузить обложки, которых не хватило в показанных списках, и следующие по каталогу.
+    
+    При probe_catalog (проход по расписанию) ещё и проверить наличие
+    очередной порции угаданных обложек каталога.
+    """
+    from thumbnails import (DEFAULT_BATCH, DEFAULT_BUDGET_MB, DEFAULT_PROBE_BATCH,
+                            DEFAULT_WORKERS, prefetch, probe)
+    
+    cartoons = get_storage().load_cache(allow_stale=True) or []
+    workers = get_int_setting('thumbnails_workers', DEFAULT_WORKERS)
+    
+    # Адреса обложек те же, что выводит плагин: настоящая обложка со
+    # страницы подробностей, если она уже загружена
+    urls = (cartoon.thumbnail for cartoon in cartoons)
+    if get_bool_setting('details_enabled'):
+        from details import details_info, load_details
+        store = load_details()
+        urls = (
+            details_info(store.get(cartoon.info_url))['thumbnail'] or cartoon.thumbnail
+            for cartoon in cartoons
+        )
+    
+    fetched = prefetch(
+        urls,
+        budget=max(1, get_int_setting('thumbnails_budget_mb', DEFAULT_BUDGET_MB)) * 1024 * 1024,
+        workers=workers,
+        limit=get_int_setting('thumbnails_batch', DEFAULT_BATCH),
+        should_stop=monitor.abortRequested
+    )
+    
+    # Проверить наличие угаданных обложек каталога (HEAD, без загрузки),
+    # чтобы списки ссылались только на существующие
+    probed = 0
+    if probe_catalog:
+        probed = probe(
+            (cartoon.thumbnail for cartoon in cartoons),
+            workers=workers,
+            limit=DEFAULT_PROBE_BATCH,
+            should_stop=monitor.abortRequested
+        )
+    
+    if fetched or probed:
+        from net import format_stats
+        xbmc.log(f'ArjLover: Загружены обложки: {fetched}, проверены: {probed}; {format_stats()}',
+                 xbmc.LOGINFO)
+
+
+def run():
+    """Главный цикл фоновой службы обновления каталога."""
+    monitor = RefreshMonitor()
+    next_check = time.monotonic() + STARTUP_DELAY
+    
+    while not monitor.abortRequested():
+        if monitor.refresh_requested or time.monotonic() >= next_check:
+            monitor.refresh_requested = False
+            
+            if get_bool_setting('background_refresh', True):
+                try:
+                    refresh_if_stale()
+                except Exception as e:
+                    # Служба не должна падать из-за одной неудачной попытки
+                    xbmc.log(f'ArjLover: Ошибка фонового обновления: {e}', xbmc.LOGERROR)
+            
+            if get_bool_setting('details_enabled'):
+                try:
+                    enrich_details(monitor)
+                except Exception as e:
+                    xbmc.log(f'ArjLover: Ошибка загрузки подробностей: {e}', xbmc.LOGERROR)
+            
+            if get_bool_setting('thumbnails_enabled'):
+                try:
+                    prefetch_thumbnails(monitor, probe_catalog=True)
+                except Exception as e:
+                    xbmc.log(f'ArjLover: Ошибка загрузки обложек: {e}', xbmc.LOGERROR)
+            
+            interval = max(1, get_int_setting('refresh_check_minutes', 60))
+            next_check = time.monotonic() + interval * 60
+        
+        # Плагин показал список с недостающими обложками - догрузить их сразу
+        if monitor.prefetch_requested:
+            monitor.prefetch_requested = False
+            if get_bool_setting('thumbnails_enabled'):
+                try:
+                    prefetch_thumbnails(monitor)
+                except Exception as e:
+                    xbmc.log(f'ArjLover: Ошибка загрузки обложек: {e}', xbmc.LOGERROR)
+        
+        if monitor.waitForAbort(1):
+            break
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,213 @@
+import unittest
+import gzip
+import os
+import sys
+import threading
+import time
+import zlib
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Add resources/lib to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+import cache
+import catalog
+import net
+import settings
+from catalog_parser import CatalogStream
+
+CATALOG_HTML = '''<table>
+<tr class=o><td class=a>1</td><td class=l><a href="/info/ezhik.avi.html">Ёжик в тумане</a></td><td class=r>106639360</td><td>640x480</td><td>00:09:44</td><td><a href="/multiki/ezhik.avi">http</a></td></tr>
+<tr class=e><td class=a>2</td><td class=l><a href="/info/umka.avi.html">Умка</a></td><td class=r>200000000</td><td>720x576</td><td>00:15:30</td><td><a href="/multiki/umka.avi">http</a></td></tr>
+</table>'''.encode('windows-1251')
+
+ETAG = '"catalog-v1"'
+
+
+def expire_cache():
+    header = cache.read_cache_header()
+    header['timestamp'] = '2000-01-01T00:00:00'
+    with open(cache.get_cache_path(), 'r+b') as f:
+        f.write(cache._encode_header(header))
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    encoding = 'gzip'
+    requests = []
+    
+    delay = 0
+    # Оборвать ответ на середине: 'length' - с Content-Length, 'chunked' - по частям
+    truncate = ''
+    
+    def do_GET(self):
+        type(self).requests.append(dict(self.headers))
+        time.sleep(self.delay)
+        
+        if self.headers.get('If-None-Match') == ETAG and not self.truncate:
+            self.send_response(304)
+            self.send_header('ETag', ETAG)
+            self.end_headers()
+            return
+        
+        body = CATALOG_HTML
+        if self.encoding == 'gzip':
+            body = gzip.compress(body)
+        elif self.encoding == 'deflate':
+            compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            body = compressor.compress(body) + compressor.flush()
+        
+        self.send_response(200)
+        self.send_header('ETag', ETAG)
+        self.send_header('Last-Modified', 'Mon, 01 Jan 2024 00:00:00 GMT')
+        if self.encoding:
+            self.send_header('Content-Encoding', self.encoding)
+        if self.truncate == 'chunked':
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            self.wfile.write(b'%x\r\n' % len(body) + body[:len(body) // 2])
+            return
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body[:len(body) // 2] if self.truncate else body)
+    
+    def log_message(self, *args):
+        pass
+
+
+class TestConditionalRefresh(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), CatalogHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/multiki/'
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+    
+    def setUp(self):
+        CatalogHandler.requests = []
+        CatalogHandler.encoding = 'gzip'
+        CatalogHandler.delay = 0
+        CatalogHandler.truncate = ''
+        self.base_url = catalog.BASE_URL
+        catalog.BASE_URL = self.url
+        cache.clear_cache()
+    
+    def tearDown(self):
+        catalog.BASE_URL = self.base_url
+        cache.clear_cache()
+    
+    def test_compressed_responses(self):
+        for encoding in ('gzip', 'deflate', ''):
+            CatalogHandler.encoding = encoding
+            with CatalogStream(self.url) as stream:
+                titles = [c.title for c in stream]
+            self.assertEqual(titles, ['Ёжик в тумане', 'Умка'])
+            self.assertEqual(stream.etag, ETAG)
+        
+        self.assertEqual(CatalogHandler.requests[0]['Accept-Encoding'], 'gzip, deflate')
+    
+    def test_truncated_response_keeps_cache(self):
+        self.assertTrue(catalog.refresh_catalog(cache))
+        cartoons = cache.load_cache()
+        
+        for truncate in ('length', 'chunked'):
+            for encoding in ('gzip', 'deflate', ''):
+                CatalogHandler.truncate = truncate
+                CatalogHandler.encoding = encoding
+                with self.assertRaises(ConnectionError):
+                    catalog.refresh_catalog(cache, force=True)
+                self.assertEqual(cache.load_cache(), cartoons)
+    
+    def test_not_modified_extends_cache(self):
+        self.assertTrue(catalog.refresh_catalog(cache))
+        self.assertEqual(len(cache.load_cache()), 2)
+        self.assertEqual(cache.get_validators()['etag'], ETAG)
+        self.assertNotIn('If-None-Match', CatalogHandler.requests[0])
+        
+        # Состарить кэш и обновить снова: сервер отвечает 304
+        expire_cache()
+        self.assertFalse(cache.is_cache_valid())
+        
+        self.assertFalse(catalog.refresh_catalog(cache))
+        self.assertEqual(CatalogHandler.requests[1]['If-None-Match'], ETAG)
+        self.assertTrue(cache.is_cache_valid())
+        self.assertEqual(len(CatalogHandler.requests), 2)
+    
+    def test_not_modified_with_broken_cache_refetches(self):
+        catalog.refresh_catalog(cache)
+        with open(cache.get_cache_path(), 'ab') as f:
+            f.write(b'broken\n')
+        
+        expire_cache()
+        
+        # 304 продлевает заголовок, но тело не читается - загружаем заново
+        self.assertEqual(len(catalog.acquire_catalog('load_cache')), 2)
+        self.assertEqual(len(CatalogHandler.requests), 3)
+        self.assertNotIn('If-None-Match', CatalogHandler.requests[2])
+        self.assertEqual(len(cache.load_cache()), 2)
+
+    
+    def test_stale_cache_is_served_without_network(self):
+        catalog.refresh_catalog(cache)
+        cartoons = cache.load_cache()
+        expire_cache()
+        
+        self.assertIsNone(cache.load_cache())
+        self.assertEqual(cache.load_cache(allow_stale=True), cartoons)
+        self.assertEqual(catalog.query_catalog(cache, 'load_by_letter', 'У'), cartoons[1:])
+        self.assertEqual(len(CatalogHandler.requests), 1)
+        
+        cache.clear_cache()
+        self.assertIsNone(catalog.query_catalog(cache, 'load_cache'))
+    
+    def test_acquire_downloads_only_without_cache(self):
+        self.assertEqual(catalog.acquire_catalog('letter_counts'), {'Ё': 1, 'У': 1})
+        self.assertEqual(len(CatalogHandler.requests), 1)
+        
+        page, total = catalog.acquire_catalog('load_page', 1, 10)
+        self.assertEqual(([c.title for c in page], total), (['Умка'], 2))
+        self.assertEqual(len(CatalogHandler.requests), 1)
+    
+    def test_open_breaker_serves_stale_cache(self):
+        catalog.refresh_catalog(cache)
+        expire_cache()
+        
+        # Предохранитель хоста сработал: сеть не трогаем, отдаём что есть
+        with mock.patch.object(net, '_load_breaker', return_value={
+            f'127.0.0.1:{self.server.server_port}': {'failures': 3, 'open_until': time.time() + 60}
+        }), mock.patch.object(catalog, 'get_bool_setting', return_value=False):
+            self.assertEqual(catalog.acquire_catalog('letter_counts'), {'Ё': 1, 'У': 1})
+            cache.clear_cache()
+            with self.assertRaises(net.CircuitOpenError):
+                catalog.acquire_catalog('letter_counts')
+        
+        self.assertEqual(len(CatalogHandler.requests), 1)
+
+    
+    def test_concurrent_refresh_is_single_flight(self):
+        CatalogHandler.delay = 0.3
+        results = []
+        
+        def worker():
+            results.append(catalog.refresh_catalog(cache))
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(CatalogHandler.requests), 1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(sorted(results), [False, False, False, True])
+        self.assertEqual([f for f in os.listdir(settings.get_data_dir()) if f.endswith('.tmp')], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,438 @@
+import json
+import unittest
+from hypothesis import given, settings, strategies as st
+import urllib.parse
+import os
+import sys
+
+# Add resources/lib to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+from catalog_parser import Cartoon, duration_bucket, letter_sort_key, title_letter, parse_catalog, iter_parse_catalog, decode_chunks
+from catalog_parser import _extract_fields, _extract_fields_slow
+from cache import save_cache, load_cache, load_page, load_by_letter, letter_counts, clear_cache
+from cache import load_by_duration, duration_counts
+from cache import get_cache_path, get_letter_index_path, is_cache_valid, read_cache_header, touch_cache
+from cache import ENCODINGS
+import cache
+
+
+class TestParseCatalog(unittest.TestCase):
+
+    @given(st.lists(
+        st.tuples(
+            st.text(alphabet=st.characters(min_codepoint=0x0400, max_codepoint=0x04FF), min_size=1),
+            st.sampled_from(['.avi', '.mp4', '.mkv', '.flv'])
+        ),
+        min_size=1,
+        max_size=10
+    ))
+    def test_parse_catalog_video_link_extraction(self, video_files):
+        base_url = "https://example.com/multiki/"
+        
+        html_parts = ['<table>']
+        expected_count = 0
+        
+        for i, (filename_base, extension) in enumerate(video_files):
+            encoded_filename = urllib.parse.quote(filename_base, encoding='utf-8')
+            row_class = "o" if i % 2 == 0 else "e"
+            
+            html_parts.append(f'''
+            <tr class={row_class}>
+                <td class=a>{i+1}</td>
+                <td class=l><a href="http://example.com/info/{encoded_filename}{extension}.html">{filename_base}</a></td>
+                <td class=r>100000000</td>
+                <td>640x480</td>
+                <td>00:10:00</td>
+                <td><a href="http://example.com/multiki/{encoded_filename}{extension}">http</a></td>
+            </tr>
+            ''')
+            expected_count += 1
+        
+        html_parts.append('</table>')
+        html = '\n'.join(html_parts)
+        
+        result = parse_catalog(html, base_url)
+        
+        self.assertEqual(len(result), expected_count)
+        
+        for cartoon in result:
+            self.assertIn(cartoon.extension.lower(), {'.avi', '.mp4', '.mkv', '.flv'})
+            self.assertTrue(cartoon.url.startswith("http://example.com/multiki/"))
+    
+    def test_parse_catalog_basic_examples(self):
+        base_url = "https://multiki.arjlover.net/multiki/"
+        
+        html = '''
+        <table>
+        <tr class=o>
+            <td class=a>1</td>
+            <td class=l><a href="http://multiki.arjlover.net/info/13.reis.avi.html">13 рейс</a></td>
+            <td class=r>106639360</td>
+            <td>640x480</td>
+            <td>00:09:44</td>
+            <td><a href="http://multiki.arjlover.net/multiki/13.reis.avi">http</a></td>
+        </tr>
+        <tr class=e>
+            <td class=a>2</td>
+            <td class=l><a href="http://multiki.arjlover.net/info/masha.avi.html">Маша и медведь</a></td>
+            <td class=r>200000000</td>
+            <td>720x576</td>
+            <td>00:15:30</td>
+            <td><a href="http://multiki.arjlover.net/multiki/masha.avi">http</a></td>
+        </tr>
+        </table>
+        '''
+        
+        result = parse_catalog(html, base_url)
+        
+        self.assertEqual(len(result), 2)
+        
+        reis = next((c for c in result if c.title == "13 рейс"), None)
+        self.assertIsNotNone(reis)
+        self.assertEqual(reis.extension, ".avi")
+        self.assertEqual(reis.url, "http://multiki.arjlover.net/multiki/13.reis.avi")
+        self.assertEqual(reis.duration, "00:09:44")
+        self.assertEqual(reis.play_path, urllib.parse.quote(reis.url))
+        
+        masha = next((c for c in result if c.title == "Маша и медведь"), None)
+        self.assertIsNotNone(masha)
+        self.assertEqual(masha.extension, ".avi")
+        self.assertEqual(masha.url, "http://multiki.arjlover.net/multiki/masha.avi")
+
+    
+    def test_edge_cells_keep_previous_plot(self):
+        # Описания, которые выводил прежний разбор (строки ячеек как есть)
+        cases = [
+            ('00:00:00', '0', 'Длительность: 00:00:00\nРазмер: 0 МБ'),
+            ('99:99:99', '106639360', 'Длительность: 99:99:99\nРазмер: 102 МБ'),
+            ('00:09:44', '1.024', 'Длительность: 00:09:44\nРазмер: 0 МБ'),
+            ('00:09:44', '.', 'Длительность: 00:09:44'),
+            ('00:09:44', '106639360', 'Длительность: 00:09:44\nРазмер: 102 МБ'),
+        ]
+        rows = ''.join(
+            f'<tr class=o><td class=l><a href="/info/f{i}.avi.html">T{i}</a></td>'
+            f'<td class=r>{size}</td><td>{duration}</td><td><a href="/multiki/f{i}.avi">http</a></td></tr>'
+            for i, (duration, size, _) in enumerate(cases)
+        )
+        result = parse_catalog(f'<table>{rows}</table>', "https://multiki.arjlover.net/multiki/")
+        
+        self.assertEqual([c.plot for c in result], [plot for _, _, plot in cases])
+        # Явное описание хранится только для нестандартных ячеек
+        self.assertIsNone(result[-1]._plot)
+        self.assertEqual([Cartoon.from_record(c.to_record()).plot for c in result],
+                         [plot for _, _, plot in cases])
+
+
+class TestCompactCartoon(unittest.TestCase):
+
+    def test_derived_fields(self):
+        cartoon = Cartoon(
+            title="13 рейс",
+            url="http://multiki.arjlover.net/multiki/13.reis.avi",
+            info_url="http://multiki.arjlover.net/info/13.reis.avi.html",
+            duration="00:09:44",
+            size_bytes=106639360
+        )
+        
+        self.assertEqual(cartoon.extension, ".avi")
+        self.assertEqual(cartoon.duration_seconds, 584)
+        self.assertEqual(cartoon.duration, "00:09:44")
+        self.assertEqual(cartoon.thumbnail,
+                         "https://multiki.arjlover.net/ap/13.reis.avi/13.reis.avi.thumb1.jpg")
+        self.assertEqual(cartoon.plot, "Длительность: 00:09:44\nРазмер: 102 МБ")
+        self.assertEqual(cartoon.info_url, "http://multiki.arjlover.net/info/13.reis.avi.html")
+        
+        # Выводимые значения не хранятся
+        self.assertIsNone(cartoon._extension)
+        self.assertIsNone(cartoon._thumbnail)
+        self.assertIsNone(cartoon._plot)
+        self.assertIsNone(cartoon._info_name)
+        self.assertIsNone(cartoon._play_name)
+        
+        other = Cartoon(title="Ёжик", url="http://multiki.arjlover.net/multiki/ezhik.avi")
+        self.assertIs(cartoon._prefix, other._prefix)
+    
+    @given(st.builds(
+        Cartoon,
+        title=st.text(min_size=1),
+        url=st.text(),
+        extension=st.one_of(st.none(), st.sampled_from(['.avi', '.mp4', ''])),
+        thumbnail=st.one_of(st.none(), st.text()),
+        info_url=st.text(),
+        duration=st.integers(min_value=0, max_value=10 ** 6),
+        plot=st.one_of(st.none(), st.text()),
+        size_bytes=st.integers(min_value=0, max_value=10 ** 12)
+    ))
+    def test_record_round_trip(self, cartoon):
+        prefix_ids = {}
+        record = cartoon.to_record(prefix_ids)
+        prefixes = sorted(prefix_ids, key=prefix_ids.get)
+        
+        for restored in (Cartoon.from_record(record, prefixes),
+                         Cartoon.from_record(cartoon.to_record()),
+                         Cartoon.from_record(cartoon.to_record(trim=False))):
+            self.assertEqual(restored, cartoon)
+            self.assertEqual(restored.play_path, cartoon.play_path)
+            self.assertEqual(restored.play_path, urllib.parse.quote(cartoon.url))
+
+
+class TestStreamingParser(unittest.TestCase):
+
+    HTML = '''<html><table>
+    <tr class=o><td class=a>1</td><td class=l><a href="/info/13.reis.avi.html">13 рейс</a></td><td class=r>106639360</td><td>640x480</td><td>00:09:44</td><td><a href="/multiki/13.reis.avi">http</a></td></tr>
+    <TR CLASS=E><td class=a>2</td><td class=l><a href="/info/ezhik.avi.html">Ёжик в тумане</a></td><td class=r>200000000</td><td>720x576</td><td>00:10:30</td><td><a href="/multiki/ezhik.avi">http</a></td></TR>
+    <tr class=x><td>не строка каталога</td></tr>
+    <tr class=e><td class=a>3</td><td class=l><a href="/info/masha.mp4.html">Маша</a></td><td class=r>1.000.000</td><td>640x480</td><td>00:01:00</td><td><a href="../multiki/masha.mp4">http</a></td></tr>
+    </table></html>'''
+    
+    @given(st.lists(st.integers(min_value=1, max_value=40), min_size=1, max_size=200))
+    def test_chunked_bytes_match_full_parse(self, sizes):
+        base_url = "https://multiki.arjlover.net/multiki/"
+        raw = self.HTML.encode('windows-1251')
+        
+        chunks = []
+        pos = 0
+        while pos < len(raw):
+            size = sizes[len(chunks) % len(sizes)]
+            chunks.append(raw[pos:pos + size])
+            pos += size
+        
+        streamed = list(iter_parse_catalog(decode_chunks(chunks), base_url))
+        
+        self.assertEqual(streamed, parse_catalog(self.HTML, base_url))
+        self.assertEqual([c.title for c in streamed], ["13 рейс", "Ёжик в тумане", "Маша"])
+    
+    def test_rows_are_yielded_before_input_ends(self):
+        base_url = "https://multiki.arjlover.net/multiki/"
+        
+        def chunks():
+            yield self.HTML[:self.HTML.index('<TR CLASS=E>')]
+            raise AssertionError('Первая строка должна быть отдана до чтения остатка')
+        
+        first = next(iter_parse_catalog(chunks(), base_url))
+        self.assertEqual(first.title, "13 рейс")
+
+
+class TestRowFields(unittest.TestCase):
+
+    ROW_FRAGMENTS = [
+        '<td class=l><a href="', '<TD CLASS=L><a href="', '<td class=r>', '<td>', '</td>',
+        '</a></td>', '"', '>', '<', ' ', 'href="', 'HREF="', 'data=1 ',
+        '/info/x.avi.html', '/multiki/a.avi', 'multiki/b.MP4', 'Ёжик', '1.0', '12', '..',
+        '00:01:02', '<td>00:00:01</td>', '<td class=r>5</td>',
+        '<td class=l><a href="/multiki/z.mkv">Z</a></td>', 'href="/multiki/c.flv" ',
+    ]
+    
+    @given(st.lists(st.sampled_from(ROW_FRAGMENTS), max_size=16))
+    def test_single_pass_matches_separate_searches(self, fragments):
+        row = ''.join(fragments)
+        self.assertEqual(_extract_fields(row), _extract_fields_slow(row))
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        clear_cache()
+        # Маленькие блоки, чтобы страницы и буквы пересекали границы блоков
+        self.block_records = cache.BLOCK_RECORDS
+        cache.BLOCK_RECORDS = 3
+    
+    def tearDown(self):
+        cache.BLOCK_RECORDS = self.block_records
+        clear_cache()
+    
+    @given(st.lists(
+        st.builds(
+            Cartoon,
+            title=st.text(alphabet=st.characters(min_codepoint=0x0400, max_codepoint=0x04FF), min_size=1),
+            url=st.text(min_size=10).map(lambda x: f"https://example.com/{x}"),
+            extension=st.sampled_from(['.avi', '.mp4', '.mkv', '.flv']),
+            thumbnail=st.text(min_size=0).map(lambda x: f"https://example.com/{x}.jpg" if x else ""),
+            info_url=st.just(""),
+            duration=st.just(""),
+            plot=st.just("")
+        ),
+        min_size=0,
+        max_size=10
+    ))
+    def test_cache_round_trip(self, cartoons):
+        for encoding in ENCODINGS:
+            save_cache(cartoons, encoding=encoding)
+            loaded_cartoons = load_cache()
+            
+            self.assertIsNotNone(loaded_cartoons)
+            self.assertEqual(len(loaded_cartoons), len(cartoons))
+            
+            for original, loaded in zip(cartoons, loaded_cartoons):
+                self.assertEqual(original.title, loaded.title)
+                self.assertEqual(original.url, loaded.url)
+                self.assertEqual(original.extension, loaded.extension)
+                self.assertEqual(original.thumbnail, loaded.thumbnail)
+                # Экранированный путь вычисляется при сохранении, если его не было
+                self.assertEqual(loaded.play_path, urllib.parse.quote(original.url))
+    
+    def test_cache_header_without_body(self):
+        cartoons = [Cartoon(title="Ёжик в тумане", url="https://example.com/ezhik.avi",
+                            extension=".avi", thumbnail="")]
+        for encoding in ENCODINGS:
+            save_cache(cartoons, encoding=encoding)
+            
+            header = read_cache_header()
+            self.assertEqual(header['count'], 1)
+            self.assertEqual(header['encoding'], encoding)
+            
+            # Испорченное тело не влияет на проверку заголовка,
+            # но загрузка такого кэша не удаётся
+            with open(get_cache_path(), 'ab') as f:
+                f.write(b'not json\n')
+            self.assertTrue(is_cache_valid())
+            self.assertIsNone(load_cache())
+    
+    @settings(max_examples=25)
+    @given(st.integers(min_value=0, max_value=12), st.integers(min_value=0, max_value=15),
+           st.integers(min_value=1, max_value=6))
+    def test_load_page_matches_slice(self, count, offset, limit):
+        cartoons = [Cartoon(title=f"Мультфильм {i}", url=f"https://example.com/{i}.avi",
+                            extension=".avi", thumbnail="") for i in range(count)]
+        for encoding in ENCODINGS:
+            save_cache(cartoons, encoding=encoding)
+            
+            page = cartoons[offset:offset + limit]
+            self.assertEqual(load_page(offset, limit), (page, count))
+            self.assertEqual(load_page(offset, limit, letter='М'), (page, count))
+            self.assertEqual(load_page(offset, limit, letter='Я'), ([], 0))
+    
+    def test_letter_index(self):
+        titles = ['Ёжик в тумане', 'Alice', '13 рейс', 'ну и ну', 'Незнайка', 'Ну, погоди!', 'Bob']
+        cartoons = [Cartoon(title=t, url=f"https://example.com/{i}.avi", extension=".avi",
+                            thumbnail="") for i, t in enumerate(titles)]
+        expected_counts = {'Ё': 1, 'A': 1, '0-9': 1, 'Н': 3, 'B': 1}
+        self.assertEqual(sorted(expected_counts, key=letter_sort_key), ['0-9', 'A', 'B', 'Ё', 'Н'])
+        by_letter = {letter: [c for c in cartoons if title_letter(c.title) == letter]
+                     for letter in expected_counts}
+        
+        for encoding in ENCODINGS:
+            save_cache(cartoons, encoding=encoding)
+            self.assertEqual(letter_counts(), expected_counts)
+            
+            for letter, expected in by_letter.items():
+                self.assertEqual(load_by_letter(letter), expected)
+            self.assertEqual(load_page(1, 5, letter='Н'), (by_letter['Н'][1:], 3))
+            
+            # Продление кэша не отвязывает индекс
+            self.assertTrue(touch_cache())
+            self.assertEqual(load_page(1, 5, letter='Н'), (by_letter['Н'][1:], 3))
+            
+            # Без индекса те же ответы получаются фильтрацией каталога
+            os.remove(get_letter_index_path())
+            self.assertEqual(letter_counts(), expected_counts)
+            self.assertEqual(load_by_letter('Н'), by_letter['Н'])
+            self.assertEqual(load_page(1, 5, letter='Н'), (by_letter['Н'][1:], 3))
+    
+    def test_duration_index(self):
+        self.assertEqual(
+            [duration_bucket(s) for s in (0, 1, 299, 300, 899, 900, 7200)],
+            [None, 'short', 'short', 'medium', 'medium', 'long', 'long']
+        )
+        
+        durations = ['00:04:59', '00:05:00', '', '00:14:59', '01:10:00', '00:15:00']
+        cartoons = [Cartoon(title=f"Мультфильм {i}", url=f"https://example.com/{i}.avi",
+                            duration=d) for i, d in enumerate(durations)]
+        expected_counts = {'short': 1, 'medium': 2, 'long': 2}
+        
+        for encoding in ENCODINGS:
+            save_cache(cartoons, encoding=encoding)
+            self.assertEqual(duration_counts(), expected_counts)
+            self.assertEqual(load_by_duration('medium'), [cartoons[1], cartoons[3]])
+            self.assertEqual(load_page(1, 5, duration='long'), ([cartoons[5]], 2))
+            
+            # Без индекса те же ответы получаются фильтрацией каталога
+            os.remove(get_letter_index_path())
+            self.assertEqual(duration_counts(), expected_counts)
+            self.assertEqual(load_page(0, 5, duration='short'), ([cartoons[0]], 1))
+    
+    def test_catalog_is_reused_from_memory(self):
+        cartoons = [Cartoon(title=f"Мультфильм {i}", url=f"https://example.com/{i}.avi")
+                    for i in range(5)]
+        save_cache(cartoons)
+        
+        # Сохранённый каталог сразу доступен из памяти процесса
+        loaded = load_cache()
+        self.assertEqual(loaded, cartoons)
+        self.assertIs(load_cache(), loaded)
+        self.assertIs(load_page(2, 2)[0][0], loaded[2])
+        self.assertIs(load_by_letter('М')[4], loaded[4])
+        
+        # Продление заголовка не меняет поколение: каталог остаётся в памяти
+        self.assertTrue(touch_cache())
+        self.assertIs(load_cache(), loaded)
+        
+        # Новый процесс (пустая память) читает файл; новая запись его заменяет
+        cache._memo.clear()
+        reloaded = load_cache()
+        self.assertEqual(reloaded, cartoons)
+        self.assertIsNot(reloaded, loaded)
+        
+        save_cache(cartoons[:2])
+        self.assertEqual(load_cache(), cartoons[:2])
+        self.assertEqual(letter_counts(), {'М': 2})
+    
+    def test_touch_replaces_cache_file(self):
+        cartoons = [Cartoon(title=f"Мультфильм {i}", url=f"https://example.com/{i}.avi")
+                    for i in range(5)]
+        save_cache(cartoons, encoding='zlib')
+        header = read_cache_header()
+    
+        # Открытый до продления файл не видит полузаписанного заголовка:
+        # продление заменяет файл целиком, а не пишет поверх
+        with open(get_cache_path(), 'rb') as old:
+            self.assertTrue(touch_cache(etag='"v2"'))
+            self.assertEqual(cache._decode_header(old.read(cache.HEADER_SIZE)), header)
+            old_body = old.read()
+    
+        touched = read_cache_header()
+        self.assertEqual((touched['generation'], touched['etag']), (header['generation'], '"v2"'))
+        with open(get_cache_path(), 'rb') as f:
+            self.assertEqual(f.read()[cache.HEADER_SIZE:], old_body)
+        cache._memo.clear()
+        self.assertEqual(load_cache(), cartoons)
+    
+        data_dir = os.path.dirname(get_cache_path())
+        self.assertEqual([n for n in os.listdir(data_dir) if n.endswith('.tmp')], [])
+    
+    def test_legacy_cache_is_migrated(self):
+        legacy = {
+            'timestamp': '2099-01-01T00:00:00',
+            'cartoons': [{
+                'title': 'Ёжик в тумане',
+                'url': 'https://multiki.arjlover.net/multiki/ezhik.avi',
+                'extension': '.avi',
+                'thumbnail': 'https://multiki.arjlover.net/ap/ezhik.avi/ezhik.avi.thumb1.jpg',
+                'info_url': 'https://multiki.arjlover.net/info/ezhik.avi.html',
+                'duration': '00:10:31',
+                'plot': 'Длительность: 00:10:31\nРазмер: 100 МБ'
+            }]
+        }
+        with open(get_cache_path(), 'w', encoding='utf-8') as f:
+            json.dump(legacy, f, ensure_ascii=False, indent=2)
+        
+        header = read_cache_header()
+        self.assertEqual(header['version'], cache.CACHE_VERSION)
+        self.assertEqual(header['timestamp'], legacy['timestamp'])
+        self.assertTrue(is_cache_valid())
+        
+        loaded = load_cache()
+        self.assertEqual(len(loaded), 1)
+        for field, value in legacy['cartoons'][0].items():
+            self.assertEqual(getattr(loaded[0], field), value)
+        
+        # Прежний формат без каталога не читается
+        with open(get_cache_path(), 'w', encoding='utf-8') as f:
+            f.write('{\n  "timestamp": "2099-01-01T00:00:00"\n}')
+        self.assertIsNone(read_cache_header())
+        self.assertIsNone(load_cache())
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,191 @@
+import unittest
+import os
+import sys
+from unittest import mock
+
+# Add resources/lib to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+from catalog_parser import Cartoon
+import cache
+import catalog
+import changes
+import details
+import listing_version
+
+BASE = 'https://multiki.arjlover.net'
+
+
+def make_cartoon(name, title=None, duration='00:10:00'):
+    return Cartoon(
+        title=title or name.capitalize(),
+        url=f'{BASE}/multiki/{name}.avi',
+        info_url=f'{BASE}/info/{name}.avi.html',
+        duration=duration,
+    )
+
+
+class TestCatalogChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.tearDown()
+    
+    def tearDown(self):
+        cache.clear_cache()
+        changes.clear_changes()
+        if os.path.exists(details.get_details_path()):
+            os.remove(details.get_details_path())
+    
+    def save(self, cartoons):
+        catalog._save_catalog(cache, cartoons, etag='"v"', last_modified='')
+    
+    def test_diff_by_video_url(self):
+        old = [make_cartoon('ezhik'), make_cartoon('umka'), make_cartoon('vinni')]
+        state = None
+        diff = changes.diff_catalog(old, state)
+        self.assertTrue(diff.initial)
+        changes.record_changes(old, diff, state, 'cache', now='2024-01-01T00:00:00')
+        
+        new = [make_cartoon('umka', duration='00:15:30'), make_cartoon('vinni'), make_cartoon('karlson')]
+        diff = changes.diff_catalog(new, changes.load_state())
+        self.assertEqual((diff.added, diff.changed, diff.removed), ([2], [0], [f'{BASE}/multiki/ezhik.avi']))
+        self.assertEqual(diff.summary(), '+1 ~1 -1')
+        self.assertFalse(diff.is_empty)
+        
+        self.assertTrue(changes.diff_catalog(old, changes.load_state()).is_empty)
+    
+    def test_new_arrivals(self):
+        self.save([make_cartoon('ezhik'), make_cartoon('umka')])
+        # Первая загрузка - точка отсчёта, а не поступления
+        self.assertEqual(changes.load_new_arrivals(), [])
+        
+        self.save([make_cartoon('ezhik'), make_cartoon('umka'), make_cartoon('vinni')])
+        self.save([make_cartoon('karlson'), make_cartoon('ezhik', 'Ёжик в тумане'), make_cartoon('vinni')])
+        
+        arrivals = changes.load_new_arrivals()
+        self.assertEqual([c.title for c in arrivals], ['Karlson', 'Vinni'])
+        
+        entries = changes.load_state()['entries']
+        self.assertEqual(sorted(entries), sorted(c.url for c in cache.load_cache()))
+        self.assertEqual(entries[f'{BASE}/multiki/ezhik.avi'][1],
+                         changes.load_state()['baseline'])
+    
+    def test_changes_are_appended_to_journal(self):
+        cartoons = [make_cartoon(f'multik{i}') for i in range(20)]
+        self.save(cartoons)
+        with open(changes.get_state_path(), 'rb') as f:
+            snapshot = f.read()
+        first_seen = changes.load_state()['entries'][cartoons[1].url][1]
+    
+        # Одна изменённая запись - одна строка журнала, снимок не трогается
+        cartoons[1] = make_cartoon('multik1', duration='00:20:00')
+        self.save(cartoons)
+        with open(changes.get_state_path(), 'rb') as f:
+            self.assertEqual(f.read(), snapshot)
+        with open(changes.get_journal_path(), 'rb') as f:
+            self.assertEqual(len(f.readlines()), 1)
+    
+        state = changes.load_state()
+        self.assertEqual(state['entries'][cartoons[1].url],
+                         [changes.row_hash(cartoons[1]), first_seen])
+        self.assertTrue(changes.diff_catalog(cartoons, state).is_empty)
+    
+        # Оборванная последняя строка журнала не мешает читать состояние
+        with open(changes.get_journal_path(), 'ab') as f:
+            f.write(b'{"snapshot":')
+        self.assertEqual(changes.load_state(), state)
+    
+    def test_journal_is_compacted(self):
+        cartoons = [make_cartoon(f'multik{i}') for i in range(20)]
+        self.save(cartoons)
+    
+        with mock.patch.object(changes, '_write_snapshot', wraps=changes._write_snapshot) as write:
+            for i in range(20):
+                cartoons.append(make_cartoon(f'novinka{i}'))
+                self.save(cartoons)
+                state = changes.load_state()
+                self.assertEqual(sorted(state['entries']), sorted(c.url for c in cartoons))
+        # Журнал сворачивается в снимок, когда перерастает его долю
+        self.assertGreater(write.call_count, 0)
+        self.assertLess(write.call_count, 20)
+        self.assertEqual(state['entries'][cartoons[0].url][1], state['baseline'])
+    
+        # Журнал прежнего снимка (свёртка оборвалась) не применяется
+        with open(changes.get_journal_path(), 'ab') as f:
+            f.write(b'{"snapshot":"old","set":{},"del":["%s"]}\n' % cartoons[0].url.encode())
+        self.assertEqual(changes.load_state(), state)
+    
+    def test_unchanged_catalog_is_not_rewritten(self):
+        cartoons = [make_cartoon('ezhik'), make_cartoon('umka')]
+        self.save(cartoons)
+        generation = cache.read_cache_header()['generation']
+        
+        catalog._save_catalog(cache, cartoons, etag='"v2"', last_modified='')
+        self.assertEqual(cache.read_cache_header()['generation'], generation)
+        self.assertEqual(cache.get_validators()['etag'], '"v2"')
+        
+        cartoons.append(make_cartoon('vinni'))
+        self.save(cartoons)
+        self.assertNotEqual(cache.read_cache_header()['generation'], generation)
+        self.assertEqual(len(cache.load_cache()), 3)
+    
+    def test_listing_token_follows_catalog_content(self):
+        cartoons = [make_cartoon('ezhik'), make_cartoon('umka')]
+        self.save(cartoons)
+        token = listing_version.listing_token()
+        self.assertEqual(listing_version.read_versions()['catalog'], f'cache:{cache.get_generation()}')
+        
+        # Продление кэша без изменений - прежние адреса, списки из кэша Kodi
+        self.save(cartoons)
+        self.assertEqual(listing_version.listing_token(), token)
+        
+        self.save(cartoons[:1])
+        self.assertNotEqual(listing_version.listing_token(), token)
+    
+    def test_changed_entries_forget_details(self):
+        cartoons = [make_cartoon('ezhik'), make_cartoon('umka'), make_cartoon('vinni')]
+        self.save(cartoons)
+        details.save_details({
+            c.info_url: {'fetched': '2024-01-01T00:00:00', 'details': {}} for c in cartoons
+        })
+        
+        self.save([make_cartoon('ezhik', 'Ёжик в тумане'), make_cartoon('umka')])
+        self.assertEqual(list(details.load_details()), [cartoons[1].info_url])
+    
+    def test_shrunken_catalog_is_rejected(self):
+        cartoons = [make_cartoon('ezhik'), make_cartoon('umka'), make_cartoon('vinni')]
+        self.save(cartoons)
+    
+        with self.assertRaises(catalog.IncompleteCatalogError):
+            self.save(cartoons[:1])
+        self.assertEqual(cache.load_cache(), cartoons)
+    
+        # Ручное обновление доверяет серверу
+        catalog._save_catalog(cache, cartoons[:1], etag='"v"', last_modified='',
+                              allow_shrink=True)
+        self.assertEqual(cache.load_cache(), cartoons[:1])
+        self.assertEqual(len(changes.load_state()['entries']), 1)
+    
+    def test_shrunken_catalog_without_snapshot_is_saved(self):
+        cartoons = [make_cartoon('ezhik'), make_cartoon('umka'), make_cartoon('vinni')]
+        self.save(cartoons)
+        cache.clear_cache()
+    
+        # Показать больше нечего - сохраняется то, что отдал сайт
+        self.save(cartoons[:1])
+        self.assertEqual(cache.load_cache(), cartoons[:1])
+    
+    def test_failed_save_keeps_state(self):
+        cartoons = [make_cartoon('ezhik'), make_cartoon('umka')]
+        self.save(cartoons)
+        state = changes.load_state()
+        token = listing_version.listing_token()
+    
+        with mock.patch.object(cache, 'save_cache', return_value=False):
+            self.save(cartoons + [make_cartoon('vinni')])
+        self.assertEqual(changes.load_state(), state)
+        self.assertEqual(listing_version.listing_token(), token)
+    
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from datetime import timedelta
+
+# Add resources/lib to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+from catalog_parser import CartoonDetails
+import details
+
+
+class FakeFetcher:
+    
+    def __init__(self):
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+    
+    def __call__(self, url):
+        with self._lock:
+            self.calls.append(url)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+        
+        if url.endswith('broken.html'):
+            return CartoonDetails(title="", duration="", size="", video_format="", audio_format="", thumbnail="")
+        return CartoonDetails(
+            title=url, duration="00:10:00", size="100 МБ",
+            video_format="XviD 640x480", audio_format="MP3 128kbps",
+            thumbnail=url + '.thumb1.jpg'
+        )
+
+
+class TestEnrich(unittest.TestCase):
+    
+    URLS = [f'https://multiki.arjlover.net/info/{i}.avi.html' for i in range(12)]
+    
+    def setUp(self):
+        self.tearDown()
+    
+    def tearDown(self):
+        if os.path.exists(details.get_details_path()):
+            os.remove(details.get_details_path())
+    
+    def test_fetches_each_entry_once(self):
+        fetcher = FakeFetcher()
+        urls = self.URLS + self.URLS[:3] + ['https://multiki.arjlover.net/info/broken.html']
+        
+        fetched = details.enrich(urls, workers=6, per_host=2, rate=1000, fetch=fetcher)
+        
+        self.assertEqual(fetched, len(self.URLS))
+        self.assertEqual(sorted(fetcher.calls), sorted(set(urls)))
+        self.assertLessEqual(fetcher.max_active, 2)
+        
+        store = details.load_details()
+        self.assertEqual(set(store), set(self.URLS))
+        
+        # Повторный проход ничего не загружает, кроме неудачных записей
+        fetcher = FakeFetcher()
+        details.enrich(urls, rate=1000, fetch=fetcher)
+        self.assertEqual(fetcher.calls, ['https://multiki.arjlover.net/info/broken.html'])
+    
+    def test_stale_entries_are_refetched(self):
+        details.enrich(self.URLS[:2], rate=1000, fetch=FakeFetcher())
+        
+        fetcher = FakeFetcher()
+        details.enrich(self.URLS[:2], rate=1000, max_age=timedelta(0), fetch=fetcher)
+        self.assertEqual(sorted(fetcher.calls), self.URLS[:2])
+    
+    def test_rate_limit_and_batch_limit(self):
+        fetcher = FakeFetcher()
+        start = time.monotonic()
+        details.enrich(self.URLS, workers=4, rate=50, limit=5, fetch=fetcher)
+        
+        self.assertEqual(len(fetcher.calls), 5)
+        self.assertGreaterEqual(time.monotonic() - start, 4 / 50)
+    
+    def test_forget_during_enrich_is_kept(self):
+        details.enrich(self.URLS[:2], rate=1000, fetch=FakeFetcher())
+        
+        def fetch(url):
+            # Плагин обновил каталог, пока служба загружала подробности
+            details.forget({self.URLS[0]})
+            return FakeFetcher()(url)
+        
+        details.enrich(self.URLS[2:4], rate=1000, fetch=fetch)
+        self.assertEqual(set(details.load_details()), set(self.URLS[1:4]))
+    
+    def test_details_info(self):
+        details.enrich(self.URLS[:1], rate=1000, fetch=FakeFetcher())
+        info = details.details_info(details.load_details()[self.URLS[0]])
+        
+        self.assertEqual(info['plot'], 'Видео: XviD 640x480\nАудио: MP3 128kbps')
+        self.assertTrue(info['thumbnail'].endswith('.thumb1.jpg'))
+        self.assertEqual(details.details_info(None), {'plot': '', 'thumbnail': ''})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add resources/lib to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+import net
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Отвечает статусами из statuses по очереди (последний - на все остальные запросы)."""
+    protocol_version = 'HTTP/1.1'
+    statuses = [200]
+    requests = []
+    # Молча закрывать соединение после ответа (как сервер по таймауту простоя)
+    drop_connections = False
+    
+    def do_GET(self):
+        type(self).requests.append(self.path)
+        index = min(len(self.requests) - 1, len(self.statuses) - 1)
+        status = self.statuses[index]
+        
+        body = b'ok' if status == 200 else b''
+        self.send_response(status)
+        if status == 302:
+            self.send_header('Location', '/target')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.close_connection = self.drop_connections
+    
+    def log_message(self, *args):
+        pass
+
+
+class TestNet(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/page'
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+    
+    def setUp(self):
+        ScriptedHandler.requests = []
+        ScriptedHandler.drop_connections = False
+        net._pool.clear()
+        self.backoff = net.BACKOFF_BASE
+        net.BACKOFF_BASE = 0.001
+        net.reset_breaker()
+    
+    def tearDown(self):
+        net._pool.clear()
+        net.BACKOFF_BASE = self.backoff
+        net.reset_breaker()
+    
+    def test_retries_server_errors(self):
+        ScriptedHandler.statuses = [503, 502, 200]
+        with net.request(self.url) as response:
+            self.assertEqual((response.status, response.read()), (200, b'ok'))
+        self.assertEqual(len(ScriptedHandler.requests), 3)
+    
+    def test_connections_are_reused(self):
+        ScriptedHandler.statuses = [503, 200]
+        before = net.get_stats()
+        
+        for _ in range(3):
+            with net.request(self.url) as response:
+                self.assertEqual(response.read(), b'ok')
+        
+        after = net.get_stats()
+        self.assertEqual(after['requests'] - before['requests'], 4)
+        self.assertEqual(after['opened'] - before['opened'], 1)
+    
+    def test_closed_idle_connection_is_replaced(self):
+        ScriptedHandler.statuses = [200]
+        ScriptedHandler.drop_connections = True
+        before = net.get_stats()
+        
+        for _ in range(3):
+            with net.request(self.url, retries=0) as response:
+                self.assertEqual(response.read(), b'ok')
+        
+        self.assertEqual(len(ScriptedHandler.requests), 3)
+        self.assertEqual(net.get_stats()['opened'] - before['opened'], 3)
+        self.assertEqual(net._load_breaker(), {})
+    
+    def test_follows_redirects(self):
+        ScriptedHandler.statuses = [302, 200]
+        with net.request(self.url) as response:
+            self.assertEqual(response.status, 200)
+            self.assertTrue(response.url.endswith('/target'))
+        self.assertEqual(ScriptedHandler.requests, ['/page', '/target'])
+    
+    def test_breaker_skips_network_after_failures(self):
+        ScriptedHandler.statuses = [503]
+        for _ in range(net.BREAKER_THRESHOLD):
+            with self.assertRaises(ConnectionError):
+                net.request(self.url, retries=1)
+        self.assertEqual(len(ScriptedHandler.requests), net.BREAKER_THRESHOLD * 2)
+        
+        # Предохранитель сработал: ошибка сразу, без запросов к серверу
+        start = time.monotonic()
+        with self.assertRaises(net.CircuitOpenError):
+            net.request(self.url)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(len(ScriptedHandler.requests), net.BREAKER_THRESHOLD * 2)
+        
+        net.reset_breaker()
+        ScriptedHandler.statuses = [200]
+        net.request(self.url).close()
+        self.assertEqual(net._load_breaker(), {})
+    
+    def test_success_resets_failures(self):
+        ScriptedHandler.statuses = [503, 503, 200]
+        with self.assertRaises(ConnectionError):
+            net.request(self.url, retries=1)
+        self.assertEqual(len(net._load_breaker()), 1)
+        
+        net.request(self.url, retries=0).close()
+        self.assertEqual(net._load_breaker(), {})
+    
+    def test_parallel_failures_are_all_counted(self):
+        threads = [
+            threading.Thread(target=net._record_result, args=('example.org', False))
+            for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(net._load_breaker()['example.org']['failures'], 20)
+        data_dir = os.path.dirname(net.get_breaker_path())
+        self.assertFalse([name for name in os.listdir(data_dir) if name.endswith('.tmp')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from hypothesis import given, strategies as st
+import os
+import sys
+from unittest import mock
+
+# Add resources/lib to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+from catalog_parser import Cartoon
+import cache
+import search
+import sqlite_cache
+
+TITLES = [
+    'Ёжик в тумане',
+    'Ну, погоди! Выпуск 1',
+    'Чебурашка',
+    'Ёжики и медвежонок',
+    'Крокодил Гена',
+    'Кот в сапогах',
+    'Котёнок по имени Гав',
+]
+
+
+class TestSearchIndex(unittest.TestCase):
+    
+    def setUp(self):
+        self.index = search.build_index(TITLES)
+    
+    def find(self, query):
+        return [TITLES[i] for i in search.search(self.index, query)]
+    
+    def test_yo_folding(self):
+        self.assertEqual(search.normalize('ЁЖИК'), 'ежик')
+        self.assertEqual(self.find('ежик'), ['Ёжик в тумане', 'Ёжики и медвежонок'])
+    
+    def test_relevance_order(self):
+        # Точное совпадение выше префикса, префикс выше подстроки
+        self.assertEqual(self.find('кот в сапогах')[0], 'Кот в сапогах')
+        self.assertEqual(self.find('кот'), ['Кот в сапогах', 'Котёнок по имени Гав'])
+    
+    def test_typo_tolerance(self):
+        self.assertIn('Чебурашка', self.find('чебурашко'))
+        self.assertIn('Крокодил Гена', self.find('кракодил'))
+    
+    def test_short_query_and_punctuation(self):
+        self.assertEqual(self.find('ну погоди'), ['Ну, погоди! Выпуск 1'])
+        self.assertEqual(self.find('ге'), ['Крокодил Гена'])
+        self.assertEqual(self.find('!!!'), [])
+    
+    @given(
+        st.lists(st.text(alphabet='абвгдеёжАБВЁ 1,', min_size=1, max_size=15), max_size=20),
+        st.text(alphabet='абвгдеёжАБВЁ 1', min_size=1, max_size=6)
+    )
+    def test_finds_every_substring_match(self, titles, query):
+        index = search.build_index(titles)
+        found = set(search.search(index, query))
+        
+        norm_query = search.normalize(query)
+        for i, title in enumerate(titles):
+            if norm_query and norm_query in search.normalize(title):
+                self.assertIn(i, found)
+
+
+class TestStorageSearch(unittest.TestCase):
+    
+    def setUp(self):
+        self.cartoons = [
+            Cartoon(title=t, url=f'https://example.com/multiki/{i}.avi', extension='.avi', thumbnail='')
+            for i, t in enumerate(TITLES)
+        ]
+    
+    def tearDown(self):
+        cache.clear_cache()
+        sqlite_cache.clear_cache()
+    
+    def test_backends_agree(self):
+        for storage in (cache, sqlite_cache):
+            storage.save_cache(self.cartoons)
+        
+        for query in ('ежик', 'кот', 'чебурашко', 'ен', 'зебра'):
+            expected = [self.cartoons[i] for i in search.search(search.build_index(TITLES), query)]
+            self.assertEqual(cache.search_cartoons(query), expected)
+            self.assertEqual(sqlite_cache.search_cartoons(query), expected)
+    
+    def test_cold_search_decodes_only_matches(self):
+        expected = [self.cartoons[i] for i in search.search(search.build_index(TITLES), 'ежик')]
+        for encoding in cache.ENCODINGS:
+            cache.save_cache(self.cartoons, encoding=encoding)
+            # Новый процесс: каталога в памяти нет
+            cache._memo.clear()
+    
+            with mock.patch.object(cache, '_decode_record', wraps=cache._decode_record) as decode:
+                self.assertEqual(cache.search_cartoons('ежик'), expected)
+            self.assertEqual(decode.call_count, len(expected))
+            self.assertNotIn('cartoons', cache._memo)
+    
+    def test_json_search_without_index_file(self):
+        cache.save_cache(self.cartoons)
+        os.remove(cache.get_search_index_path())
+        
+        self.assertEqual([c.title for c in cache.search_cartoons('ежик')],
+                         ['Ёжик в тумане', 'Ёжики и медвежонок'])
+
+
+if __name__ == '__main__':
+    unittest.main()
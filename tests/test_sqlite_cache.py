@@ -0,0 +1,139 @@
+import unittest
+from hypothesis import given, settings, strategies as st
+import os
+import sqlite3
+import sys
+
+# Add resources/lib to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+from catalog_parser import Cartoon, parse_catalog, title_letter
+import sqlite_cache
+
+
+def make_cartoon(title):
+    return Cartoon(
+        title=title,
+        url=f"https://example.com/multiki/{len(title)}.avi",
+        extension=".avi",
+        thumbnail="",
+        duration="00:10:00",
+        plot="Длительность: 00:10:00"
+    )
+
+
+class TestSqliteCache(unittest.TestCase):
+
+    def setUp(self):
+        sqlite_cache.clear_cache()
+    
+    def tearDown(self):
+        sqlite_cache.clear_cache()
+    
+    def test_missing_cache(self):
+        self.assertFalse(sqlite_cache.is_cache_valid())
+        self.assertIsNone(sqlite_cache.load_cache())
+        self.assertIsNone(sqlite_cache.load_by_letter('А'))
+        self.assertIsNone(sqlite_cache.letter_counts())
+        self.assertIsNone(sqlite_cache.search_cartoons('кот'))
+        self.assertEqual(sqlite_cache.get_generation(), '')
+    
+    def test_generation_changes_only_on_save(self):
+        sqlite_cache.save_cache([make_cartoon('Умка')])
+        generation = sqlite_cache.get_generation()
+        self.assertTrue(generation)
+        
+        self.assertTrue(sqlite_cache.touch_cache(etag='"v2"'))
+        self.assertEqual(sqlite_cache.get_generation(), generation)
+        
+        sqlite_cache.save_cache([make_cartoon('Умка'), make_cartoon('Ёжик')])
+        self.assertNotEqual(sqlite_cache.get_generation(), generation)
+    
+    @settings(max_examples=25)
+    @given(st.lists(
+        st.text(alphabet='абвгдАБВГД 0123abc', min_size=1, max_size=12),
+        min_size=0,
+        max_size=15
+    ))
+    def test_round_trip_preserves_order(self, titles):
+        cartoons = [make_cartoon(t) for t in titles]
+        sqlite_cache.save_cache(cartoons)
+        
+        self.assertTrue(sqlite_cache.is_cache_valid())
+        self.assertEqual(sqlite_cache.load_cache(), cartoons)
+    
+    def test_parsed_catalog_round_trip(self):
+        # У разобранных мультфильмов выводимые поля (страница, обложка) не хранятся
+        html = (
+            '<tr class=e><td class=a>1</td><td class=l><a href="/info/umka.avi.html">Умка</a></td>'
+            '<td class=r>200000000</td><td>720x576</td><td>00:15:30</td>'
+            '<td><a href="/multiki/umka.avi">http</a></td></tr>'
+        )
+        cartoons = parse_catalog(html, 'https://multiki.arjlover.net/multiki/')
+        sqlite_cache.save_cache(cartoons)
+        
+        self.assertEqual(sqlite_cache.load_cache(), cartoons)
+    
+    def test_letter_and_search_queries(self):
+        titles = ['Ёжик в тумане', 'Ну, погоди!', '13 рейс', 'ну и ну', 'Незнайка', 'Alice']
+        cartoons = [make_cartoon(t) for t in titles]
+        sqlite_cache.save_cache(cartoons)
+        
+        self.assertEqual(sqlite_cache.letter_counts(), {'Ё': 1, 'Н': 3, '0-9': 1, 'A': 1})
+        
+        for letter in ('Ё', 'Н', '0-9', 'A', 'Я'):
+            expected = [c for c in cartoons if title_letter(c.title) == letter]
+            self.assertEqual(sqlite_cache.load_by_letter(letter), expected)
+        
+        found = sqlite_cache.search_cartoons('НУ')
+        self.assertEqual([c.title for c in found], ['Ну, погоди!', 'ну и ну'])
+    
+    def test_load_page(self):
+        self.assertIsNone(sqlite_cache.load_page(0, 10))
+        
+        titles = [f'Мульт {i}' for i in range(7)] + ['Ёжик', 'Alice']
+        cartoons = [make_cartoon(t) for t in titles]
+        sqlite_cache.save_cache(cartoons)
+        
+        self.assertEqual(sqlite_cache.load_page(0, 3), (cartoons[:3], 9))
+        self.assertEqual(sqlite_cache.load_page(6, 3), (cartoons[6:], 9))
+        self.assertEqual(sqlite_cache.load_page(3, 3, letter='М'), (cartoons[3:6], 7))
+        self.assertEqual(sqlite_cache.load_page(0, 3, letter='Я'), ([], 0))
+    
+    def test_duration_queries(self):
+        self.assertIsNone(sqlite_cache.duration_counts())
+        
+        durations = ['00:04:59', '00:05:00', '', '00:14:59', '01:10:00', '00:15:00']
+        cartoons = [Cartoon(title=f'Мульт {i}', url=f'https://example.com/multiki/{i}.avi',
+                            duration=d) for i, d in enumerate(durations)]
+        sqlite_cache.save_cache(cartoons)
+        
+        self.assertEqual(sqlite_cache.duration_counts(), {'short': 1, 'medium': 2, 'long': 2})
+        self.assertEqual(sqlite_cache.load_by_duration('medium'), [cartoons[1], cartoons[3]])
+        self.assertEqual(sqlite_cache.load_page(1, 5, duration='long'), ([cartoons[5]], 2))
+        self.assertEqual(sqlite_cache.load_by_duration('unknown'), [])
+    
+    def test_outdated_schema_is_replaced_only_on_save(self):
+        conn = sqlite3.connect(sqlite_cache.get_db_path())
+        with conn:
+            conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            conn.execute("INSERT INTO meta VALUES ('schema_version', '1'), ('timestamp', '2099-01-01')")
+        conn.close()
+        
+        # Чтение не трогает схему, а устаревшую версию просто не принимает
+        self.assertIsNone(sqlite_cache.load_cache(allow_stale=True))
+        self.assertFalse(sqlite_cache.touch_cache())
+        self.assertEqual(sqlite_cache._load_meta()['schema_version'], '1')
+        
+        cartoons = [make_cartoon('Умка')]
+        sqlite_cache.save_cache(cartoons)
+        self.assertEqual(sqlite_cache.load_cache(), cartoons)
+        
+        conn = sqlite3.connect(sqlite_cache.get_db_path())
+        indexes = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        conn.close()
+        self.assertNotIn('idx_cartoons_title_norm', indexes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import os
+import sys
+
+# Add resources/lib to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+import thumbnails
+
+URLS = [f'https://multiki.arjlover.net/ap/{i}.avi/{i}.avi.thumb1.jpg' for i in range(10)]
+
+SIZE = thumbnails.TYPICAL_THUMBNAIL_BYTES
+
+
+class FakeFetcher:
+
+    def __init__(self, size=SIZE, missing=()):
+        self.size = size
+        self.missing = set(missing)
+        self.calls = []
+    
+    def __call__(self, url, path):
+        self.calls.append(url)
+        if url in self.missing:
+            return 0
+        with open(path, 'wb') as f:
+            f.write(b'\xff' * self.size)
+        return self.size
+
+
+class FakeSite:
+    """Проверка наличия: на сайте есть только адреса из existing."""
+    
+    def __init__(self, existing=()):
+        self.existing = set(existing)
+        self.calls = []
+    
+    def __call__(self, url):
+        self.calls.append(url)
+        return url in self.existing
+
+
+class TestThumbnails(unittest.TestCase):
+
+    def setUp(self):
+        thumbnails.clear_thumbnails()
+    
+    def tearDown(self):
+        thumbnails.clear_thumbnails()
+    
+    def show(self, urls):
+        lookup = thumbnails.ThumbnailLookup()
+        art = [lookup.get(url) for url in urls]
+        lookup.flush()
+        return art
+    
+    def test_prefetch_fills_budget_only(self):
+        fetcher = FakeFetcher()
+        self.assertEqual(thumbnails.prefetch(URLS[:3], budget=10 * SIZE, rate=0, fetch=fetcher), 3)
+        
+        # Бюджет уменьшен: места осталось на 2 обложки
+        fetcher.calls = []
+        self.assertEqual(thumbnails.prefetch(URLS + URLS, budget=5 * SIZE, rate=0, fetch=fetcher), 2)
+        self.assertEqual(fetcher.calls, URLS[3:5])
+        
+        art = self.show(URLS[:6])
+        self.assertTrue(all(os.path.isfile(path) for path in art[:5]))
+        self.assertEqual(art[5], URLS[5])
+    
+    def test_shown_thumbnails_evict_least_recently_used(self):
+        fetcher = FakeFetcher()
+        self.assertEqual(thumbnails.prefetch(URLS[:4], budget=4 * SIZE, rate=0, fetch=fetcher), 4)
+        
+        # Показаны 0, 1, 3 (есть) и 8 (нет): 8 загружается вне очереди,
+        # вытесняя давно не показывавшуюся 2
+        self.show([URLS[0], URLS[1], URLS[3], URLS[8]])
+        fetcher.calls = []
+        self.assertEqual(thumbnails.prefetch(URLS, budget=4 * SIZE, rate=0, fetch=fetcher,
+                                                   check=FakeSite(URLS)), 1)
+        self.assertEqual(fetcher.calls, [URLS[8]])
+        
+        files = thumbnails.load_index()['files']
+        self.assertEqual(
+            sorted(files),
+            sorted(thumbnails.thumbnail_name(URLS[i]) for i in (0, 1, 3, 8))
+        )
+    
+    def test_missing_thumbnails_are_not_refetched(self):
+        fetcher = FakeFetcher(missing=URLS[:2])
+        self.assertEqual(thumbnails.prefetch(URLS[:4], rate=0, fetch=fetcher), 2)
+        
+        fetcher.calls = []
+        self.show(URLS[:4])
+        self.assertEqual(thumbnails.prefetch(URLS[:4], rate=0, fetch=fetcher, check=FakeSite()), 0)
+        self.assertEqual(fetcher.calls, [])
+    
+    def test_probe_resolves_alternative_candidates(self):
+        thumb2 = URLS[1].replace('.thumb1.', '.thumb2.')
+        site = FakeSite([URLS[0], thumb2])
+        
+        self.assertEqual(thumbnails.probe(URLS[:3], rate=0, check=site), 3)
+        self.assertEqual(
+            {url: entry[0] for url, entry in thumbnails.load_probes().items()},
+            {URLS[0]: URLS[0], URLS[1]: thumb2, URLS[2]: ''}
+        )
+        self.assertEqual(len(site.calls), 1 + 2 + 3)
+        
+        # Проверенные записи не проверяются повторно
+        self.assertEqual(thumbnails.probe(URLS[:3], rate=0, check=site), 0)
+        
+        # Список ссылается только на найденные обложки, а загружается найденный адрес
+        self.assertEqual(self.show(URLS[:4]), [URLS[0], thumb2, '', URLS[3]])
+        fetcher = FakeFetcher()
+        thumbnails.prefetch([], rate=0, fetch=fetcher, check=FakeSite([URLS[3]]))
+        self.assertEqual(sorted(fetcher.calls), sorted([URLS[0], thumb2, URLS[3]]))
+    
+    def test_unknown_probe_result_is_not_recorded(self):
+        self.assertEqual(thumbnails.probe(URLS[:2], rate=0, check=lambda url: None), 0)
+        self.assertEqual(thumbnails.load_probes(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import os
+import pstats
+import shutil
+import sys
+import time
+
+# Add resources/lib to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'resources', 'lib'))
+
+import settings
+import timing
+
+
+def slow_chunks(count, delay):
+    for i in range(count):
+        time.sleep(delay)
+        yield i
+
+
+class TestTiming(unittest.TestCase):
+    
+    def test_nested_phases_are_exclusive(self):
+        with timing.action('listing', log_level='off', profile=False) as measured:
+            pass
+        self.assertEqual(measured.phases, {})
+        
+        with timing.action('listing', log_level='debug', profile=False) as measured:
+            with timing.phase('parse'):
+                time.sleep(0.02)
+                list(timing.timed_iter('fetch', slow_chunks(2, 0.05)))
+            with timing.phase('parse'):
+                pass
+            timing.count('net_requests')
+            timing.count('net_requests', 2)
+        
+        self.assertEqual(set(measured.phases), {'parse', 'fetch'})
+        # Время итератора начислено fetch и не входит во внешнюю фазу parse
+        self.assertGreaterEqual(measured.phases['fetch'], 0.1)
+        self.assertGreaterEqual(measured.phases['parse'], 0.02)
+        self.assertLess(measured.phases['parse'], 0.1)
+        self.assertLessEqual(sum(measured.phases.values()), measured.elapsed)
+        self.assertEqual(measured.counters, {'net_requests': 3})
+        self.assertIn('net_requests 3', measured.summary())
+    
+    def test_handled_error_is_reported(self):
+        with timing.action('listing', log_level='debug', profile=False) as measured:
+            try:
+                raise OSError('disk')
+            except OSError as e:
+                timing.fail(e)
+        
+        self.assertIn("ошибка: OSError('disk')", measured.summary())
+        # Вне действия отметка ничего не делает
+        timing.fail(OSError('disk'))
+        self.assertIsNone(timing._current)
+    
+    def test_phases_outside_action_are_ignored(self):
+        with timing.phase('render'):
+            pass
+        self.assertEqual(list(timing.timed_iter('fetch', [1, 2])), [1, 2])
+        timing.count('net_requests')
+        self.assertIsNone(timing._phases)
+    
+    def test_profile_is_dumped(self):
+        directory = os.path.join(settings.get_data_dir(), 'profiles')
+        shutil.rmtree(directory, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, directory, True)
+        
+        with timing.action('search', log_level='off', profile=True) as measured:
+            sorted(range(1000), key=str)
+        
+        self.assertTrue(measured.profile_path.startswith(directory))
+        stats = pstats.Stats(measured.profile_path)
+        self.assertGreater(stats.total_calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()